@@ -0,0 +1,176 @@
+// Copyright (c) Microsoft Corporation.
+// Licensed under the MIT License.
+
+#nullable enable
+using System;
+using System.Collections.Generic;
+using System.Diagnostics;
+using System.Linq;
+using Newtonsoft.Json;
+
+namespace Microsoft.Quantum.IQSharp
+{
+    /// <summary>
+    ///      A status reported by a task, in milliseconds since that task
+    ///      started.
+    /// </summary>
+    public record TaskStatusTiming(
+        [property: JsonProperty("id")] string Id,
+        [property: JsonProperty("at_ms")] double AtMilliseconds
+    );
+
+    /// <summary>
+    ///      The time taken by a task reported to an
+    ///      <see cref="IPerformanceMonitor" />, together with the times taken
+    ///      by each of its subtasks.
+    /// </summary>
+    public class TaskTiming
+    {
+        [JsonProperty("id")]
+        public string Id { get; set; } = "";
+
+        [JsonProperty("description")]
+        public string Description { get; set; } = "";
+
+        /// <summary>
+        ///      When this task started, in milliseconds since recording
+        ///      started.
+        /// </summary>
+        [JsonProperty("start_ms")]
+        public double StartMilliseconds { get; set; }
+
+        [JsonProperty("duration_ms")]
+        public double? DurationMilliseconds { get; set; }
+
+        [JsonProperty("statuses")]
+        public List<TaskStatusTiming> Statuses { get; } = new();
+
+        [JsonProperty("children")]
+        public List<TaskTiming> Children { get; } = new();
+
+        // The start of this task relative to the start of its parent, as
+        // reported by task reporters.
+        [JsonIgnore]
+        internal TimeSpan StartedAfterParent { get; set; }
+
+        internal void Resolve(double parentStartMilliseconds)
+        {
+            StartMilliseconds = parentStartMilliseconds + StartedAfterParent.TotalMilliseconds;
+            foreach (var child in Children)
+            {
+                child.Resolve(StartMilliseconds);
+            }
+        }
+    }
+
+    /// <summary>
+    ///      Records the tasks reported to an <see cref="IPerformanceMonitor" />
+    ///      until disposed, such that the time spent in each task can be
+    ///      reported to clients as a tree.
+    /// </summary>
+    public class TaskTimingRecorder : IDisposable
+    {
+        private readonly IPerformanceMonitor monitor;
+        private readonly Stopwatch stopwatch = Stopwatch.StartNew();
+        private readonly Dictionary<ITaskReporter, TaskTiming> timings = new();
+        private readonly List<TaskTiming> roots = new();
+
+        public TaskTimingRecorder(IPerformanceMonitor monitor)
+        {
+            this.monitor = monitor;
+            monitor.OnTaskPerformanceAvailable += OnTaskPerformanceAvailable;
+            monitor.OnTaskCompleteAvailable += OnTaskCompleteAvailable;
+        }
+
+        /// <summary>
+        ///      The tasks that were started while recording, and that were not
+        ///      subtasks of other tasks.
+        /// </summary>
+        public IReadOnlyList<TaskTiming> Roots
+        {
+            get
+            {
+                lock (timings)
+                {
+                    return roots.ToList();
+                }
+            }
+        }
+
+        private TaskTiming GetOrAdd(ITaskReporter task)
+        {
+            if (timings.TryGetValue(task, out var timing))
+            {
+                return timing;
+            }
+
+            timing = new TaskTiming
+            {
+                Id = task.Id,
+                Description = task.Description,
+                StartedAfterParent = task.TotalTimeSinceStart - task.TimeSinceStart
+            };
+            timings[task] = timing;
+            if (task.Parent == null)
+            {
+                // Task reporters only know when root tasks started relative
+                // to themselves, so measure that against our own clock.
+                timing.StartedAfterParent = stopwatch.Elapsed - task.TimeSinceStart;
+                roots.Add(timing);
+            }
+            else
+            {
+                GetOrAdd(task.Parent).Children.Add(timing);
+            }
+            return timing;
+        }
+
+        private void OnTaskPerformanceAvailable(object? sender, TaskPerformanceArgs args)
+        {
+            lock (timings)
+            {
+                GetOrAdd(args.Task).Statuses.Add(new TaskStatusTiming(args.StatusId, args.Task.TimeSinceStart.TotalMilliseconds));
+            }
+        }
+
+        private void OnTaskCompleteAvailable(object? sender, TaskCompleteArgs args)
+        {
+            lock (timings)
+            {
+                GetOrAdd(args.Task).DurationMilliseconds = args.Task.TimeSinceStart.TotalMilliseconds;
+            }
+        }
+
+        /// <summary>
+        ///      Stops recording, and returns the tree of recorded task timings.
+        /// </summary>
+        public TaskTimingReport Stop()
+        {
+            Dispose();
+            var tasks = Roots.ToList();
+            foreach (var task in tasks)
+            {
+                task.Resolve(0);
+            }
+            return new TaskTimingReport(tasks, stopwatch.Elapsed.TotalMilliseconds);
+        }
+
+        public void Dispose()
+        {
+            monitor.OnTaskPerformanceAvailable -= OnTaskPerformanceAvailable;
+            monitor.OnTaskCompleteAvailable -= OnTaskCompleteAvailable;
+        }
+    }
+
+    /// <summary>
+    ///      The tasks run by the kernel while executing a single request.
+    /// </summary>
+    public record TaskTimingReport(
+        [property: JsonProperty("tasks")] List<TaskTiming> Tasks,
+        [property: JsonProperty("total_ms")] double TotalMilliseconds
+    )
+    {
+        public override string ToString() =>
+            $"{Tasks.Count} kernel tasks in {TotalMilliseconds}ms";
+    }
+}
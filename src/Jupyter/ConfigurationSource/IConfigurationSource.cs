@@ -267,5 +267,14 @@ namespace Microsoft.Quantum.IQSharp.Jupyter
         /// </summary>
         public bool InternalShowCompilerPerf =>
             GetOptionOrDefault("internal.showCompilerPerf", false);
+
+        /// <summary>
+        ///      If set to <c>true</c>, reports the time taken by each kernel
+        ///      task (e.g. compiling snippets) at the end of each execution,
+        ///      as display data of type <c>application/x-qsharp-perf</c>, such
+        ///      that clients can add them to their own traces.
+        /// </summary>
+        public bool InternalTracePerf =>
+            GetOptionOrDefault("internal.tracePerf", false);
     }
 }
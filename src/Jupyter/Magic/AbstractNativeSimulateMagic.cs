@@ -2,13 +2,16 @@
 // Licensed under the MIT License.
 
 using System;
+using System.Collections.Generic;
 using System.Diagnostics;
+using System.Threading;
 using System.Threading.Tasks;
 using Microsoft.Extensions.Logging;
 using Microsoft.Jupyter.Core;
 using Microsoft.Quantum.IQSharp.Common;
 using Microsoft.Quantum.Simulation.Core;
 using Microsoft.Quantum.Simulation.Simulators;
+using Newtonsoft.Json;
 
 namespace Microsoft.Quantum.IQSharp.Jupyter
 {
@@ -19,7 +22,9 @@ namespace Microsoft.Quantum.IQSharp.Jupyter
     /// </summary>
     public abstract class AbstractNativeSimulateMagic : AbstractMagic
     {
-        private const string ParameterNameOperationName = "__operationName__";
+        private protected const string ParameterNameOperationName = "__operationName__";
+        private const string ParameterNameShots = "__shots__";
+        private const string ParameterNameSeed = "__seed__";
         private readonly IPerformanceMonitor Monitor;
 
         /// <summary>
@@ -51,17 +56,37 @@ namespace Microsoft.Quantum.IQSharp.Jupyter
 
         /// <inheritdoc />
         public override ExecutionResult Run(string input, IChannel channel) =>
-            RunAsync(input, channel).Result;
+            RunCancellable(input, channel, CancellationToken.None);
 
-        internal abstract CommonNativeSimulator CreateNativeSimulator();
+        /// <inheritdoc />
+        public override ExecutionResult RunCancellable(string input, IChannel channel, CancellationToken cancellationToken) =>
+            RunAsync(input, channel, cancellationToken).GetAwaiter().GetResult();
+
+        internal abstract CommonNativeSimulator CreateNativeSimulator(uint? seed = null);
+
+        /// <summary>
+        ///     Parses the input to this magic command into a dictionary from
+        ///     parameter names to JSON-encoded values, including the name of
+        ///     the operation or function to simulate.
+        /// </summary>
+        internal virtual Dictionary<string, string> ParseInput(string input) =>
+            ParseInputParameters(input, firstParameterInferredName: ParameterNameOperationName);
 
         /// <summary>
-        ///     Simulates an operation given a string with its name and a JSON
-        ///     encoding of its arguments.
+        ///     Simulates the given operation or function with the parameters
+        ///     given to this magic command, returning the output of the
+        ///     command. By default, the operation is simulated once.
         /// </summary>
-        public async Task<ExecutionResult> RunAsync(string input, IChannel channel)
+        internal virtual Task<object> RunSymbolAsync(IQSharpSymbol symbol, Dictionary<string, string> inputParameters, IChannel channel, CancellationToken cancellationToken) =>
+            SimulateAsync(symbol, inputParameters, channel, cancellationToken);
+
+        /// <summary>
+        ///     Simulates an operation given a string with its name and its
+        ///     parameters, as parsed by <see cref="ParseInput" />.
+        /// </summary>
+        public async Task<ExecutionResult> RunAsync(string input, IChannel channel, CancellationToken cancellationToken = default)
         {
-            var inputParameters = ParseInputParameters(input, firstParameterInferredName: ParameterNameOperationName);
+            var inputParameters = ParseInput(input);
 
             var name = inputParameters.DecodeParameter<string>(ParameterNameOperationName);
             var symbol = SymbolResolver.Resolve(name) as IQSharpSymbol;
@@ -71,9 +96,71 @@ namespace Microsoft.Quantum.IQSharp.Jupyter
                 return ExecuteStatus.Error.ToExecutionResult();
             }
 
+            var value = await RunSymbolAsync(symbol, inputParameters, channel, cancellationToken);
+            return value.ToExecutionResult();
+        }
+
+        /// <summary>
+        ///     Simulates an operation several times on a single instance of
+        ///     this magic command's simulator. The number of shots and the
+        ///     seed for the simulator's random number generator are given by
+        ///     the <c>__shots__</c> and <c>__seed__</c> parameters.
+        ///     Returns an array of (output, count) pairs, one for each distinct
+        ///     output observed.
+        /// </summary>
+        internal async Task<object> SimulateShotsAsync(IQSharpSymbol symbol, Dictionary<string, string> inputParameters, IChannel channel, CancellationToken cancellationToken)
+        {
+            var nShots = inputParameters.DecodeParameter<long>(ParameterNameShots, defaultValue: 1L);
+            uint? seed = inputParameters.ContainsKey(ParameterNameSeed)
+                ? inputParameters.DecodeParameter<uint>(ParameterNameSeed)
+                : (uint?)null;
+            inputParameters.Remove(ParameterNameShots);
+            inputParameters.Remove(ParameterNameSeed);
+
+            // Outputs are compared by their JSON serialization, such that
+            // equal tuples, arrays and UDTs are counted together.
+            var counts = new List<(object, long)>();
+            var indices = new Dictionary<string, int>();
+            await SimulateAsync(symbol, inputParameters, channel, nShots, seed, cancellationToken, value =>
+            {
+                var key = JsonConvert.SerializeObject(value, JsonConverters.AllConverters);
+                if (indices.TryGetValue(key, out var idx))
+                {
+                    counts[idx] = (counts[idx].Item1, counts[idx].Item2 + 1);
+                }
+                else
+                {
+                    indices[key] = counts.Count;
+                    counts.Add((value, 1L));
+                }
+            });
+            return counts;
+        }
+
+        /// <summary>
+        ///     Simulates an operation on a new instance of this magic command's
+        ///     simulator, returning its output.
+        /// </summary>
+        internal async Task<object> SimulateAsync(IQSharpSymbol symbol, Dictionary<string, string> inputParameters, IChannel channel, CancellationToken cancellationToken = default)
+        {
+            object result = null;
+            await SimulateAsync(symbol, inputParameters, channel, 1, null, cancellationToken, value => result = value);
+            return result;
+        }
+
+        /// <summary>
+        ///     Simulates an operation <paramref name="nShots" /> times on a
+        ///     single new instance of this magic command's simulator, calling
+        ///     <paramref name="onShot" /> with the output of each shot.
+        ///     Cancellation is checked before each shot and each time the
+        ///     simulation starts an operation, such that a request stops soon
+        ///     after the kernel is interrupted, even during a long shot.
+        /// </summary>
+        internal async Task SimulateAsync(IQSharpSymbol symbol, Dictionary<string, string> inputParameters, IChannel channel, long nShots, uint? seed, CancellationToken cancellationToken, Action<object> onShot)
+        {
             var maxNQubits = 0L;
 
-            using var qsim = CreateNativeSimulator()
+            using var qsim = CreateNativeSimulator(seed)
                 .WithStackTraceDisplay(channel);
 
             qsim.DisableLogToConsole();
@@ -116,16 +203,37 @@ namespace Microsoft.Quantum.IQSharp.Jupyter
             {
                 maxNQubits = System.Math.Max(qsim.QubitManager?.AllocatedQubitsCount ?? 0, maxNQubits);
             };
+
+            // Stop the running shot at the next operation that it starts,
+            // such that the simulator is no longer in use once it's disposed.
+            qsim.OnOperationStart += (callable, args) => cancellationToken.ThrowIfCancellationRequested();
+
             var stopwatch = Stopwatch.StartNew();
-            var value = await symbol.Operation.RunAsync(qsim, inputParameters);
+            for (var idxShot = 0L; idxShot < nShots; idxShot++)
+            {
+                if (cancellationToken.IsCancellationRequested)
+                {
+                    // Throw a TaskCanceledException so that the jupyter-core
+                    // library reports the request as cancelled.
+                    throw new TaskCanceledException();
+                }
+                object value;
+                try
+                {
+                    value = await Task.Run(() => symbol.Operation.RunAsync(qsim, inputParameters), cancellationToken);
+                }
+                catch (OperationCanceledException) when (cancellationToken.IsCancellationRequested)
+                {
+                    throw new TaskCanceledException();
+                }
+                onShot(value);
+            }
             stopwatch.Stop();
-            var result = value.ToExecutionResult();
             (Monitor as PerformanceMonitor)?.ReportSimulatorPerformance(new SimulatorPerformanceArgs(
                 simulatorName: qsim.GetType().FullName,
                 nQubits: (int)maxNQubits,
                 duration: stopwatch.Elapsed
             ));
-            return result;
         }
     }
 }
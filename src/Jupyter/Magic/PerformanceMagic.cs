@@ -16,12 +16,27 @@ using Newtonsoft.Json.Linq;
 
 namespace Microsoft.Quantum.IQSharp.Jupyter
 {
+    /// <summary>
+    ///     Performance metrics for the current IQ# kernel process, as returned
+    ///     by <c>%performance raw</c>.
+    /// </summary>
+    public record KernelPerformanceMetrics(
+        [property: JsonProperty("managed_ram")] long ManagedRam,
+        [property: JsonProperty("total_ram")] long TotalRam,
+        [property: JsonProperty("peak_total_ram")] long PeakTotalRam,
+        [property: JsonProperty("virtual_memory")] long VirtualMemory,
+        [property: JsonProperty("user_time")] double UserTimeSeconds,
+        [property: JsonProperty("total_time")] double TotalTimeSeconds
+    );
+
     /// <summary>
     ///     A magic command that reports various performance metrics to the
     ///     user.
     /// </summary>
     public class PerformanceMagic : AbstractMagic
     {
+        private const string ParameterNameRaw = "raw";
+
         /// <summary>
         ///     Constructs a new performance command.
         /// </summary>
@@ -37,6 +52,10 @@ namespace Microsoft.Quantum.IQSharp.Jupyter
                     - Virtual memory size
                     - User time
                     - Total time
+
+                    With the `raw` option, these metrics are returned as data
+                    rather than displayed as a table, with memory measured in
+                    bytes and times in seconds.
                 ".Dedent(),
                 Examples = new []
                 {
@@ -53,15 +72,34 @@ namespace Microsoft.Quantum.IQSharp.Jupyter
                                Total time                    00:00:01.437
                         ```
                     ".Dedent(),
+                    @"
+                        Return performance metrics for the current IQ# kernel process as data:
+                        ```
+                        In []: %performance raw
+                        ```
+                    ".Dedent(),
                 }
             }, logger)
         {
         }
 
-    /// <inheritdoc />
+        /// <inheritdoc />
         public override ExecutionResult Run(string? input, IChannel channel)
         {
             var currentProcess = Process.GetCurrentProcess();
+            var inputParameters = ParseInputParameters(input ?? string.Empty);
+            if (inputParameters.DecodeParameter<bool>(ParameterNameRaw, defaultValue: false))
+            {
+                return new KernelPerformanceMetrics(
+                    ManagedRam: GC.GetTotalMemory(forceFullCollection: false),
+                    TotalRam: currentProcess.WorkingSet64,
+                    PeakTotalRam: currentProcess.PeakWorkingSet64,
+                    VirtualMemory: currentProcess.VirtualMemorySize64,
+                    UserTimeSeconds: currentProcess.UserProcessorTime.TotalSeconds,
+                    TotalTimeSeconds: currentProcess.TotalProcessorTime.TotalSeconds
+                ).ToExecutionResult();
+            }
+
             var performanceResult = new List<(string, string)>
             {
                 ("Managed RAM usage (bytes)", GC.GetTotalMemory(forceFullCollection: false).ToHumanReadableBytes()),
@@ -62,6 +62,6 @@ namespace Microsoft.Quantum.IQSharp.Jupyter
         {
         }
 
-        internal override CommonNativeSimulator CreateNativeSimulator() => new QuantumSimulator();
+        internal override CommonNativeSimulator CreateNativeSimulator(uint? seed = null) => new QuantumSimulator(randomNumberGeneratorSeed: seed);
     }
 }
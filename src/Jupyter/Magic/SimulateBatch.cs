@@ -0,0 +1,98 @@
+﻿// Copyright (c) Microsoft Corporation.
+// Licensed under the MIT License.
+
+using System;
+using System.Collections.Generic;
+using System.Threading;
+using System.Threading.Tasks;
+using Microsoft.Extensions.Logging;
+using Microsoft.Jupyter.Core;
+using Microsoft.Quantum.IQSharp.Common;
+using Microsoft.Quantum.Simulation.Simulators;
+using Newtonsoft.Json;
+using Newtonsoft.Json.Linq;
+
+namespace Microsoft.Quantum.IQSharp.Jupyter
+{
+    /// <summary>
+    ///     A magic command that can be used to simulate an operation or
+    ///     function on a full-state quantum simulator once for each of
+    ///     several sets of arguments.
+    /// </summary>
+    public class SimulateBatchMagic : AbstractNativeSimulateMagic
+    {
+        private const string ParameterNameArgumentSets = "__argumentSets__";
+
+        /// <summary>
+        ///     Constructs a new magic command given a resolver used to find
+        ///     operations and functions, and a configuration source used to set
+        ///     configuration options.
+        /// </summary>
+        public SimulateBatchMagic(ISymbolResolver resolver, IConfigurationSource configurationSource, IPerformanceMonitor monitor, ILogger<SimulateBatchMagic> logger) : base(
+            "simulate_batch",
+            new Microsoft.Jupyter.Core.Documentation
+            {
+                Summary = "Runs a given function or operation on the QuantumSimulator target machine once for each of several sets of arguments.",
+                Description = @"
+                    This magic command allows executing a given function or operation on the QuantumSimulator
+                    once for each set of arguments in a JSON array, and returns an array containing
+                    the return value of each simulation, in the same order as the sets of arguments.
+                    Each simulation uses a new instance of the simulator.
+
+                    Running many simulations with a single command avoids paying the cost of
+                    a separate command for each simulation.
+
+                    #### Required parameters
+
+                    - Q# operation or function name. This must be the first parameter, and must be a valid Q# operation
+                    or function name that has been defined either in the notebook or in a Q# file in the same folder.
+                    - A JSON array of objects, each of which specifies the arguments for one simulation.
+                ".Dedent(),
+                Examples = new []
+                {
+                    @"
+                        Simulate a Q# operation defined as `operation MyOperation(a : Int, b : Int) : Result` three times:
+                        ```
+                        In []: %simulate_batch MyOperation [{""a"": 1, ""b"": 2}, {""a"": 3, ""b"": 4}, {""a"": 5, ""b"": 6}]
+                        Out[]: <array of return values of the operation>
+                        ```
+                    ".Dedent(),
+                }
+            }, resolver, configurationSource, monitor, logger)
+        {
+        }
+
+        /// <summary>
+        ///     Parses the input to this magic command, given as the name of
+        ///     an operation followed by a JSON array of objects, each holding
+        ///     the arguments for one simulation.
+        /// </summary>
+        internal override Dictionary<string, string> ParseInput(string input)
+        {
+            var parts = input.Trim().Split(new[] { ' ', '\t', '\r', '\n' }, 2, StringSplitOptions.RemoveEmptyEntries);
+            return new Dictionary<string, string>
+            {
+                [ParameterNameOperationName] = JsonConvert.SerializeObject(parts.Length > 0 ? parts[0] : string.Empty),
+                [ParameterNameArgumentSets] = parts.Length > 1 ? parts[1] : "[]"
+            };
+        }
+
+        /// <summary>
+        ///     Simulates an operation once for each set of arguments, returning
+        ///     an array with the output of each simulation.
+        /// </summary>
+        internal override async Task<object> RunSymbolAsync(IQSharpSymbol symbol, Dictionary<string, string> inputParameters, IChannel channel, CancellationToken cancellationToken)
+        {
+            var argumentSets = JArray.Parse(inputParameters[ParameterNameArgumentSets]);
+            var values = new List<object>(argumentSets.Count);
+            foreach (var argumentSet in argumentSets)
+            {
+                var arguments = JsonConverters.JsonToDict(argumentSet.ToString(Formatting.None));
+                values.Add(await SimulateAsync(symbol, arguments, channel, cancellationToken));
+            }
+            return values;
+        }
+
+        internal override CommonNativeSimulator CreateNativeSimulator(uint? seed = null) => new QuantumSimulator(randomNumberGeneratorSeed: seed);
+    }
+}
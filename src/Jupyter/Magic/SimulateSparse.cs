@@ -60,6 +60,6 @@ namespace Microsoft.Quantum.IQSharp.Jupyter
         {
         }
 
-        internal override CommonNativeSimulator CreateNativeSimulator() => new SparseSimulator();
+        internal override CommonNativeSimulator CreateNativeSimulator(uint? seed = null) => new SparseSimulator(randomNumberGeneratorSeed: seed);
     }
 }
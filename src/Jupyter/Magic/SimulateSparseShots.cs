@@ -0,0 +1,71 @@
+﻿// Copyright (c) Microsoft Corporation.
+// Licensed under the MIT License.
+
+using System;
+using System.Collections.Generic;
+using System.Threading;
+using System.Threading.Tasks;
+using Microsoft.Extensions.Logging;
+using Microsoft.Jupyter.Core;
+using Microsoft.Quantum.IQSharp.Common;
+using Microsoft.Quantum.Simulation.Simulators;
+
+namespace Microsoft.Quantum.IQSharp.Jupyter
+{
+    /// <summary>
+    ///     A magic command that can be used to run an operation or function
+    ///     many times on a single instance of the sparse simulator, returning how often
+    ///     each output was observed.
+    /// </summary>
+    public class SimulateSparseShotsMagic : AbstractNativeSimulateMagic
+    {
+        /// <summary>
+        ///     Constructs a new magic command given a resolver used to find
+        ///     operations and functions, and a configuration source used to set
+        ///     configuration options.
+        /// </summary>
+        public SimulateSparseShotsMagic(ISymbolResolver resolver, IConfigurationSource configurationSource, IPerformanceMonitor monitor, ILogger<SimulateSparseShotsMagic> logger) : base(
+            "simulate_sparse_shots",
+            new Microsoft.Jupyter.Core.Documentation
+            {
+                Summary = "Runs a given function or operation on the sparse simulator several times, and counts each distinct return value.",
+                Description = @"
+                    This magic command allows executing a given function or operation on the sparse simulator
+                    a given number of times, and returns an array of pairs, each holding a distinct
+                    return value and the number of times that value was returned.
+                    All shots run on a single instance of the simulator, such that running many
+                    shots avoids paying the cost of a separate command for each shot.
+
+                    #### Required parameters
+
+                    - Q# operation or function name. This must be the first parameter, and must be a valid Q# operation
+                    or function name that has been defined either in the notebook or in a Q# file in the same folder.
+                    - Arguments for the Q# operation or function must also be specified as `key=value` pairs.
+
+                    #### Optional parameters
+
+                    - `__shots__=<integer>`: The number of times to run the operation or function. Defaults to 1.
+                    - `__seed__=<integer>`: A seed for the random number generator of the simulator, such that
+                    the returned counts are reproducible.
+                ".Dedent(),
+                Examples = new []
+                {
+                    @"
+                        Run a Q# operation defined as `operation MyOperation(a : Int) : Result` 1000 times:
+                        ```
+                        In []: %simulate_sparse_shots MyOperation a=5 __shots__=1000 __seed__=42
+                        Out[]: <array of (return value, count) pairs>
+                        ```
+                    ".Dedent(),
+                }
+            }, resolver, configurationSource, monitor, logger)
+        {
+        }
+
+        /// <inheritdoc />
+        internal override Task<object> RunSymbolAsync(IQSharpSymbol symbol, Dictionary<string, string> inputParameters, IChannel channel, CancellationToken cancellationToken) =>
+            SimulateShotsAsync(symbol, inputParameters, channel, cancellationToken);
+
+        internal override CommonNativeSimulator CreateNativeSimulator(uint? seed = null) => new SparseSimulator(randomNumberGeneratorSeed: seed);
+    }
+}
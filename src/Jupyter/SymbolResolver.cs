@@ -10,6 +10,8 @@ using System.Linq;
 
 using Microsoft.Jupyter.Core;
 using Microsoft.Quantum.IQSharp.Common;
+using Microsoft.Quantum.QsCompiler;
+using Microsoft.Quantum.QsCompiler.Transformations.QsCodeOutput;
 
 using Newtonsoft.Json;
 
@@ -74,6 +76,16 @@ namespace Microsoft.Quantum.IQSharp.Jupyter
         [JsonProperty("inputs", NullValueHandling=NullValueHandling.Ignore)]
         public ImmutableDictionary<string?, string?>? Inputs { get; private set; } = null;
 
+        /// <summary>
+        ///      The signature of the operation represented by this symbol, as
+        ///      it would be declared in Q# (e.g.:
+        ///      <c>Foo (a : Int, b : Double[]) : Result[]</c>), such that
+        ///      clients can encode arguments and decode outputs according to
+        ///      their types.
+        /// </summary>
+        [JsonProperty("signature")]
+        public string Signature => Operation.Header.PrintSignature();
+
         // TODO: continue exposing documentation here.
 
         /// <summary>
@@ -11,6 +11,7 @@ using System.Linq;
 using Microsoft.Jupyter.Core;
 using Microsoft.Quantum.QsCompiler.Diagnostics;
 using Microsoft.Quantum.Simulation.Simulators;
+using Newtonsoft.Json;
 
 namespace Microsoft.Quantum.IQSharp.Jupyter
 {
@@ -59,6 +60,22 @@ namespace Microsoft.Quantum.IQSharp.Jupyter
             };
     }
 
+    /// <summary>
+    ///      Encodes the task timings of a single execution as JSON, such that
+    ///      clients can correlate them with their own traces.
+    /// </summary>
+    public class TaskTimingReportToJsonEncoder : IResultEncoder
+    {
+        /// <inheritdoc />
+        public string MimeType => "application/x-qsharp-perf";
+
+        /// <inheritdoc />
+        public EncodedData? Encode(object displayable) =>
+            displayable is TaskTimingReport report
+            ? JsonConvert.SerializeObject(report).ToEncodedData()
+            : (EncodedData?)null;
+    }
+
     // NB: plain text should be handled by just the ToString output.
 
 }
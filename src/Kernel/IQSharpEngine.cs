@@ -226,6 +226,7 @@ namespace Microsoft.Quantum.IQSharp.Kernel
             RegisterDisplayEncoder<DisplayableExceptionToTextEncoder>();
             RegisterDisplayEncoder<DisplayableHtmlElementEncoder>();
             RegisterDisplayEncoder<TaskProgressToHtmlEncoder>();
+            RegisterDisplayEncoder<TaskTimingReportToJsonEncoder>();
             RegisterDisplayEncoder<TargetCapabilityToHtmlEncoder>();
             RegisterDisplayEncoder<FancyErrorToTextEncoder>();
             RegisterDisplayEncoder<FancyErrorToHtmlEncoder>();
@@ -439,6 +440,9 @@ namespace Microsoft.Quantum.IQSharp.Kernel
                 performanceMonitor.OnTaskPerformanceAvailable += ReportTaskStatus;
                 performanceMonitor.OnTaskCompleteAvailable += ReportTaskCompletion;
             }
+            using var taskTimings = configurationSource.InternalTracePerf
+                                    ? new TaskTimingRecorder(performanceMonitor)
+                                    : null;
 
             try
             {
@@ -468,6 +472,10 @@ namespace Microsoft.Quantum.IQSharp.Kernel
                     performanceMonitor.OnTaskPerformanceAvailable -= ReportTaskStatus;
                     performanceMonitor.OnTaskCompleteAvailable -= ReportTaskCompletion;
                 }
+                if (taskTimings?.Stop() is { Tasks.Count: > 0 } report)
+                {
+                    channel.Display(report);
+                }
             }
         }
 
@@ -0,0 +1,81 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+##
+# bench_arrays.py: Measures how long encoding large NumPy arrays as Q#
+#     arguments takes.
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+
+"""
+Usage:
+
+    python benchmarks/bench_arrays.py --size 1000000 --repeat 3
+
+Encodes NumPy arrays of about `--size` elements as arguments to a Q#
+callable (that is, maps them with `qsharp.serialization.map_tuples` and
+dumps the result as JSON), and reports the best time of `--repeat` runs,
+both for the current implementation and for the previous one, which
+mapped arrays one NumPy scalar at a time, along with the time spent by the
+current implementation in map_tuples alone. Does not need an IQ# kernel.
+"""
+
+## IMPORTS ##
+
+import argparse
+import json
+import timeit
+
+import numpy as np
+
+from qsharp.serialization import map_tuples
+from bench_serialization import recursive_map_tuples
+
+## FUNCTIONS ##
+
+def arrays(size):
+    """
+    Returns arrays of about `size` elements, keyed by the Q# type that they
+    are passed as.
+    """
+    rng = np.random.default_rng(42)
+    return {
+        'Double[]': rng.random(size),
+        'Int[]': rng.integers(0, 2**32, size),
+        'Bool[]': rng.random(size) < 0.5,
+        'Double[][]': rng.random((size // 1000, 1000)),
+        'Complex[]': rng.random(size // 4) + 1j * rng.random(size // 4),
+        '(Int, Double)[]': np.array(
+            list(zip(range(size // 4), rng.random(size // 4))),
+            dtype=[('index', np.int64), ('angle', np.float64)]
+        )
+    }
+
+def _as_json(value):
+    # The previous implementation left complex numbers as they were, so
+    # convert them to the same pairs as the current implementation does.
+    return json.dumps(value, default=lambda obj: map_tuples(obj))
+
+def best_time(fn, repeat):
+    return min(timeit.repeat(fn, number=1, repeat=repeat))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'argument':>16} {'elements':>9} {'previous':>10} {'current':>10} {'speed-up':>9} {'(mapping)':>10}")
+    for name, array in arrays(args.size).items():
+        if array.dtype.names is None:
+            # The previous implementation encoded the records of structured
+            # arrays as JSON arrays rather than as tuples.
+            assert _as_json(recursive_map_tuples(array)) == json.dumps(map_tuples(array))
+        before = best_time(lambda: _as_json(recursive_map_tuples(array)), args.repeat)
+        after = best_time(lambda: json.dumps(map_tuples(array)), args.repeat)
+        mapping = best_time(lambda: map_tuples(array), args.repeat)
+        print(f"{name:>16} {array.size:>9} {before:>10.4f} {after:>10.4f} {before / after:>8.2f}x {mapping:>10.4f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+##
+# bench_batch.py: Compares a loop of simulate calls against simulate_batch.
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+
+"""
+Usage:
+
+    python benchmarks/bench_batch.py --sets 10000 --batch-sizes 100 1000 10000
+
+Starts an IQ# kernel on the Microsoft.Quantum.SanityTests workspace used by
+the qsharp tests, and runs `IndexIntoTuple` once per argument set, first by
+calling `simulate` in a loop, then through `simulate_batch` with each of the
+given batch sizes.
+"""
+
+## IMPORTS ##
+
+import argparse
+import os
+import time
+from types import SimpleNamespace
+
+from qsharp.clients.iqsharp import IQSharpClient
+
+## CONSTANTS ##
+
+WORKSPACE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "qsharp", "tests")
+
+## FUNCTIONS ##
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sets", type=int, default=10000)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    args = parser.parse_args()
+
+    # The kernel loads its workspace from the current working directory.
+    os.chdir(WORKSPACE)
+    client = IQSharpClient()
+    client.start()
+    try:
+        while not client.is_ready():
+            time.sleep(0.5)
+        op = SimpleNamespace(_name="Microsoft.Quantum.SanityTests.IndexIntoTuple")
+        tuples = [(idx, str(idx)) for idx in range(4)]
+        kwargs_list = [{"count": idx % 4, "tuples": tuples} for idx in range(args.sets)]
+        expected = [tuples[idx % 4] for idx in range(args.sets)]
+        # Warm up.
+        client.simulate_batch(op, kwargs_list[:100], _quiet_=True)
+
+        start = time.perf_counter()
+        assert [client.simulate(op, _quiet_=True, **kwargs) for kwargs in kwargs_list] == expected
+        loop = time.perf_counter() - start
+        print(f"{'mode':>16} {'seconds':>9} {'sets/s':>10} {'speed-up':>9}")
+        print(f"{'loop':>16} {loop:>9.2f} {args.sets / loop:>10.1f} {1:>8.2f}x")
+
+        for batch_size in args.batch_sizes:
+            start = time.perf_counter()
+            results = []
+            for idx_start in range(0, args.sets, batch_size):
+                results.extend(client.simulate_batch(op, kwargs_list[idx_start:idx_start + batch_size], _quiet_=True))
+            assert results == expected
+            batched = time.perf_counter() - start
+            print(f"{f'batch={batch_size}':>16} {batched:>9.2f} {args.sets / batched:>10.1f} {loop / batched:>8.2f}x")
+    finally:
+        client.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+##
+# bench_decode_memory.py: Measures the peak memory used to decode large
+#     results sent by the IQ# kernel.
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+
+"""
+Usage:
+
+    python benchmarks/bench_decode_memory.py --size-mb 100
+
+Writes results of about `--size-mb` megabytes of JSON, shaped like the
+outputs of typical Q# callables, to temporary files, and decodes each of them
+in a fresh process: in two passes, as `unmap_tuples(loads(data))`; in a
+single pass, with `loads_tuples`; and lazily, by consuming `iter_array`.
+Reports the time taken and the peak resident memory used while decoding,
+over the memory already used to hold the JSON. Does not need an IQ# kernel.
+
+On Linux, peak resident memory is measured from the high-water mark in
+/proc/self/status, which is reset once the JSON has been read; elsewhere,
+the peak over the whole process is reported instead.
+"""
+
+## IMPORTS ##
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+## CONSTANTS ##
+
+METHODS = ('two-pass', 'loads_tuples', 'iter_array')
+
+## FUNCTIONS ##
+
+def write_payload(shape, size, file):
+    """
+    Writes a JSON array of about `size` bytes with items of the given shape,
+    one item at a time, such that the whole payload is never in memory.
+    """
+    if shape == 'Double[]':
+        item = lambda idx: repr(idx / 7)
+    elif shape == '(Int, Double)[]':
+        item = lambda idx: f'{{"@type":"@tuple","Item1":{idx},"Item2":{idx / 7!r}}}'
+    elif shape == 'Result[][]':
+        item = lambda idx: '[' + ','.join('1' if (idx >> bit) & 1 else '0' for bit in range(32)) + ']'
+    else:
+        raise ValueError(f"Unknown shape {shape!r}.")
+    written = file.write('[')
+    idx = 0
+    while written < size:
+        written += file.write((',' if idx else '') + item(idx))
+        idx += 1
+    file.write(']')
+
+def resident_memory():
+    """
+    Returns the current and peak resident memory of this process, in bytes,
+    or None for the current memory where that is not available.
+    """
+    try:
+        with open('/proc/self/status') as status:
+            fields = dict(line.split(':', 1) for line in status)
+        return int(fields['VmRSS'].split()[0]) * 1024, int(fields['VmHWM'].split()[0]) * 1024
+    except (OSError, KeyError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return None, peak if sys.platform == 'darwin' else peak * 1024
+
+def reset_peak_memory():
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+    except OSError:
+        pass
+
+def worker(method, path):
+    from qsharp.serialization import iter_array, loads, loads_tuples, unmap_tuples
+    with open(path, encoding='ascii') as file:
+        data = file.read()
+    reset_peak_memory()
+    baseline, _ = resident_memory()
+    start = time.perf_counter()
+    if method == 'two-pass':
+        result = unmap_tuples(loads(data))
+    elif method == 'loads_tuples':
+        result = loads_tuples(data)
+    else:
+        result = sum(1 for _ in iter_array(data))
+    elapsed = time.perf_counter() - start
+    _, peak = resident_memory()
+    del result
+    print(elapsed, peak - (baseline or 0))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=float, default=100)
+    parser.add_argument("--shapes", nargs="+", default=['Double[]', '(Int, Double)[]', 'Result[][]'])
+    parser.add_argument("--methods", nargs="+", default=list(METHODS))
+    parser.add_argument("--worker", nargs=2, metavar=("METHOD", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(*args.worker)
+        return
+
+    print(f"{'payload':>16} {'method':>13} {'MB':>8} {'seconds':>9} {'peak MB':>9} {'x payload':>10}")
+    for shape in args.shapes:
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as file:
+            write_payload(shape, int(args.size_mb * 2 ** 20), file)
+        try:
+            size = os.path.getsize(file.name)
+            for method in args.methods:
+                output = subprocess.run(
+                    [sys.executable, __file__, '--worker', method, file.name],
+                    check=True, stdout=subprocess.PIPE, universal_newlines=True
+                ).stdout.split()
+                elapsed, peak = float(output[0]), int(output[1])
+                print(
+                    f"{shape:>16} {method:>13} {size / 2 ** 20:>8.1f} {elapsed:>9.2f} "
+                    f"{peak / 2 ** 20:>9.1f} {peak / size:>9.2f}x"
+                )
+        finally:
+            os.unlink(file.name)
+
+if __name__ == "__main__":
+    main()
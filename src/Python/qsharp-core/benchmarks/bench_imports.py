@@ -0,0 +1,112 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+##
+# bench_imports.py: Measures the time taken to import Python modules once
+#     qsharp has been imported and its client has started.
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+
+"""
+Usage:
+
+    python benchmarks/bench_imports.py --modules 500 --probes 4 --latency 0.002
+
+Writes a Python project of `--modules` modules to a temporary directory,
+each of which probes for `--probes` optional dependencies that are not
+installed (as many libraries do with `try: import ... except ImportError`),
+then imports every module of that project once `import qsharp` has started
+its client. Imports that no other finder can load are passed to the finder
+for Q# namespaces, and so this reports the time taken both with the
+namespace index and with namespaces listed by the kernel for every import,
+along with how many times they were listed.
+
+Each run uses a fresh process with the mock client, whose listing of
+namespaces takes `--latency` seconds to stand in for a round trip to the
+IQ# kernel. Does not need an IQ# kernel.
+"""
+
+## IMPORTS ##
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+## FUNCTIONS ##
+
+def write_project(path, n_modules, n_probes):
+    package = os.path.join(path, 'benchproject')
+    os.mkdir(package)
+    with open(os.path.join(package, '__init__.py'), 'w') as file:
+        file.write('')
+    for idx in range(n_modules):
+        with open(os.path.join(package, f'mod_{idx}.py'), 'w') as file:
+            for idx_probe in range(n_probes):
+                file.write(
+                    f"try:\n"
+                    f"    import optional_dep_{idx}_{idx_probe}\n"
+                    f"except ImportError:\n"
+                    f"    pass\n"
+                )
+
+def worker(mode, path, n_modules, latency, n_namespaces):
+    os.environ['QSHARP_PY_CLIENT'] = 'mock'
+    import qsharp
+    import qsharp.clients.mock
+
+    calls = []
+    class SlowMockClient(qsharp.clients.mock.MockClient):
+        mock_operations = [f"Microsoft.Quantum.Bench{idx}.Op" for idx in range(n_namespaces)]
+
+        def get_available_operations(self):
+            calls.append(None)
+            time.sleep(latency)
+            return self.mock_operations
+
+    qsharp.client = SlowMockClient()
+    if mode == 'uncached':
+        # Clients that don't report a workspace version are asked for their
+        # namespaces on every lookup.
+        qsharp.client.workspace_version = None
+
+    sys.path.insert(0, path)
+    import importlib
+    start = time.perf_counter()
+    for idx in range(n_modules):
+        importlib.import_module(f'benchproject.mod_{idx}')
+    print(time.perf_counter() - start, len(calls))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", type=int, default=500)
+    parser.add_argument("--probes", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.002)
+    parser.add_argument("--namespaces", type=int, default=1000)
+    parser.add_argument("--worker", metavar="MODE", help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.worker, args.path, args.modules, args.latency, args.namespaces)
+        return
+
+    print(f"{'mode':>9} {'modules':>8} {'seconds':>9} {'listings':>9}")
+    with tempfile.TemporaryDirectory() as path:
+        write_project(path, args.modules, args.probes)
+        for mode in ('uncached', 'indexed'):
+            output = subprocess.run(
+                [
+                    sys.executable, __file__, '--worker', mode, '--path', path,
+                    '--modules', str(args.modules), '--latency', str(args.latency),
+                    '--namespaces', str(args.namespaces)
+                ],
+                check=True, stdout=subprocess.PIPE, universal_newlines=True
+            ).stdout.split()
+            print(f"{mode:>9} {args.modules:>8} {float(output[-2]):>9.3f} {int(output[-1]):>9}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+##
+# bench_numpy_results.py: Compares decoding arrays of numbers returned by Q#
+#     callables directly into NumPy arrays against converting decoded lists.
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+
+"""
+Usage:
+
+    python benchmarks/bench_numpy_results.py --size 1000000 --repeat 5
+
+Decodes outputs of Q# callables that are arrays of about `--size` numbers,
+booleans or results, from the JSON sent by the kernel, both as lists that
+are then converted with `np.array` and directly as NumPy arrays (that is,
+with `_as_numpy_=True`). Reports the best time of `--repeat` runs, and the
+peak memory allocated while decoding, as traced by tracemalloc. Does not
+need an IQ# kernel.
+"""
+
+## IMPORTS ##
+
+import argparse
+import timeit
+import tracemalloc
+
+import numpy as np
+
+from qsharp.serialization import dumps
+from qsharp.signatures import compile_codec
+
+## FUNCTIONS ##
+
+def outputs(size):
+    """
+    Returns the signature and output (as sent by the kernel) of typical
+    callables whose outputs have about `size` items, keyed by their type.
+    """
+    side = int(size ** 0.5)
+    return {
+        'Double[]': ("Angles () : Double[]", [idx / 7 for idx in range(size)]),
+        'Result[]': ("Measure () : Result[]", [idx % 2 for idx in range(size)]),
+        'Bool[]': ("Parities () : Bool[]", [idx % 3 == 0 for idx in range(size)]),
+        'Double[][]': ("Amplitudes () : Double[][]", [[(row + col) / 7 for col in range(side)] for row in range(side)])
+    }
+
+def peak_memory(fn, data):
+    tracemalloc.start()
+    try:
+        fn(data)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'output':>12} {'method':>10} {'seconds':>9} {'speed-up':>9} {'peak MB':>9}")
+    for name, (signature, output) in outputs(args.size).items():
+        codec = compile_codec(signature)
+        data = dumps(output)
+        methods = {
+            'np.array': lambda data: np.array(codec.decode_json(data, as_numpy=False)),
+            'as_numpy': lambda data: codec.decode_json(data, as_numpy=True)
+        }
+        assert np.array_equal(methods['np.array'](data), methods['as_numpy'](data))
+        baseline = None
+        for method, fn in methods.items():
+            seconds = min(timeit.repeat(lambda: fn(data), number=1, repeat=args.repeat))
+            baseline = baseline or seconds
+            print(
+                f"{name:>12} {method:>10} {seconds:>9.4f} {baseline / seconds:>8.2f}x "
+                f"{peak_memory(fn, data) / 2 ** 20:>9.1f}"
+            )
+
+if __name__ == "__main__":
+    main()
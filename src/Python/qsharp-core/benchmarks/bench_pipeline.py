@@ -0,0 +1,71 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+##
+# bench_pipeline.py: Compares calls per second of sequential and pipelined
+#     execution of small Q# calls.
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+
+"""
+Usage:
+
+    python benchmarks/bench_pipeline.py --calls 2000 --windows 1 8 32 128
+
+Starts an IQ# kernel on the Microsoft.Quantum.SanityTests workspace used by
+the qsharp tests and calls `EchoResult` `--calls` times, first one call at a
+time through `IQSharpClient.simulate`, then through `IQSharpClient.map`
+with each of the given pipeline windows.
+"""
+
+## IMPORTS ##
+
+import argparse
+import os
+import time
+from types import SimpleNamespace
+
+from qsharp.clients.iqsharp import IQSharpClient
+
+## CONSTANTS ##
+
+WORKSPACE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "qsharp", "tests")
+
+## FUNCTIONS ##
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--windows", type=int, nargs="+", default=[1, 8, 32, 128])
+    args = parser.parse_args()
+
+    # The kernel loads its workspace from the current working directory.
+    os.chdir(WORKSPACE)
+    client = IQSharpClient()
+    client.start()
+    try:
+        while not client.is_ready():
+            time.sleep(0.5)
+        op = SimpleNamespace(_name="Microsoft.Quantum.SanityTests.EchoResult")
+        kwargs_list = [{"input": idx % 2} for idx in range(args.calls)]
+        expected = [kwargs["input"] for kwargs in kwargs_list]
+        # Warm up.
+        client.map(op, kwargs_list[:100])
+
+        start = time.perf_counter()
+        assert [client.simulate(op, **kwargs) for kwargs in kwargs_list] == expected
+        sequential = args.calls / (time.perf_counter() - start)
+        print(f"{'mode':>14} {'calls/s':>10} {'speed-up':>9}")
+        print(f"{'sequential':>14} {sequential:>10.1f} {1:>8.2f}x")
+
+        for window in args.windows:
+            start = time.perf_counter()
+            assert client.map(op, kwargs_list, window=window) == expected
+            pipelined = args.calls / (time.perf_counter() - start)
+            print(f"{f'window={window}':>14} {pipelined:>10.1f} {pipelined / sequential:>8.2f}x")
+    finally:
+        client.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+##
+# bench_pool.py: Measures simulation throughput of the kernel pool client
+#     as a function of the number of kernels.
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+
+"""
+Usage:
+
+    python benchmarks/bench_pool.py --kernels 1 2 4 8 --calls 64
+
+For each pool size, starts a fresh `KernelPool`, compiles a small
+compute-bound Q# operation into every kernel, and then runs `--calls`
+simulations from as many Python threads as there are kernels. Reports the
+throughput in calls per second and the speed-up relative to the first
+pool size.
+"""
+
+## IMPORTS ##
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from qsharp.clients.pool import KernelPool
+
+## CONSTANTS ##
+
+WORKLOAD = """
+    open Microsoft.Quantum.Measurement;
+
+    operation PoolBenchmarkWorkload(nQubits : Int, depth : Int) : Result[] {
+        use qs = Qubit[nQubits];
+        for _ in 1..depth {
+            for q in qs {
+                H(q);
+                T(q);
+            }
+            for idx in 0..nQubits - 2 {
+                CNOT(qs[idx], qs[idx + 1]);
+            }
+        }
+        mutable results = [];
+        for q in qs {
+            set results += [MResetZ(q)];
+        }
+        return results;
+    }
+"""
+
+## FUNCTIONS ##
+
+def run(n_kernels : int, n_calls : int, n_qubits : int, depth : int) -> float:
+    pool = KernelPool(n_kernels=n_kernels)
+    pool.start()
+    try:
+        while not pool.is_ready():
+            time.sleep(0.5)
+        op = SimpleNamespace(_name=pool.compile(WORKLOAD)[0])
+        # Warm up every kernel once so that JIT costs are not counted.
+        with ThreadPoolExecutor(max_workers=n_kernels) as executor:
+            list(executor.map(lambda _: pool.simulate(op, nQubits=n_qubits, depth=1), range(n_kernels)))
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=n_kernels) as executor:
+            list(executor.map(lambda _: pool.simulate(op, nQubits=n_qubits, depth=depth), range(n_calls)))
+        elapsed = time.perf_counter() - start
+    finally:
+        pool.stop()
+    return n_calls / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--kernels", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--calls", type=int, default=64)
+    parser.add_argument("--qubits", type=int, default=14)
+    parser.add_argument("--depth", type=int, default=20)
+    args = parser.parse_args()
+
+    baseline = None
+    print(f"{'kernels':>8} {'calls/s':>10} {'speed-up':>9}")
+    for n_kernels in args.kernels:
+        throughput = run(n_kernels, args.calls, args.qubits, args.depth)
+        baseline = baseline or throughput
+        print(f"{n_kernels:>8} {throughput:>10.2f} {throughput / baseline:>8.2f}x")
+
+if __name__ == "__main__":
+    main()
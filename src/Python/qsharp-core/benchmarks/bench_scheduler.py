@@ -0,0 +1,76 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+##
+# bench_scheduler.py: Multithreaded stress test for the request scheduler of
+#     the IQ# client.
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+
+"""
+Usage:
+
+    python benchmarks/bench_scheduler.py --threads 16 --calls 50
+
+Starts one IQ# kernel, then has `--threads` Python threads each call a Q#
+function `--calls` times at the same time. Every call echoes a value unique
+to its caller, so that a reply routed to the wrong caller is detected.
+Reports throughput together with the scheduler's queue depth and wait-time
+metrics.
+"""
+
+## IMPORTS ##
+
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from qsharp.clients.iqsharp import IQSharpClient
+
+## CONSTANTS ##
+
+WORKLOAD = """
+    function SchedulerBenchmarkEcho(caller : Int, call : Int) : (Int, Int) {
+        return (caller, call);
+    }
+"""
+
+## FUNCTIONS ##
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--calls", type=int, default=50)
+    args = parser.parse_args()
+
+    client = IQSharpClient()
+    client.start()
+    try:
+        while not client.is_ready():
+            time.sleep(0.5)
+        op = SimpleNamespace(_name=client.compile(WORKLOAD)[0])
+
+        def caller(idx_caller):
+            for idx_call in range(args.calls):
+                result = client.simulate(op, caller=idx_caller, call=idx_call)
+                assert result == (idx_caller, idx_call), f"Caller {idx_caller} received a reply meant for {result}."
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as executor:
+            list(executor.map(caller, range(args.threads)))
+        elapsed = time.perf_counter() - start
+        stats = client.scheduler_stats()
+    finally:
+        client.stop()
+
+    n_calls = args.threads * args.calls
+    print(f"calls:             {n_calls}")
+    print(f"calls/s:           {n_calls / elapsed:.1f}")
+    print(f"max queue depth:   {stats.max_queue_depth}")
+    print(f"mean wait (ms):    {1000 * stats.mean_wait:.2f}")
+    print(f"max wait (ms):     {1000 * stats.max_wait:.2f}")
+
+if __name__ == "__main__":
+    main()
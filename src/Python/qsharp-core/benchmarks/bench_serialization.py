@@ -0,0 +1,140 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+##
+# bench_serialization.py: Compares map_tuples and unmap_tuples against their
+#     previous, recursive implementations.
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+
+"""
+Usage:
+
+    python benchmarks/bench_serialization.py --size 100000 --repeat 5
+
+Maps and unmaps payloads shaped like typical arguments to and results from
+Q# callables, each with about `--size` elements, and reports the best time
+of `--repeat` runs for the current implementations of
+`qsharp.serialization.map_tuples` and `unmap_tuples`, and for the recursive
+implementations that they replaced. Does not need an IQ# kernel.
+"""
+
+## IMPORTS ##
+
+import argparse
+import json
+import sys
+import timeit
+
+from qsharp.serialization import map_tuples, unmap_tuples
+
+## FUNCTIONS ##
+
+def recursive_map_tuples(obj):
+    """
+    The implementation of map_tuples before it was rewritten to use a work
+    list, kept for comparison.
+    """
+    np = sys.modules.get('numpy')
+    if isinstance(obj, tuple):
+        result = {
+            '@type': 'tuple'
+        }
+        max_tuple_length = 7
+        for i in range(min(len(obj), max_tuple_length)):
+            result[f"Item{i+1}"] = recursive_map_tuples(obj[i])
+        if len(obj) > max_tuple_length:
+            result["Rest"] = recursive_map_tuples(obj[max_tuple_length:])
+        return result
+    elif isinstance(obj, list) or (np and isinstance(obj, np.ndarray)):
+        result = []
+        for i in obj:
+            result.append(recursive_map_tuples(i))
+        return result
+    elif isinstance(obj, dict):
+        result = {}
+        for i in obj:
+            result[i] = recursive_map_tuples(obj[i])
+        return result
+    elif np and isinstance(obj, np.generic):
+        return obj.item()
+    else:
+        return obj
+
+def recursive_unmap_tuples(obj):
+    """
+    The implementation of unmap_tuples before it was rewritten to use a
+    work list, kept for comparison.
+    """
+    if isinstance(obj, dict):
+        if obj.get('@type', None) in ('tuple', '@tuple') or 'Item1' in obj:
+            values = []
+            while True:
+                item = f"Item{len(values) + 1}"
+                if item in obj:
+                    values.append(recursive_unmap_tuples(obj[item]))
+                else:
+                    break
+            return tuple(values)
+        return {
+            key: recursive_unmap_tuples(value)
+            for key, value in obj.items()
+        }
+    elif isinstance(obj, list):
+        return [recursive_unmap_tuples(value) for value in obj]
+    else:
+        return obj
+
+def payloads(size):
+    """
+    Returns payloads of about `size` elements, keyed by a description of
+    their shape.
+    """
+    return {
+        # e.g.: measurement results from many shots
+        'Result[]': [idx % 2 for idx in range(size)],
+        # e.g.: (outcome, count) pairs returned by simulate_shots
+        '(Int, Int)[]': [(idx, idx % 7) for idx in range(size // 2)],
+        # e.g.: a register of results per shot
+        'Result[][]': [[idx % 2] * 16 for idx in range(size // 16)],
+        # e.g.: (angles, (label, count)) arguments to a variational circuit
+        '(Double[], (String, Int))[]': [([0.5] * 4, (str(idx), idx)) for idx in range(size // 6)],
+        # e.g.: a user-defined type wrapping a long, nested list
+        'nested': _nested(size)
+    }
+
+def _nested(size):
+    value = 0
+    for idx in range(size // 2):
+        value = (idx, [value])
+    return value
+
+def best_time(fn, value, repeat):
+    return min(timeit.repeat(lambda: fn(value), number=1, repeat=repeat))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'payload':>28} {'codec':>10} {'recursive':>10} {'current':>10} {'speed-up':>9}")
+    for name, payload in payloads(args.size).items():
+        mapped = map_tuples(payload)
+        if name != 'nested':
+            # Comparing deeply nested payloads would hit the recursion limit.
+            assert unmap_tuples(json.loads(json.dumps(mapped))) == payload
+        for codec, current, recursive, value in (
+            ('map', map_tuples, recursive_map_tuples, payload),
+            ('unmap', unmap_tuples, recursive_unmap_tuples, mapped)
+        ):
+            try:
+                before = best_time(recursive, value, args.repeat)
+            except RecursionError:
+                before = float('nan')
+            after = best_time(current, value, args.repeat)
+            print(f"{name:>28} {codec:>10} {before:>10.4f} {after:>10.4f} {before / after:>8.2f}x")
+
+if __name__ == "__main__":
+    main()
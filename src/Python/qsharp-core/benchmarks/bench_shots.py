@@ -0,0 +1,76 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+##
+# bench_shots.py: Compares shots per second of calling a Q# operation in a
+#     Python loop and of running all shots in a single request.
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+
+"""
+Usage:
+
+    python benchmarks/bench_shots.py --shots 10000 --qubits 4
+
+Starts one IQ# kernel and measures `--qubits` qubits in uniform
+superposition `--shots` times, first with one `%simulate` request per shot,
+then with a single `%simulate_shots` and `%simulate_sparse_shots` request.
+"""
+
+## IMPORTS ##
+
+import argparse
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+from qsharp.clients.iqsharp import IQSharpClient
+from qsharp.results.histogram import Histogram
+
+## CONSTANTS ##
+
+WORKLOAD = """
+    open Microsoft.Quantum.Measurement;
+
+    operation ShotsBenchmarkFlip(nQubits : Int) : Result[] {
+        use qs = Qubit[nQubits];
+        ApplyToEach(H, qs);
+        return MultiM(qs);
+    }
+"""
+
+## FUNCTIONS ##
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--shots", type=int, default=10000)
+    parser.add_argument("--qubits", type=int, default=4)
+    args = parser.parse_args()
+
+    client = IQSharpClient()
+    client.start()
+    try:
+        while not client.is_ready():
+            time.sleep(0.5)
+        op = SimpleNamespace(_name=client.compile(WORKLOAD)[0])
+        # Warm up.
+        client.simulate_shots(op, 100, nQubits=args.qubits)
+
+        start = time.perf_counter()
+        loop = Counter(tuple(client.simulate(op, nQubits=args.qubits)) for _ in range(args.shots))
+        looped = args.shots / (time.perf_counter() - start)
+        print(f"{'mode':>22} {'shots/s':>10} {'speed-up':>9} {'outcomes':>9}")
+        print(f"{'loop':>22} {looped:>10.1f} {1:>8.2f}x {len(loop):>9}")
+
+        for method in ('simulate_shots', 'simulate_sparse_shots'):
+            start = time.perf_counter()
+            histogram = Histogram.from_counts(getattr(client, method)(op, args.shots, seed=42, nQubits=args.qubits))
+            rate = args.shots / (time.perf_counter() - start)
+            assert histogram.shots == args.shots
+            print(f"{method:>22} {rate:>10.1f} {rate / looped:>8.2f}x {len(histogram):>9}")
+    finally:
+        client.stop()
+
+if __name__ == "__main__":
+    main()
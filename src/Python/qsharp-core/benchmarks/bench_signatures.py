@@ -0,0 +1,87 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+##
+# bench_signatures.py: Compares codecs compiled from the signatures of Q#
+#     callables against map_tuples and unmap_tuples.
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+
+"""
+Usage:
+
+    python benchmarks/bench_signatures.py --size 100000 --repeat 5
+
+Encodes arguments to and decodes outputs from Q# callables with typical
+signatures, each with about `--size` elements, and reports the best time of
+`--repeat` runs both for `map_tuples` and `unmap_tuples` and for the codec
+compiled from the signature of each callable by `qsharp.signatures`. Does
+not need an IQ# kernel.
+"""
+
+## IMPORTS ##
+
+import argparse
+import json
+import timeit
+
+from qsharp.serialization import map_tuples, unmap_tuples
+from qsharp.signatures import compile_codec
+
+## FUNCTIONS ##
+
+def workloads(size):
+    """
+    Returns the signature, arguments and output (as loaded from the JSON
+    sent by the kernel) of typical calls, each with about `size` elements,
+    keyed by a description of their types.
+    """
+    pairs = [(idx, idx / 7) for idx in range(size // 2)]
+    return {
+        '(Int, Double)[] -> Unit': (
+            "Sweep (points : (Int, Double)[]) : Unit",
+            {'points': pairs},
+            {'@type': 'tuple'}
+        ),
+        'Double[] -> Result[]': (
+            "Measure (angles : Double[]) : Result[]",
+            {'angles': [idx / 7 for idx in range(size)]},
+            [idx % 2 for idx in range(size)]
+        ),
+        '((Int, Bool), String)[] -> (Result, Int)[]': (
+            "Label (labels : ((Int, Bool), String)[]) : (Result, Int)[]",
+            {'labels': [((idx, idx % 3 == 0), str(idx)) for idx in range(size // 3)]},
+            [{'@type': '@tuple', 'Item1': idx % 2, 'Item2': idx} for idx in range(size // 2)]
+        ),
+        'Int -> Result[][]': (
+            "Shots (nShots : Int) : Result[][]",
+            {'nShots': size // 16},
+            [[idx % 2] * 16 for idx in range(size // 16)]
+        )
+    }
+
+def best_time(fn, value, repeat):
+    return min(timeit.repeat(lambda: fn(value), number=1, repeat=repeat))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'signature':>44} {'codec':>7} {'generic':>10} {'compiled':>10} {'speed-up':>9}")
+    for name, (signature, kwargs, output) in workloads(args.size).items():
+        codec = compile_codec(signature)
+        assert json.dumps(codec.encode_arguments(kwargs)) == json.dumps(map_tuples(kwargs))
+        assert codec.decode_output(output) == unmap_tuples(output)
+        for direction, generic, compiled, value in (
+            ('encode', map_tuples, codec.encode_arguments, kwargs),
+            ('decode', unmap_tuples, codec.decode_output, output)
+        ):
+            before = best_time(generic, value, args.repeat)
+            after = best_time(compiled, value, args.repeat)
+            print(f"{name:>44} {direction:>7} {before:>10.4f} {after:>10.4f} {before / after:>8.2f}x")
+
+if __name__ == "__main__":
+    main()
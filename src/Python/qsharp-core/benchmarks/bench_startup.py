@@ -0,0 +1,64 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+##
+# bench_startup.py: Measures the latency from importing the qsharp package to
+#     the result of the first simulation.
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+
+"""
+Usage:
+
+    python benchmarks/bench_startup.py --runs 5
+
+Runs `--runs` fresh Python processes, each of which imports qsharp, compiles
+a small Q# function and simulates it once. Reports how long the import took
+and how long it took from the start of the import to the first result.
+"""
+
+## IMPORTS ##
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+## CONSTANTS ##
+
+CHILD = '''
+import json, time
+start = time.perf_counter()
+import qsharp
+imported = time.perf_counter()
+echo = qsharp.compile("function StartupBenchmarkEcho(value : Int) : Int { return value; }")
+assert echo.simulate(value=42) == 42
+simulated = time.perf_counter()
+print(json.dumps({"import": imported - start, "first_simulate": simulated - start}))
+'''
+
+## FUNCTIONS ##
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    timings = []
+    for _ in range(args.runs):
+        output = subprocess.run(
+            [sys.executable, "-c", CHILD], check=True, capture_output=True, text=True
+        ).stdout
+        # The last line holds the timings; anything before it is progress
+        # output from the qsharp package.
+        timings.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(f"{'phase':>16} {'median (s)':>11} {'min (s)':>9} {'max (s)':>9}")
+    for phase in ("import", "first_simulate"):
+        values = [timing[phase] for timing in timings]
+        print(f"{phase:>16} {statistics.median(values):>11.3f} {min(values):>9.3f} {max(values):>9.3f}")
+
+if __name__ == "__main__":
+    main()
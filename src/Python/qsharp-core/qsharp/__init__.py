@@ -13,18 +13,20 @@
 
 ## IMPORTS ##
 
+import os
 import sys
 from contextlib import contextmanager
-from typing import Any, List, Dict, Union
-from collections import defaultdict
-from distutils.version import LooseVersion
+from typing import Any, List, Dict, Optional, Union, TYPE_CHECKING
+from collections import defaultdict, deque
 
-from qsharp.clients import _start_client
-from qsharp.clients.iqsharp import IQSharpError
+from qsharp.clients import LazyClient
 from qsharp.loader import QSharpCallable, QSharpModuleFinder
 from qsharp.config import Config
 from qsharp.packages import Packages
 from qsharp.projects import Projects
+from qsharp.prewarm import Prewarm, PrewarmSpec
+from qsharp.clients.tracing import CallStats, tracer
+from qsharp.results.performance import KernelPerformance, PerformanceMonitor, DEFAULT_MONITOR_INTERVAL
 from qsharp.types import Result, Pauli
 from qsharp.utils import ImportFailure, try_import_qutip
 try:
@@ -32,12 +34,20 @@ try:
 except:
     __version__ = "<unknown>"
 
+if TYPE_CHECKING:
+    from distutils.version import LooseVersion
+    from qsharp.clients.iqsharp import IQSharpError
+
 ## EXPORTS ##
 
 __all__ = [
     'compile', 'reload',
     'get_available_operations', 'get_available_operations_by_namespace',
     'get_workspace_operations',
+    'get_async_client',
+    'prewarm',
+    'stats',
+    'performance', 'monitor',
     'config',
     'packages',
     'projects',
@@ -117,11 +127,59 @@ def get_available_operations_by_namespace() -> Dict[str, List[str]]:
 
     return dict(by_ns.items())
 
-def component_versions() -> Dict[str, LooseVersion]:
+def get_async_client():
+    """
+    Returns an asyncio-native client for the IQ# kernel, whose methods are
+    coroutines that can be awaited concurrently.
+
+    When possible, the returned client is attached to the same kernel as
+    `qsharp.client`, such that Q# code compiled through either client can be
+    used from the other. The client connects to the kernel on first use.
+    """
+    global _async_client
+    if _async_client is None:
+        from qsharp.clients.aio import AsyncIQSharpClient
+        # Getting the connection info may start qsharp.client, so leave it
+        # to the async client to do so without blocking its event loop.
+        def get_connection_info():
+            get = getattr(client, 'get_connection_info', None)
+            return get() if get is not None else None
+        _async_client = AsyncIQSharpClient(
+            connection_info=get_connection_info,
+            is_kernel_busy=lambda: client.busy
+        )
+    return _async_client
+
+def prewarm(packages : Optional[List[str]] = None, projects : Optional[List[str]] = None,
+            config : Optional[Dict[str, Any]] = None, reload : bool = False) -> Prewarm:
+    """
+    Adds packages and projects, and sets configuration options, on a
+    background thread, starting the IQ# kernel first if needed.
+
+    Later calls only wait for those steps that they depend on: for example,
+    `qsharp.config` waits only for configuration options to be set, while
+    compiling or simulating Q# code waits for every step to complete.
+
+    A prewarm spec can also be given as a JSON file with the keys
+    `packages`, `projects`, `config` and `reload`, whose path is set in the
+    `QSHARP_PY_PREWARM` environment variable before importing qsharp.
+
+    :param reload: If `True`, reloads the workspace once all packages and
+        projects have been added.
+    :returns: An object whose `wait` method waits for every step to
+        complete, raising the first error if any step failed.
+    """
+    return client.prewarm(PrewarmSpec(
+        packages=list(packages or []), projects=list(projects or []),
+        config=dict(config or {}), reload=reload
+    ))
+
+def component_versions() -> Dict[str, 'LooseVersion']:
     """
     Returns a dictionary from components of the IQ# kernel to their
     versions.
     """
+    from distutils.version import LooseVersion
     versions = client.component_versions()
     # Add in the qsharp Python package itself.
     versions["qsharp"] = LooseVersion(__version__)
@@ -130,8 +188,54 @@ def component_versions() -> Dict[str, LooseVersion]:
         versions['experimental'] = _experimental_versions
     return versions
 
+def stats(reset : bool = False) -> Dict[str, CallStats]:
+    """
+    Returns latency and payload statistics for the calls made to the IQ#
+    kernel since the qsharp package was imported, keyed by the kind of call
+    (e.g.: `%simulate`, `compile` or `map`).
+
+    Each value has the number of calls and failed calls, the total time
+    spent, estimated `p50`, `p95` and `p99` latencies in seconds, and the
+    number of bytes sent (`bytes_out`) and returned (`bytes_in`).
+
+    To follow each call as it completes, including the time spent in each
+    of its phases, add a hook with `qsharp.clients.tracing.tracer.add_hook`.
+    If the `internal.tracePerf` configuration option is set, the spans
+    passed to hooks also include the time spent in each task run by the
+    kernel (e.g.: `kernel:compile-snippets`).
+
+    :param reset: If `True`, clears the statistics after returning them.
+    """
+    return tracer.stats(reset=reset)
+
+def performance() -> KernelPerformance:
+    """
+    Returns the memory (in bytes) and CPU time (in seconds) used by the IQ#
+    kernel, as reported by the kernel itself.
+    """
+    return client.performance()
+
+def monitor(interval : float = DEFAULT_MONITOR_INTERVAL) -> PerformanceMonitor:
+    """
+    Returns a monitor that samples the memory and CPU time used by the IQ#
+    kernel every `interval` seconds while it is running, for example to find
+    how much memory simulating a given number of qubits takes:
+
+    .. code-block:: python
+
+        with qsharp.monitor(interval=0.5) as monitor:
+            MyOperation.simulate(nQubits=28)
+        monitor.to_csv("memory.csv")
+        peak_ram = monitor.to_numpy()['total_ram'].max()
+
+    Samples are measured from outside of the kernel process using psutil
+    where possible. Without psutil, each sample is a request to the kernel,
+    such that no samples are taken while the kernel is busy.
+    """
+    return PerformanceMonitor(client.sample_performance, interval=interval)
+
 @contextmanager
-def capture_diagnostics(passthrough: bool = False, as_qobj: bool = False) -> List[Any]:
+def capture_diagnostics(passthrough: bool = False, as_qobj: bool = False, max_items : Optional[int] = None, sink : Optional[str] = None) -> List[Any]:
     """
     Returns a context manager that captures diagnostics output from running Q#
     programs into a list.
@@ -172,6 +276,14 @@ def capture_diagnostics(passthrough: bool = False, as_qobj: bool = False) -> Lis
         captured diagnostics representing quantum states and operations into
         QuTiP objects. This option requires that QuTiP is installed and
         can be imported.
+    :param max_items: If given, only the last `max_items` diagnostics are
+        kept, in a `collections.deque`.
+    :param sink: If given, each diagnostic is written to this path as a
+        line of JSON as soon as it is captured, and a
+        `qsharp.results.diagnostics.DiagnosticsFile` is returned instead of
+        a list. That file reads diagnostics back one at a time when iterated
+        over, such that memory use does not grow with the number of
+        diagnostics captured.
     """
     # Before proceeding, check that if we were asked to convert to qobj data
     # that we can actually import qutip.
@@ -185,8 +297,18 @@ def capture_diagnostics(passthrough: bool = False, as_qobj: bool = False) -> Lis
 
         from qsharp.qobj import convert_diagnostic_to_qobj
 
-    processed_data = []
-    with client.capture_diagnostics(passthrough=passthrough) as data:
+    with client.capture_diagnostics(passthrough=passthrough, max_items=max_items, sink=sink) as data:
+        if sink is not None:
+            # Diagnostics written to a file are converted as they are read.
+            if as_qobj:
+                def convert(diagnostic):
+                    converted = convert_diagnostic_to_qobj(diagnostic)
+                    return diagnostic if converted is None else converted
+                data.convert = convert
+            yield data
+            return
+
+        processed_data = [] if max_items is None else deque(maxlen=max_items)
         yield processed_data
 
         # Apply any postprocessing needed here and append to processed_data.
@@ -197,14 +319,28 @@ def capture_diagnostics(passthrough: bool = False, as_qobj: bool = False) -> Lis
                     diagnostic = converted
             processed_data.append(diagnostic)
 
+def __getattr__(name : str) -> Any:
+    # IQSharpError is defined alongside the IQ# client, which depends on
+    # Jupyter and ZeroMQ; import it only when first asked for, so that
+    # importing qsharp stays fast.
+    if name == 'IQSharpError':
+        from qsharp.clients.iqsharp import IQSharpError
+        return IQSharpError
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 ## STARTUP ##
 
-client = _start_client()
+# The IQ# kernel is only started when the client is first used.
+client = LazyClient()
 config = Config(client)
 packages = Packages(client)
 projects = Projects(client)
+_async_client = None
 _experimental_versions = None
 
+if os.getenv("QSHARP_PY_PREWARM"):
+    client.prewarm(PrewarmSpec.from_file(os.environ["QSHARP_PY_PREWARM"]))
+
 # Make sure that we're last on the meta_path so that actual modules are loaded
 # first.
 sys.meta_path.append(QSharpModuleFinder())
@@ -29,6 +29,14 @@ __all__ = [
     'status',
     'output',
     'jobs',
+    'connect_async',
+    'target_async',
+    'target_capability_async',
+    'submit_async',
+    'execute_async',
+    'status_async',
+    'output_async',
+    'jobs_async',
     'AzureTarget',
     'AzureJob',
     'AzureError',
@@ -192,6 +200,76 @@ def jobs(filter : str = '', count : int = 30, **params) -> List[AzureJob]:
     if "error_code" in result: raise AzureError(result)
     return [AzureJob(job) for job in result]
 
+async def connect_async(**params) -> List[AzureTarget]:
+    """
+    Coroutine version of `connect`, which does not block the running event
+    loop.
+    """
+    result = await qsharp.get_async_client()._execute_magic(f"azure.connect", raise_on_stderr=False, **params)
+    if "error_code" in result: raise AzureError(result)
+    return [AzureTarget(target) for target in result]
+
+async def target_async(name : str = '', **params) -> AzureTarget:
+    """
+    Coroutine version of `target`, which does not block the running event
+    loop.
+    """
+    result = await qsharp.get_async_client()._execute_magic(f"azure.target {name}", raise_on_stderr=False, **params)
+    if "error_code" in result: raise AzureError(result)
+    return AzureTarget(result)
+
+async def target_capability_async(name : str = '', **params) -> Dict:
+    """
+    Coroutine version of `target_capability`, which does not block the
+    running event loop.
+    """
+    result = await qsharp.get_async_client()._execute_magic(f"azure.target-capability {name}", raise_on_stderr=False, **params)
+    if "error_code" in result: raise AzureError(result)
+    return result
+
+async def submit_async(op : qsharp.QSharpCallable, **params) -> AzureJob:
+    """
+    Coroutine version of `submit`, which does not block the running event
+    loop.
+    """
+    result = await qsharp.get_async_client()._execute_callable_magic("azure.submit", op, raise_on_stderr=False, **params)
+    if "error_code" in result: raise AzureError(result)
+    return AzureJob(result)
+
+async def execute_async(op : qsharp.QSharpCallable, **params) -> AzureResult:
+    """
+    Coroutine version of `execute`, which does not block the running event
+    loop while waiting for the job to complete.
+    """
+    (result, content) = await qsharp.get_async_client()._execute_callable_magic("azure.execute", op, raise_on_stderr=False, return_full_result=True, **params)
+    return process_result(result, content)
+
+async def status_async(jobId : str = '', **params) -> AzureJob:
+    """
+    Coroutine version of `status`, which does not block the running event
+    loop.
+    """
+    result = await qsharp.get_async_client()._execute_magic(f"azure.status {jobId}", raise_on_stderr=False, **params)
+    if "error_code" in result: raise AzureError(result)
+    return AzureJob(result)
+
+async def output_async(jobId : str = '', **params) -> AzureResult:
+    """
+    Coroutine version of `output`, which does not block the running event
+    loop.
+    """
+    (result, content) = await qsharp.get_async_client()._execute_magic(f"azure.output {jobId}", raise_on_stderr=False, return_full_result=True, **params)
+    return process_result(result, content)
+
+async def jobs_async(filter : str = '', count : int = 30, **params) -> List[AzureJob]:
+    """
+    Coroutine version of `jobs`, which does not block the running event
+    loop.
+    """
+    result = await qsharp.get_async_client()._execute_magic(f"azure.jobs \"{filter}\" count={count}", raise_on_stderr=False, **params)
+    if "error_code" in result: raise AzureError(result)
+    return [AzureJob(job) for job in result]
+
 def process_result(result, content):
     if "error_code" in result: raise AzureError(result)
     # Simple resource estimation job
@@ -10,10 +10,16 @@
 
 import os
 import sys
-import time
+import glob
 import logging
-import jupyter_client
-from distutils.util import strtobool
+import threading
+from typing import Any, Callable, List, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from qsharp.prewarm import Prewarm, PrewarmSpec
+
+STARTUP_TIMEOUT = 20
+FIRST_READY_TIMEOUT = 1
 
 class IQSharpNotInstalledError(Exception):
     pass
@@ -21,21 +27,60 @@ class IQSharpNotInstalledError(Exception):
 class IQSharpNotAvailableError(Exception):
     pass
 
+def _find_connection_files(path : Optional[str]) -> List[str]:
+    """
+    Given the path to either a Jupyter connection file or a directory of
+    connection files, returns the paths of all connection files found.
+    """
+    if not path:
+        return []
+    if os.path.isdir(path):
+        return sorted(glob.glob(os.path.join(path, "*.json")))
+    return [path]
+
+def _wait_until_ready(client, timeout, logger) -> bool:
+    try:
+        return client.wait_until_ready(timeout=timeout)
+    except Exception as ex:
+        logger.debug('Exception while checking Q# environment.', exc_info=ex)
+        return False
+
 def _start_client():
     logger = logging.getLogger(__name__)
 
     client_name =  os.getenv("QSHARP_PY_CLIENT", "iqsharp")
 
+    # Allow users to override what kernel is used, making it easier to
+    # test kernels side-by-side.
+    kernel_name =  os.getenv("QSHARP_PY_IQSHARP_KERNEL_NAME", "iqsharp")
+
+    # Attach to kernels that are already running (e.g.: kernels started by
+    # `python -m qsharp.server`), rather than starting new kernels.
+    connection_files = _find_connection_files(os.getenv("QSHARP_PY_CONNECTION_FILE"))
+
     if client_name == "iqsharp":
-        # Allow users to override what kernel is used, making it easier to
-        # test kernels side-by-side.
-        kernel_name =  os.getenv("QSHARP_PY_IQSHARP_KERNEL_NAME", "iqsharp")
         import qsharp.clients.iqsharp
-        client = qsharp.clients.iqsharp.IQSharpClient(kernel_name=kernel_name)
+        if connection_files:
+            # Spread processes sharing a server across its kernels.
+            connection_file = connection_files[os.getpid() % len(connection_files)]
+            client = qsharp.clients.iqsharp.IQSharpClient(connection_file=connection_file)
+        else:
+            client = qsharp.clients.iqsharp.IQSharpClient(kernel_name=kernel_name)
+    elif client_name == "pool":
+        import qsharp.clients.pool
+        if connection_files:
+            remaining_files = iter(connection_files)
+            client = qsharp.clients.pool.KernelPool(
+                n_kernels=len(connection_files),
+                client_factory=lambda: qsharp.clients.iqsharp.IQSharpClient(connection_file=next(remaining_files))
+            )
+        else:
+            client = qsharp.clients.pool.KernelPool(kernel_name=kernel_name)
     elif client_name == "mock":
         import qsharp.clients.mock
         client = qsharp.clients.mock.MockClient()
 
+    import jupyter_client
     try:
         client.start()
     except jupyter_client.kernelspec.NoSuchKernel as ex:
@@ -44,22 +89,22 @@ def _start_client():
         print(message)
         raise IQSharpNotInstalledError(message)
 
-    # Check if the server is up and running:
-    server_ready = False
-    for idx_attempt in range(20):
-        try:
-            server_ready = client.is_ready()
-            if server_ready:
-                break
-            if idx_attempt == 0:
-                print("Preparing Q# environment...")
-            else:
-                print(".", end='', flush=True)
-            time.sleep(1)
-        except Exception as ex:
-            logger.debug('Exception while checking Q# environment.', exc_info=ex)
-            print("!", end='', flush=True)
-            time.sleep(1)
+    # Optionally restart kernels that exit or grow too large, replaying
+    # their state.
+    watchdog_interval = os.getenv("QSHARP_PY_WATCHDOG_INTERVAL")
+    max_memory_mb = os.getenv("QSHARP_PY_KERNEL_MAX_MEMORY_MB")
+    if (watchdog_interval or max_memory_mb) and hasattr(client, 'enable_watchdog'):
+        client.enable_watchdog(
+            interval=float(watchdog_interval) if watchdog_interval else None,
+            max_memory=int(float(max_memory_mb) * 2**20) if max_memory_mb else None
+        )
+
+    # Check if the server is up and running. Most kernels are ready well
+    # within the first second, so we only report progress after that.
+    server_ready = _wait_until_ready(client, FIRST_READY_TIMEOUT, logger)
+    if not server_ready:
+        print("Preparing Q# environment...")
+        server_ready = _wait_until_ready(client, STARTUP_TIMEOUT - FIRST_READY_TIMEOUT, logger)
     if not server_ready:
         message = "Q# environment was not available in allocated time." + \
             "\nPlease check the instructions at https://aka.ms/qdk-install/python."
@@ -67,3 +112,107 @@ def _start_client():
         raise IQSharpNotAvailableError(message)
 
     return client
+
+def _start_in_background() -> bool:
+    return os.getenv("QSHARP_PY_START_IN_BACKGROUND", "false").lower() in ("1", "true", "yes", "on")
+
+class LazyClient(object):
+    """
+    Stands in for a Q# client, starting that client only when it is first
+    used, such that importing the qsharp package does not start an IQ#
+    kernel.
+
+    If `in_background` is set, the client is started right away on a
+    background thread, and the first use waits for that thread to finish.
+    By default, `in_background` is read from the
+    `QSHARP_PY_START_IN_BACKGROUND` environment variable.
+    """
+
+    def __init__(self, start_client : Callable[[], Any] = _start_client, in_background : Optional[bool] = None):
+        self._start_client = start_client
+        self._client = None
+        self._error = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._prewarm = None
+        if in_background is None:
+            in_background = _start_in_background()
+        if in_background:
+            self._thread = threading.Thread(target=self._start_from_thread, name="qsharp-client-start", daemon=True)
+            self._thread.start()
+
+    def __repr__(self) -> str:
+        if self._client is None:
+            return "<LazyClient (not started)>"
+        return f"<LazyClient for {self._client!r}>"
+
+    @property
+    def started(self) -> bool:
+        """
+        Whether the underlying client has been started.
+        """
+        return self._client is not None
+
+    @property
+    def busy(self) -> bool:
+        # Checking must not start the client, as this is called while
+        # resolving imports. A client that is still starting is reported as
+        # busy, since starting it may itself need to import modules.
+        client = self._client
+        return client.busy if client is not None else self._lock.locked()
+
+    @property
+    def prewarming(self) -> bool:
+        """
+        Whether prewarm steps are still running against the client.
+        """
+        prewarm = self._prewarm
+        return prewarm is not None and not prewarm.done
+
+    def get(self) -> Any:
+        """
+        Returns the underlying client, starting it if needed.
+        """
+        client = self._client
+        if client is not None:
+            return client
+        if self._thread is not None:
+            self._thread.join()
+            if self._error is not None:
+                raise self._error
+        with self._lock:
+            if self._client is None:
+                self._client = self._start_client()
+            return self._client
+
+    def prewarm(self, spec : "PrewarmSpec") -> "Prewarm":
+        """
+        Starts the client if needed, and applies a prewarm spec to it, both
+        on a background thread. Until each step of the spec has completed,
+        calls through this proxy that depend on that step wait for it.
+        """
+        from qsharp.prewarm import Prewarm
+        self._prewarm = Prewarm(spec, after=self._prewarm)
+        self._prewarm.start(self.get)
+        return self._prewarm
+
+    def _start_from_thread(self):
+        try:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._start_client()
+        except BaseException as ex:
+            self._error = ex
+
+    def __getattr__(self, name : str) -> Any:
+        # Only called for attributes not found on the proxy itself. Special
+        # names and the proxy's own state (e.g.: while copying the proxy,
+        # before __init__ has run) are never forwarded.
+        if name.startswith('__') or name in LazyClient._own_attributes:
+            raise AttributeError(name)
+        prewarm = self._prewarm
+        if prewarm is not None and not prewarm.done:
+            prewarm.wait_for(name)
+        return getattr(self.get(), name)
+
+    _own_attributes = frozenset({'_start_client', '_client', '_error', '_lock', '_thread', '_prewarm'})
@@ -0,0 +1,450 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+##
+# aio.py: asyncio-native client for the IQ# Jupyter kernel.
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+
+## IMPORTS ##
+
+import asyncio
+import atexit
+import os
+import sys
+import jupyter_client
+
+from typing import List, Dict, Callable, Any, Optional, Union
+from distutils.version import LooseVersion
+
+from qsharp.clients.iqsharp import IQSharpClient, IQSharpError, DEFAULT_TIMEOUT, INTERRUPT_TIMEOUT, display_raw, _output_decoder, _user_agent_extra
+from qsharp.serialization import map_tuples, dumps, loads_tuples
+from qsharp.signatures import callable_codec
+
+## LOGGING ##
+
+import logging
+logger = logging.getLogger(__name__)
+
+## CLASSES ##
+
+class _PendingRequest(object):
+    """
+    Collects the messages sent by the kernel in response to a single
+    execute request, as identified by the msg_id of that request.
+    """
+    def __init__(self, raise_on_stderr : bool, display_data_handler : Optional[Callable[[Any], None]]):
+        self.results = []
+        self.errors = []
+        self.raise_on_stderr = raise_on_stderr
+        self.display_data_handler = display_data_handler
+        self.reply = asyncio.get_running_loop().create_future()
+        self.idle = asyncio.Event()
+        # Whether the kernel has started running this request, and whether
+        # the caller has stopped waiting for it.
+        self.running = False
+        self.abandoned = False
+
+    @property
+    def finished(self) -> bool:
+        return self.reply.done() and self.idle.is_set()
+
+    def on_iopub(self, msg):
+        msg_type = msg['msg_type']
+        content = msg['content']
+        if msg_type == 'status':
+            if content['execution_state'] == 'busy':
+                self.running = True
+            elif content['execution_state'] == 'idle':
+                self.idle.set()
+        elif self.abandoned:
+            # Nobody is waiting for output from abandoned requests.
+            pass
+        elif msg_type in ('execute_result', 'render_execution_path'):
+            self.results.append(msg)
+        elif msg_type == 'display_data':
+            if self.display_data_handler is not None:
+                self.display_data_handler(msg)
+        elif msg_type == 'stream':
+            if self.raise_on_stderr and content['name'] == 'stderr':
+                self.errors.append(content['text'])
+            else:
+                stream = sys.stderr if content['name'] == 'stderr' else sys.stdout
+                stream.write(content['text'])
+        elif msg_type == 'error':
+            print('\n'.join(content['traceback']), file=sys.stderr)
+
+    def on_reply(self, msg):
+        if not self.reply.done():
+            self.reply.set_result(msg)
+
+    async def wait(self):
+        reply = await self.reply
+        await self.idle.wait()
+        return reply
+
+class AsyncIQSharpClient(object):
+    """
+    Client for the IQ# kernel whose methods are coroutines, such that an
+    asyncio application can keep many requests in flight at once without
+    blocking its event loop.
+
+    Replies and output messages are matched to the request that caused them
+    by the msg_id in their parent header, so that concurrent requests never
+    observe each other's output. The kernel itself still executes requests
+    in the order in which they were sent.
+
+    If `connection_info` is given, the client attaches to an already
+    running kernel (for instance, the kernel used by `qsharp.client`)
+    instead of starting a new one. It can also be given as a function
+    returning the connection info (or None, to start a new kernel after
+    all), which is called from a worker thread on first use, so that
+    starting the kernel it describes does not block the event loop.
+
+    Requests that no caller is waiting for anymore are interrupted once the
+    kernel starts running them, but only if no other request is in flight
+    on that kernel, as the interrupt would otherwise risk stopping that
+    request instead. Requests sent by other clients of an attached kernel
+    are only known through `is_kernel_busy`, if given; without it, this
+    client never interrupts an attached kernel, and abandoned requests run
+    to completion instead.
+    """
+    kernel_manager = None
+    kernel_client = None
+
+    display_data_callback: Optional[Callable[[Any], bool]] = None
+
+    def __init__(self, kernel_name: str = 'iqsharp',
+                 connection_info : Union[Dict[str, Any], Callable[[], Optional[Dict[str, Any]]], None] = None,
+                 is_kernel_busy : Optional[Callable[[], bool]] = None):
+        self._kernel_name = kernel_name
+        self._connection_info = connection_info
+        self._is_kernel_busy = is_kernel_busy
+        self._pending : Dict[str, _PendingRequest] = {}
+        self._routers : List[asyncio.Task] = []
+        self._start_lock : Optional[asyncio.Lock] = None
+        self._loop : Optional[asyncio.AbstractEventLoop] = None
+
+    ## Server Lifecycle ##
+
+    async def start(self):
+        if callable(self._connection_info):
+            self._connection_info = await asyncio.get_running_loop().run_in_executor(None, self._connection_info)
+        if self._connection_info is None and self.kernel_manager is None:
+            logger.info("Starting IQ# kernel...")
+            env = os.environ.copy()
+            env["IQSHARP_USER_AGENT"] = f"qsharp.py{_user_agent_extra}"
+            self.kernel_manager = jupyter_client.AsyncKernelManager(kernel_name=self._kernel_name)
+            await self.kernel_manager.start_kernel(env=env)
+            # Kernels are normally shut down by stop or aclose, but make sure
+            # that they don't outlive this process if neither is awaited.
+            atexit.register(self._shutdown_at_exit)
+
+        if self.kernel_manager is not None:
+            self.kernel_client = self.kernel_manager.client()
+        else:
+            logger.info("Attaching to running IQ# kernel...")
+            self.kernel_client = jupyter_client.AsyncKernelClient()
+            self.kernel_client.load_connection_info(self._connection_info)
+        self.kernel_client.start_channels()
+        await self.kernel_client.wait_for_ready(timeout=DEFAULT_TIMEOUT)
+        # Only start routing once the kernel is ready, as wait_for_ready
+        # consumes shell replies itself.
+        self._routers = [
+            asyncio.ensure_future(self._route(self.kernel_client.get_iopub_msg, _PendingRequest.on_iopub)),
+            asyncio.ensure_future(self._route(self.kernel_client.get_shell_msg, _PendingRequest.on_reply))
+        ]
+
+    async def stop(self):
+        self._detach()
+        if self.kernel_manager is not None:
+            atexit.unregister(self._shutdown_at_exit)
+            await self.kernel_manager.shutdown_kernel()
+            self.kernel_manager = None
+
+    async def aclose(self):
+        """
+        Shuts down the kernel started by this client, if any, and closes
+        its connection to the kernel.
+        """
+        await self.stop()
+
+    async def __aenter__(self) -> "AsyncIQSharpClient":
+        await self._ensure_started()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    def _shutdown_at_exit(self):
+        # Don't use logger here, for the same reasons as IQSharpClient.stop.
+        # The event loop that started the kernel has usually been closed by
+        # now, so kill the kernel from a new loop rather than asking it to
+        # shut down over channels that belong to the old one.
+        try:
+            self.kernel_client = None
+            asyncio.run(self.kernel_manager.shutdown_kernel(now=True))
+        except:
+            pass
+        self.kernel_manager = None
+
+    @property
+    def started(self) -> bool:
+        return bool(self._routers)
+
+    async def interrupt(self) -> None:
+        """
+        Asks the kernel to stop running its current request.
+
+        Most callers should cancel the task awaiting a request or set a
+        `_timeout_` instead, as those only interrupt the kernel once it
+        starts running that request, and discard its remaining output.
+        """
+        self._send_interrupt()
+
+    ## Public Interface ##
+
+    @property
+    def busy(self) -> bool:
+        # Requests are never rejected for being concurrent, but report
+        # whether any are outstanding.
+        return bool(self._pending)
+
+    async def compile(self, body):
+        return await self._execute(body)
+
+    async def get_available_operations(self) -> List[str]:
+        return await self._execute('%who', raise_on_stderr=False)
+
+    async def get_operation_metadata(self, name : str) -> Dict[str, Any]:
+        return await self._execute(f"?{name}")
+
+    async def get_workspace_operations(self) -> List[str]:
+        return await self._execute("%workspace")
+
+    async def reload(self) -> None:
+        return await self._execute(f"%workspace reload", raise_on_stderr=True)
+
+    async def get_config(self) -> Dict[str, object]:
+        raw = await self._execute(f"%config", raise_on_stderr=True)
+        config_settings = {}
+        for row in raw["rows"]:
+            config_settings[row['Key']] = row['Value']
+        return config_settings
+
+    async def set_config(self, name : str, value : object) -> None:
+        from numbers import Number
+        if isinstance(value, bool):
+            await self._execute(f"%config {name}={'true' if value else 'false'}", raise_on_stderr=True)
+        elif isinstance(value, Number):
+            await self._execute(f"%config {name}={value}", raise_on_stderr=True)
+        else:
+            await self._execute(f"%config {name}='{value}'", raise_on_stderr=True)
+
+    async def add_package(self, name : str) -> None:
+        return await self._execute(f"%package {name}", raise_on_stderr=True)
+
+    async def get_packages(self) -> List[str]:
+        return await self._execute("%package", raise_on_stderr=False)
+
+    async def add_project(self, path : str) -> None:
+        return await self._execute(f"%project {path}", raise_on_stderr=True)
+
+    async def get_projects(self) -> List[str]:
+        return await self._execute("%project", raise_on_stderr=False)
+
+    async def simulate(self, op, **kwargs) -> Any:
+        kwargs.setdefault('_timeout_', None)
+        return await self._execute_callable_magic('simulate', op, **kwargs)
+
+    async def simulate_sparse(self, op, **kwargs) -> Any:
+        kwargs.setdefault('_timeout_', None)
+        return await self._execute_callable_magic('simulate_sparse', op, **kwargs)
+
+    async def toffoli_simulate(self, op, **kwargs) -> Any:
+        kwargs.setdefault('_timeout_', None)
+        return await self._execute_callable_magic('toffoli', op, **kwargs)
+
+    async def simulate_noise(self, op, **kwargs) -> Any:
+        kwargs.setdefault('_timeout_', None)
+        return await self._execute_callable_magic('simulate_noise', op, **kwargs)
+
+    async def trace(self, op, **kwargs) -> Any:
+        return await self._execute_callable_magic('trace', op, _quiet_ = True, **kwargs)
+
+    async def compile_to_qir(self, op, **kwargs) -> None:
+        return await self._execute_callable_magic('qir', op, **kwargs)
+
+    async def component_versions(self, **kwargs) -> Dict[str, LooseVersion]:
+        """
+        Returns a dictionary from components of the IQ# kernel to their
+        versions.
+        """
+        versions = {}
+        def capture(msg):
+            data = loads_tuples(IQSharpClient._get_qsharp_data(msg["content"]))
+            for component, version in data["rows"]:
+                versions[component] = LooseVersion(version)
+        await self._execute("%version", display_data_handler=capture, _quiet_=True, **kwargs)
+        return versions
+
+    ## Internal-Use Methods ##
+
+    def _detach(self):
+        for router in self._routers:
+            router.cancel()
+        self._routers = []
+        # Abandoned requests can no longer be routed, and so never finish.
+        for msg_id in [msg_id for msg_id, request in self._pending.items() if request.abandoned]:
+            del self._pending[msg_id]
+        if self.kernel_client is not None:
+            self.kernel_client.stop_channels()
+        self.kernel_client = None
+
+    async def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Sockets and routing tasks belong to the event loop that
+            # created them, so reconnect if we are now called from a
+            # different loop (e.g.: from a second call to asyncio.run).
+            self._detach()
+            self._loop = loop
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if not self.started:
+                await self.start()
+
+    async def _route(self, get_msg, handler):
+        while True:
+            msg = await get_msg()
+            msg_id = msg['parent_header'].get('msg_id')
+            request = self._pending.get(msg_id)
+            if request is not None:
+                handler(request, msg)
+                if request.abandoned:
+                    if request.finished:
+                        del self._pending[msg_id]
+                    elif msg['msg_type'] == 'status' and msg['content']['execution_state'] == 'busy':
+                        self._interrupt_abandoned(msg_id)
+
+    def _send_interrupt(self):
+        logger.debug("Interrupting IQ# kernel.")
+        # As for IQSharpClient.interrupt, ask the kernel directly over its
+        # control channel rather than signalling the .NET process.
+        msg = self.kernel_client.session.msg('interrupt_request', {})
+        self.kernel_client.control_channel.send(msg)
+
+    def _abandon(self, msg_id : str) -> None:
+        """
+        Interrupts the request `msg_id`, now or once the kernel starts
+        running it, as no caller is waiting for it anymore, unless other
+        requests are in flight. Its remaining output is dropped, and it is
+        forgotten once it has finished.
+        """
+        request = self._pending[msg_id]
+        request.abandoned = True
+        if request.finished:
+            del self._pending[msg_id]
+            return
+        # Either this request or an earlier abandoned one may be running,
+        # and abandoning this request may be what makes it safe to
+        # interrupt the kernel.
+        for running_id, running in self._pending.items():
+            if running.abandoned and running.running and not running.idle.is_set():
+                self._interrupt_abandoned(running_id)
+                break
+
+    def _interrupt_abandoned(self, msg_id : str) -> None:
+        # The kernel stops whichever request it is running once the
+        # interrupt arrives, which need not be the abandoned request if any
+        # other request is queued behind it.
+        in_flight = any(not request.abandoned and not request.idle.is_set() for request in self._pending.values())
+        if self.kernel_manager is None:
+            in_flight = in_flight or self._is_kernel_busy is None or self._is_kernel_busy()
+        if in_flight:
+            logger.info("Not interrupting IQ# kernel to abandon a request, as other requests may be in flight; it will run to completion.")
+            return
+        logger.info("Interrupting IQ# kernel to abandon a request.")
+        try:
+            self._send_interrupt()
+        except Exception as ex:
+            logger.warning("Failed to interrupt IQ# kernel.", exc_info=ex)
+        asyncio.get_running_loop().call_later(INTERRUPT_TIMEOUT, self._warn_if_pending, msg_id)
+
+    def _warn_if_pending(self, msg_id : str) -> None:
+        if msg_id in self._pending:
+            logger.warning(f"IQ# kernel did not stop within {INTERRUPT_TIMEOUT} seconds of being interrupted; later requests will wait for it.")
+
+    async def _execute_magic(self, magic : str, raise_on_stderr : bool = False, _quiet_ : bool = False, return_full_result=False, **kwargs) -> Any:
+        _timeout_ = kwargs.pop('_timeout_', DEFAULT_TIMEOUT)
+        _encode_ = kwargs.pop('_encode_', map_tuples)
+        _decode_ = kwargs.pop('_decode_', None)
+        return await self._execute(
+            f'%{magic} {dumps(_encode_(kwargs))}',
+            raise_on_stderr=raise_on_stderr, _quiet_=_quiet_, _timeout_=_timeout_, return_full_result=return_full_result,
+            decode=_decode_
+        )
+
+    async def _execute_callable_magic(self, magic : str, op,
+            raise_on_stderr : bool = False,
+            _quiet_ : bool = False,
+            **kwargs
+    ) -> Any:
+        codec = callable_codec(op)
+        decode = _output_decoder(codec, magic, lazy=kwargs.pop('_lazy_', False), as_numpy=kwargs.pop('_as_numpy_', None))
+        return await self._execute_magic(
+            f"{magic} {op._name}",
+            raise_on_stderr=raise_on_stderr,
+            _quiet_=_quiet_,
+            _encode_=codec.encode_arguments,
+            _decode_=decode,
+            **kwargs
+        )
+
+    async def _execute(self, input, return_full_result=False, raise_on_stderr : bool = False, display_data_handler=None, decode : Optional[Callable[[str], Any]] = None, _timeout_=DEFAULT_TIMEOUT, _quiet_ : bool = False):
+        await self._ensure_started()
+        logger.debug(f"sending:\n{input}")
+
+        if not _quiet_:
+            display_data_handler = lambda msg: display_raw(msg['content']['data'])
+        if self.display_data_callback is not None:
+            inner_handler = display_data_handler
+
+            def filter_display_data(msg):
+                if self.display_data_callback(msg) and inner_handler is not None:
+                    return inner_handler(msg)
+
+            display_data_handler = filter_display_data
+
+        # Register the request before sending it, so that no reply can
+        # arrive before we know where to route it.
+        request = _PendingRequest(raise_on_stderr, display_data_handler)
+        msg = self.kernel_client.session.msg('execute_request', {
+            'code': input,
+            'silent': False,
+            'store_history': False,
+            'user_expressions': {},
+            'allow_stdin': False,
+            'stop_on_error': False
+        })
+        msg_id = msg['header']['msg_id']
+        self._pending[msg_id] = request
+        try:
+            self.kernel_client.shell_channel.send(msg)
+            reply = await asyncio.wait_for(request.wait(), timeout=_timeout_)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            # Don't leave the kernel running a request that nobody is
+            # waiting for, as the requests sent after it would queue
+            # behind it.
+            self._abandon(msg_id)
+            raise
+        finally:
+            if not request.abandoned:
+                del self._pending[msg_id]
+
+        logger.debug(f"received:\n{reply}")
+
+        if request.errors:
+            raise IQSharpError(request.errors)
+        return IQSharpClient._decode_result(request.results, return_full_result=return_full_result, decode=decode)
@@ -0,0 +1,117 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+##
+# cancellation.py: Futures for requests to the IQ# kernel that can be
+#     cancelled while they run.
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+
+## IMPORTS ##
+
+import threading
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+## CLASSES ##
+
+class CancellationToken(object):
+    """
+    Lets one thread ask for the requests made by another thread to stop.
+
+    Clients check the token of the calling thread before sending each
+    request, and periodically while waiting for its reply; a request that
+    is cancelled while it runs is interrupted in the kernel.
+    """
+
+    def __init__(self):
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+    def raise_if_cancelled(self) -> None:
+        if self.cancelled:
+            raise CancelledError()
+
+class CancellableFuture(Future):
+    """
+    Future for a call to a Q# client made on a background thread.
+
+    Unlike other futures, a cancellable future can also be cancelled while
+    its call is running: `cancel()` then asks the client to interrupt the
+    kernel, and the future completes as cancelled once the kernel has
+    stopped.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.token = CancellationToken()
+
+    def cancel(self) -> bool:
+        if super().cancel():
+            return True
+        if self.done():
+            return False
+        self.token.cancel()
+        return True
+
+    def cancelled(self) -> bool:
+        if super().cancelled():
+            return True
+        # Calls that were interrupted while running complete with a
+        # CancelledError rather than through Future.cancel.
+        return self.token.cancelled and self.done() and isinstance(self.exception(), CancelledError)
+
+## FUNCTIONS ##
+
+_executor : Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+_current = threading.local()
+
+def current_token() -> Optional[CancellationToken]:
+    """
+    Returns the cancellation token of the future being run by the calling
+    thread, if any.
+    """
+    return getattr(_current, 'token', None)
+
+def call_with_token(token : Optional[CancellationToken], fn : Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Calls `fn` on the calling thread with `token` as its cancellation token,
+    such that a future which splits its work across several threads can
+    still cancel all of that work.
+    """
+    previous, _current.token = current_token(), token
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        _current.token = previous
+
+def _run(future : CancellableFuture, fn : Callable[..., Any], args, kwargs) -> None:
+    if not future.set_running_or_notify_cancel():
+        return
+    try:
+        result = call_with_token(future.token, fn, *args, **kwargs)
+    except BaseException as ex:
+        future.set_exception(ex)
+    else:
+        future.set_result(result)
+
+def submit(fn : Callable[..., Any], *args, **kwargs) -> CancellableFuture:
+    """
+    Calls `fn` on a background thread, returning a future for its result
+    that can be cancelled even once the call has started.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(thread_name_prefix="qsharp-future")
+    future = CancellableFuture()
+    _executor.submit(_run, future, fn, args, kwargs)
+    return future
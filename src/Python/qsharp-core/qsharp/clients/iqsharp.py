@@ -14,20 +14,33 @@ import subprocess
 import time
 import http.client
 import atexit
-import json
 import sys
 import urllib.parse
 import os
+import queue
+import threading
 import jupyter_client
+import zmq
 
 from functools import partial
 from io import StringIO
 from collections import defaultdict
-from typing import List, Dict, Callable, Any, Optional
+from typing import Iterable, Iterator, List, Dict, Tuple, Callable, Any, Optional, TYPE_CHECKING
 from pathlib import Path
 from distutils.version import LooseVersion
-
-from qsharp.serialization import map_tuples, unmap_tuples
+from concurrent.futures import CancelledError
+
+from qsharp.clients.cancellation import CancellableFuture, CancellationToken, current_token, submit
+from qsharp.clients.scheduler import RequestScheduler, SchedulerStats
+from qsharp.clients.streaming import SimulationStream, StreamEvent, DEFAULT_MAX_BUFFERED, iterate
+from qsharp.clients.tracing import Span, add_kernel_tasks, tracer
+from qsharp.clients.watchdog import DEFAULT_MAX_MISSED_HEARTBEATS
+from qsharp.results.diagnostics import new_container
+from qsharp.results.performance import KernelPerformance
+if TYPE_CHECKING:
+    from qsharp.clients.watchdog import KernelWatchdog
+from qsharp.serialization import map_tuples, unmap_tuples, dumps, loads, loads_tuples, iter_array
+from qsharp.signatures import callable_codec
 
 try:
     from IPython.display import display
@@ -49,6 +62,58 @@ import logging
 logger = logging.getLogger(__name__)
 
 DEFAULT_TIMEOUT=120
+DEFAULT_PIPELINE_WINDOW=32
+DEFAULT_STARTUP_TIMEOUT=20
+READY_INITIAL_BACKOFF=0.05
+READY_MAX_BACKOFF=1.0
+# Restarts jump ahead of every queued request.
+RESTART_PRIORITY=2**31
+# How long to wait for the kernel to stop running a request after
+# interrupting it, before restarting the kernel instead.
+INTERRUPT_TIMEOUT=10
+# How often requests that may be cancelled check whether they have been.
+CANCEL_POLL_INTERVAL=0.1
+# How often requests that are waiting for output check that the kernel is
+# still alive, such that a request to a kernel that exits never waits
+# forever, and never keeps a watchdog from restarting that kernel.
+LIVENESS_POLL_INTERVAL=1.0
+# Magic commands whose output is the output of the callable that they run,
+# such that it can be decoded according to the signature of that callable.
+OUTPUT_MAGICS=frozenset({'simulate', 'simulate_sparse', 'toffoli', 'simulate_noise'})
+# Magic commands whose output is an array of (output, count) pairs, one for each
+# distinct output of the callable.
+SHOTS_MAGICS=frozenset({'simulate_shots', 'simulate_sparse_shots'})
+# Display data of this type reports the tasks timed by the kernel itself
+# while executing a request.
+KERNEL_TASKS_MIME_TYPE='application/x-qsharp-perf'
+
+## FUNCTIONS ##
+
+def _call_name(input : str) -> str:
+    """
+    Returns the kind of call that sends a given input to the kernel, used to
+    group statistics: the name of the magic command, if any.
+    """
+    if input.startswith('%'):
+        return input.split(None, 1)[0]
+    if input.startswith('?'):
+        return '?'
+    return 'compile'
+
+def _output_decoder(codec, magic : str, lazy : bool = False, as_numpy : Optional[bool] = None) -> Optional[Callable[[str], Any]]:
+    """
+    Returns the function that decodes the output sent by the kernel for a
+    callable magic, using the codec of its callable: as an iterator over
+    the items of the output if `lazy` is true, and with arrays of numbers
+    as NumPy arrays if `as_numpy` is (by default, as set by
+    `qsharp.serialization.set_as_numpy`). The outputs counted by shots
+    magics are each decoded the same way.
+    """
+    if magic in SHOTS_MAGICS:
+        return partial(codec.decode_counts_json, as_numpy=as_numpy)
+    if magic in OUTPUT_MAGICS:
+        return partial(codec.iter_json if lazy else codec.decode_json, as_numpy=as_numpy)
+    return iter_array if lazy else None
 
 ## CLASSES ##
 
@@ -67,29 +132,84 @@ class IQSharpError(RuntimeError):
 
 class AlreadyExecutingError(IOError):
     """
-    Raised when the IQ# client is already executing a command and cannot safely
-    process an additional command.
+    Raised when the IQ# client is already executing a command on the calling
+    thread and cannot safely process an additional command.
     """
     pass
 
-class IQSharpClient(object):
-    kernel_manager = None
-    kernel_client = None
-    _busy : bool = False
+class _KernelLiveness(object):
+    """
+    Checks that the kernel of a client is still alive while waiting for it
+    to reply, at most once every LIVENESS_POLL_INTERVAL seconds.
+    """
+    def __init__(self, client : "IQSharpClient"):
+        self.client = client
+        self.missed_heartbeats = 0
+        self.next_check = time.monotonic() + LIVENESS_POLL_INTERVAL
+
+    def check(self) -> None:
+        """
+        Raises IQSharpError if the kernel has exited, or has missed
+        DEFAULT_MAX_MISSED_HEARTBEATS heartbeats in a row.
+        """
+        now = time.monotonic()
+        if now < self.next_check:
+            return
+        self.next_check = now + LIVENESS_POLL_INTERVAL
+        kernel_manager = self.client.kernel_manager
+        if kernel_manager is not None and not kernel_manager.is_alive():
+            raise IQSharpError(["IQ# kernel exited while running a request."])
+        hb_channel = self.client.kernel_client.hb_channel
+        if hb_channel.is_alive() and not hb_channel.is_beating():
+            self.missed_heartbeats += 1
+            if self.missed_heartbeats >= DEFAULT_MAX_MISSED_HEARTBEATS:
+                raise IQSharpError([f"IQ# kernel missed {self.missed_heartbeats} heartbeats while running a request."])
+        else:
+            self.missed_heartbeats = 0
 
 class IQSharpClient(object):
     kernel_manager = None
     kernel_client = None
-    _busy : bool = False
+    scheduler : RequestScheduler = None
 
     display_data_callback: Optional[Callable[[Any], bool]] = None
 
-    def __init__(self, kernel_name: str = 'iqsharp'):
-        self.kernel_manager = jupyter_client.KernelManager(kernel_name=kernel_name)
+    def __init__(self, kernel_name: str = 'iqsharp', connection_file : Optional[str] = None, connection_info : Optional[Dict[str, Any]] = None):
+        """
+        :param connection_file: If given, attaches to the already running
+            kernel described by this Jupyter connection file, rather than
+            starting a new kernel.
+        :param connection_info: If given, attaches to the already running
+            kernel listening on the ports given by this dictionary, in the
+            same format as a Jupyter connection file.
+        """
+        self._connection_file = connection_file
+        self._connection_info = connection_info
+        if not self.attached:
+            self.kernel_manager = jupyter_client.KernelManager(kernel_name=kernel_name)
+        self.scheduler = RequestScheduler()
+        self.watchdog = None
+        self._component_versions = None
+        # Calls that change the state of the kernel, replayed in order after
+        # the kernel restarts.
+        self._journal : List[Tuple[str, tuple]] = []
+        self._restarting_thread : Optional[int] = None
+        self._workspace_version = 0
 
     ## Server Lifecycle ##
 
+    @property
+    def attached(self) -> bool:
+        """
+        Whether this client attaches to a kernel that it did not start, and
+        that it thus must not shut down or restart.
+        """
+        return self._connection_file is not None or self._connection_info is not None
+
     def start(self):
+        if self.attached:
+            self._attach()
+            return
         logger.info("Starting IQ# kernel...")
         # Pass along all environment variables except the user agent,
         # as we'll override that to mark this as a Python session.
@@ -97,38 +217,192 @@ class IQSharpClient(object):
         env["IQSHARP_USER_AGENT"] = f"qsharp.py{_user_agent_extra}"
         self.kernel_manager.start_kernel(env=env)
         self.kernel_client = self.kernel_manager.client()
+        self._component_versions = None
+        atexit.register(self.stop)
+
+    def _attach(self):
+        logger.info("Attaching to running IQ# kernel...")
+        self.kernel_client = jupyter_client.BlockingKernelClient()
+        if self._connection_file is not None:
+            self.kernel_client.load_connection_file(self._connection_file)
+        else:
+            self.kernel_client.load_connection_info(self._connection_info)
+        self._component_versions = None
         atexit.register(self.stop)
 
     def stop(self):
         # Don't use logger here. If we're running inside pytest, the handle to the
         # log output file may have already been closed.
+        if self.watchdog is not None:
+            self.watchdog.stop()
+        try:
+            self.kernel_client.hb_channel.stop()
+        except:
+            pass
+        if self.kernel_manager is None:
+            # Kernels that we attached to are shared with other processes,
+            # and are left running.
+            return
         try:
             self.kernel_manager.shutdown_kernel()
         except:
             pass
 
+    def get_connection_info(self) -> Dict[str, Any]:
+        """
+        Returns the ports and key used to connect to this client's kernel,
+        such that other clients can attach to the same kernel.
+        """
+        if self.kernel_manager is not None:
+            return self.kernel_manager.get_connection_info()
+        return self.kernel_client.get_connection_info()
+
     def is_ready(self):
-        try:
-            result = self.component_versions(_timeout_=6)
-            logger.info(f"Q# version\n{result}")
-        except Exception as ex:
-            logger.info('Exception while checking if IQ# is ready.', exc_info=ex)
-            return
-        return True
+        return self.wait_until_ready(timeout=READY_MAX_BACKOFF)
+
+    def wait_until_ready(self, timeout : float = DEFAULT_STARTUP_TIMEOUT) -> bool:
+        """
+        Waits until the kernel answers a `kernel_info` request, returning
+        whether it did so within `timeout` seconds.
+
+        Requests are only sent once the kernel answers heartbeats, and are
+        retried with an exponentially increasing timeout, such that a kernel
+        which starts quickly is detected quickly, without flooding a kernel
+        which starts slowly with requests.
+        """
+        deadline = time.monotonic() + timeout
+        delay = READY_INITIAL_BACKOFF
+        hb_channel = self.kernel_client.hb_channel
+        if not hb_channel.is_alive():
+            hb_channel.start()
+
+        with self._hold_kernel():
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                if self.kernel_manager is not None and not self.kernel_manager.is_alive():
+                    logger.info("IQ# kernel exited before becoming ready.")
+                    return False
+                if hb_channel.is_beating():
+                    try:
+                        # Replies to earlier requests that timed out are
+                        # discarded, as they don't match this request's
+                        # msg_id.
+                        reply = self.kernel_client.kernel_info(reply=True, timeout=min(delay, remaining))
+                        if reply['content'].get('status') == 'ok':
+                            logger.info(f"IQ# kernel ready: {reply['content'].get('implementation_version')}")
+                            return True
+                    except (queue.Empty, TimeoutError):
+                        pass
+                else:
+                    time.sleep(min(delay, remaining))
+                delay = min(2 * delay, READY_MAX_BACKOFF)
 
     def check_status(self):
+        if self.kernel_manager is None:
+            # We can't restart a kernel that we didn't start; if it has
+            # stopped, requests fail once they time out.
+            return
         if not self.kernel_manager.is_alive():
             logger.debug("IQ# kernel is not running. Restarting.")
-            self.start()
+            self.restart(only_if_dead=True)
+
+    def restart(self, only_if_dead : bool = False) -> None:
+        """
+        Restarts the kernel once any running request has completed, then
+        restores its state by replaying every call to `compile`,
+        `add_package`, `add_project`, `set_config` and `set_noise_model`
+        made through this client, in order.
+
+        :param only_if_dead: If `True`, only restarts the kernel if it is no
+            longer running by the time any running request has completed.
+        """
+        if self.kernel_manager is None:
+            raise IQSharpError(["Cannot restart an IQ# kernel that this client did not start."])
+        with self._hold_kernel(priority=RESTART_PRIORITY):
+            if only_if_dead and self.kernel_manager.is_alive():
+                return
+            self._restart_held()
+
+    def interrupt(self) -> None:
+        """
+        Asks the kernel to stop running its current request.
+
+        Most callers should cancel a future returned by `submit` or set a
+        `_timeout_` instead, as those also wait for the kernel to stop and
+        discard any output left over from the interrupted request.
+        """
+        logger.debug("Interrupting IQ# kernel.")
+        if self.kernel_manager is not None and self.kernel_manager.kernel_spec.interrupt_mode == 'message':
+            self.kernel_manager.interrupt_kernel()
+        else:
+            # Sending SIGINT, as KernelManager.interrupt_kernel does for
+            # kernels that don't ask for interrupt messages, terminates the
+            # .NET process that hosts IQ#; ask the kernel directly over its
+            # control channel instead. This also works for kernels that we
+            # attached to, which we can't signal.
+            msg = self.kernel_client.session.msg('interrupt_request', {})
+            self.kernel_client.control_channel.send(msg)
+
+    def enable_watchdog(self, interval : Optional[float] = None, max_memory : Optional[int] = None) -> "KernelWatchdog":
+        """
+        Starts monitoring the kernel on a background thread, restarting it
+        when it exits, stops answering heartbeats, or uses more than
+        `max_memory` bytes of memory (requires psutil).
+        """
+        from qsharp.clients.watchdog import KernelWatchdog, DEFAULT_WATCHDOG_INTERVAL
+        if self.watchdog is not None:
+            self.watchdog.stop()
+        self.watchdog = KernelWatchdog(
+            self,
+            interval=DEFAULT_WATCHDOG_INTERVAL if interval is None else interval,
+            max_memory=max_memory
+        )
+        self.watchdog.start()
+        return self.watchdog
 
     ## Public Interface ##
 
     @property
     def busy(self) -> bool:
-        return self._busy
+        return self.scheduler.busy
+
+    @property
+    def workspace_version(self) -> int:
+        """
+        A number that changes whenever a call through this client may have
+        changed which callables are available in the kernel: compiling
+        snippets, reloading the workspace, adding packages or projects, or
+        restarting the kernel. Changes made by other clients attached to the
+        same kernel are not tracked.
+        """
+        return self._workspace_version
+
+    def scheduler_stats(self) -> SchedulerStats:
+        """
+        Returns queue depth and wait-time metrics for requests sent through
+        this client.
+        """
+        return self.scheduler.stats()
+
+    def submit(self, method : str, *args, **kwargs) -> CancellableFuture:
+        """
+        Calls a method of this client (e.g.: `simulate`) on a background
+        thread, returning a future for its result.
+
+        Cancelling the future while the call is running interrupts the
+        kernel, and waits for it to stop before completing the future as
+        cancelled. The same happens when a call takes longer than its
+        `_timeout_`, except that the call raises `TimeoutError`.
+        """
+        return submit(getattr(self, method), *args, **kwargs)
 
     def compile(self, body):
-        return self._execute(body)
+        with self._changing_workspace():
+            result = self._execute(body)
+        self._record('compile', body)
+        return result
 
     def get_available_operations(self) -> List[str]:
         return self._execute('%who', raise_on_stderr=False)
@@ -140,7 +414,8 @@ class IQSharpClient(object):
         return self._execute("%workspace")
 
     def reload(self) -> None:
-        return self._execute(f"%workspace reload", raise_on_stderr=True)
+        with self._changing_workspace():
+            return self._execute(f"%workspace reload", raise_on_stderr=True)
 
     def get_config(self) -> Dict[str, object]:
         raw = self._execute(f"%config", raise_on_stderr=True)
@@ -157,18 +432,25 @@ class IQSharpClient(object):
             self._execute(f"%config {name}={value}", raise_on_stderr=True)
         else:
             self._execute(f"%config {name}='{value}'", raise_on_stderr=True)
+        self._record('set_config', name, value)
 
     def save_config(self) -> None:
         self._execute(f"%config --save", raise_on_stderr=True)
 
     def add_package(self, name : str) -> None:
-        return self._execute(f"%package {name}", raise_on_stderr=True)
+        with self._changing_workspace():
+            result = self._execute(f"%package {name}", raise_on_stderr=True)
+        self._record('add_package', name)
+        return result
 
     def get_packages(self) -> List[str]:
         return self._execute("%package", raise_on_stderr=False)
 
     def add_project(self, path : str) -> None:
-        return self._execute(f"%project {path}", raise_on_stderr=True)
+        with self._changing_workspace():
+            result = self._execute(f"%project {path}", raise_on_stderr=True)
+        self._record('add_project', path)
+        return result
 
     def get_projects(self) -> List[str]:
         return self._execute("%project", raise_on_stderr=False)
@@ -185,37 +467,150 @@ class IQSharpClient(object):
         kwargs.setdefault('_timeout_', None)
         return self._execute_callable_magic('toffoli', op, **kwargs)
 
+    def simulate_batch(self, op, kwargs_list : Iterable[Dict[str, Any]], **kwargs) -> List[Any]:
+        kwargs.setdefault('_timeout_', None)
+        _as_numpy_ = kwargs.pop('_as_numpy_', None)
+        codec = callable_codec(op)
+        with tracer.call('%simulate_batch') as span:
+            with span.child('map_tuples'):
+                arguments = dumps([codec.encode_arguments(call_kwargs) for call_kwargs in kwargs_list])
+            def decode(data):
+                outputs = loads(data)
+                if type(outputs) is not list:
+                    return unmap_tuples(outputs)
+                return [codec.decode_output(output, as_numpy=_as_numpy_) for output in outputs]
+            return self._execute(f'%simulate_batch {op._name} {arguments}', decode=decode, **kwargs)
+
+    def simulate_shots(self, op, shots : int, seed : Optional[int] = None, **kwargs) -> List[Tuple[Any, int]]:
+        return self._execute_shots_magic('simulate_shots', op, shots, seed, **kwargs)
+
+    def simulate_sparse_shots(self, op, shots : int, seed : Optional[int] = None, **kwargs) -> List[Tuple[Any, int]]:
+        return self._execute_shots_magic('simulate_sparse_shots', op, shots, seed, **kwargs)
+
+    def simulate_stream(self, op, magic : str = 'simulate', max_buffered : int = DEFAULT_MAX_BUFFERED, policy : str = 'block', **kwargs) -> Iterator[StreamEvent]:
+        """
+        Runs a Q# callable, yielding its diagnostics and printed messages
+        while it runs, followed by its output as a `result` event.
+
+        At most `max_buffered` events are held until they are consumed.
+        Once that many are held, `policy` decides whether to stop reading
+        from the kernel until the next event is consumed (`block`), or to
+        drop the oldest (`drop_oldest`) or newest (`drop_newest`) event.
+        Closing the generator before the simulation completes cancels it.
+        """
+        _timeout_ = kwargs.pop('_timeout_', None)
+        _priority_ = kwargs.pop('_priority_', 0)
+        codec = callable_codec(op)
+        decode = _output_decoder(codec, magic, as_numpy=kwargs.pop('_as_numpy_', None))
+        input = f'%{magic} {op._name} {dumps(codec.encode_arguments(kwargs))}'
+
+        def run(emit):
+            def on_display_data(msg):
+                data = self._decode_display_data(msg['content'])
+                emit('diagnostic', msg['content']['data'].get('text/plain') if data is None else data)
+            def on_output(msg):
+                if msg['msg_type'] == 'stream':
+                    emit(msg['content']['name'], msg['content']['text'])
+            return self._execute(
+                input, display_data_handler=on_display_data, output_hook=on_output, decode=decode,
+                _quiet_=True, _timeout_=_timeout_, _priority_=_priority_
+            )
+
+        yield from iterate(SimulationStream(run, max_buffered=max_buffered, policy=policy))
+
     def trace(self, op, **kwargs) -> Any:
         return self._execute_callable_magic('trace', op, _quiet_ = True, **kwargs)
 
     def compile_to_qir(self, op, **kwargs) -> None:
         return self._execute_callable_magic('qir', op, **kwargs)
 
+    def map(self, op, kwargs_list : Iterable[Dict[str, Any]], magic : str = 'simulate', window : int = DEFAULT_PIPELINE_WINDOW, **kwargs) -> List[Any]:
+        """
+        Runs a Q# callable once for each dictionary of keyword arguments
+        in `kwargs_list`, returning a list of results in the same order.
+
+        Rather than waiting for each call to complete before sending the
+        next, up to `window` requests are kept in flight at once, so that
+        many small calls are not each bound by a full round trip to the
+        kernel.
+
+        :param magic: The magic command used to run each call, e.g.:
+            `simulate`, `simulate_sparse` or `toffoli`.
+        :param window: The maximum number of requests sent to the kernel
+            ahead of their replies.
+        """
+        kwargs.setdefault('_timeout_', None)
+        codec = callable_codec(op)
+        decode = _output_decoder(codec, magic, as_numpy=kwargs.pop('_as_numpy_', None))
+        with tracer.call('map', magic=magic) as span:
+            with span.child('map_tuples'):
+                inputs = [
+                    f'%{magic} {op._name} {dumps(codec.encode_arguments(call_kwargs))}'
+                    for call_kwargs in kwargs_list
+                ]
+            return self._execute_pipelined(
+                inputs, window=window, decode=decode, span=span, **kwargs
+            )
+
+    def performance(self, **kwargs) -> KernelPerformance:
+        """
+        Returns the memory and CPU time used by the IQ# kernel, as reported
+        by the kernel itself. As this is a request to the kernel, it waits
+        for any running request to complete.
+        """
+        return KernelPerformance.from_dict(self._execute('%performance raw', raise_on_stderr=True, _quiet_=True, **kwargs))
+
+    def sample_performance(self) -> KernelPerformance:
+        """
+        Returns the memory and CPU time used by the IQ# kernel, measured
+        from outside of the kernel if possible (requires psutil and a
+        kernel started by this client), such that the kernel can be
+        measured while it is busy.
+        """
+        from qsharp.clients.watchdog import kernel_performance
+        performance = None if self.kernel_manager is None else kernel_performance(self.kernel_manager)
+        return self.performance() if performance is None else performance
+
     def component_versions(self, **kwargs) -> Dict[str, LooseVersion]:
         """
         Returns a dictionary from components of the IQ# kernel to their
         versions.
+
+        Versions are only requested from the kernel on first use, and are
+        cached until the kernel is restarted.
         """
+        if self._component_versions is not None:
+            return dict(self._component_versions)
         versions = {}
         def capture(msg):
             # We expect a display_data with the version table.
             if msg["msg_type"] == "display_data":
-                data = unmap_tuples(json.loads(self._get_qsharp_data(msg["content"])))
+                data = loads_tuples(self._get_qsharp_data(msg["content"]))
                 for component, version in data["rows"]:
                     versions[component] = LooseVersion(version)
         self._execute("%version", display_data_handler=capture, _quiet_=True, **kwargs)
-        return versions
+        self._component_versions = versions
+        return dict(versions)
 
     @contextmanager
-    def capture_diagnostics(self, passthrough: bool) -> List[Any]:
-        captured_data = []
+    def capture_diagnostics(self, passthrough: bool, max_items : Optional[int] = None, sink : Optional[str] = None) -> List[Any]:
+        """
+        Captures diagnostics into a list, into a deque of at most
+        `max_items` diagnostics, or into a file at `sink` that is read back
+        lazily.
+        """
+        captured_data = new_container(max_items=max_items, sink=sink)
+        try:
+            with self._capture_diagnostics_into(captured_data, passthrough):
+                yield captured_data
+        finally:
+            if sink is not None:
+                captured_data.close()
+
+    @contextmanager
+    def _capture_diagnostics_into(self, captured_data : List[Any], passthrough: bool) -> List[Any]:
         def callback(msg):
-            msg_data = (
-                # Check both the old and new MIME types used by the IQ#
-                # kernel.
-                json.loads(msg['content']['data'].get('application/json', "null")) or
-                json.loads(msg['content']['data'].get('application/x-qsharp-data', "null"))
-            )
+            msg_data = self._decode_display_data(msg['content'])
             if msg_data is not None:
                 captured_data.append(msg_data)
                 return passthrough
@@ -243,10 +638,14 @@ class IQSharpClient(object):
     def set_noise_model(self, json_data : str) -> None:
         # We assume json_data is already serialized, so that we skip the support
         # provided by _execute_magic and call directly.
-        return self._execute(f'%noise_model {json_data}')
+        result = self._execute(f'%noise_model {json_data}')
+        self._record('set_noise_model', json_data)
+        return result
 
     def set_noise_model_by_name(self, name : str) -> None:
-        return self._execute(f'%noise_model --load-by-name {name}')
+        result = self._execute(f'%noise_model --load-by-name {name}')
+        self._record('set_noise_model_by_name', name)
+        return result
 
 
     ## Internal-Use Methods ##
@@ -263,25 +662,134 @@ class IQSharpClient(object):
             return message_content["data"]["application/json"]
         return None
 
+    @staticmethod
+    def _decode_display_data(message_content) -> Any:
+        return (
+            # Check both the old and new MIME types used by the IQ#
+            # kernel.
+            loads(message_content['data'].get('application/json', "null")) or
+            loads(message_content['data'].get('application/x-qsharp-data', "null"))
+        )
+
     def _execute_magic(self, magic : str, raise_on_stderr : bool = False, _quiet_ : bool = False, return_full_result=False, **kwargs) -> Any:
         _timeout_ = kwargs.pop('_timeout_', DEFAULT_TIMEOUT)
-        return self._execute(
-            f'%{magic} {json.dumps(map_tuples(kwargs))}',
-            raise_on_stderr=raise_on_stderr, _quiet_=_quiet_, _timeout_=_timeout_, return_full_result=return_full_result
-        )
+        _priority_ = kwargs.pop('_priority_', 0)
+        # Callable magics encode arguments with the codec compiled for their
+        # callable, and decode outputs from the JSON sent by the kernel with
+        # the same codec.
+        _encode_ = kwargs.pop('_encode_', map_tuples)
+        _decode_ = kwargs.pop('_decode_', None)
+        with tracer.call(_call_name(f'%{magic}')) as span:
+            with span.child('map_tuples'):
+                arguments = dumps(_encode_(kwargs))
+            return self._execute(
+                f'%{magic} {arguments}',
+                raise_on_stderr=raise_on_stderr, _quiet_=_quiet_, _timeout_=_timeout_, _priority_=_priority_, return_full_result=return_full_result,
+                decode=_decode_
+            )
 
     def _execute_callable_magic(self, magic : str, op,
             raise_on_stderr : bool = False,
             _quiet_ : bool = False,
             **kwargs
     ) -> Any:
+        codec = callable_codec(op)
+        # With _lazy_, outputs that are arrays are returned as iterators
+        # that decode each item only once it is requested, and with
+        # _as_numpy_, arrays of numbers are returned as NumPy arrays.
+        decode = _output_decoder(codec, magic, lazy=kwargs.pop('_lazy_', False), as_numpy=kwargs.pop('_as_numpy_', None))
         return self._execute_magic(
             f"{magic} {op._name}",
             raise_on_stderr=raise_on_stderr,
             _quiet_=_quiet_,
+            _encode_=codec.encode_arguments,
+            _decode_=decode,
             **kwargs
         )
 
+    def _record(self, method : str, *args) -> None:
+        """
+        Records a call that changed the state of the kernel, such that it
+        can be replayed after a restart. Only the latest call that sets a
+        given configuration option or the noise model is kept, and packages
+        and projects are only recorded once.
+        """
+        if method == 'set_config':
+            matches = lambda entry: entry[0] == method and entry[1][0] == args[0]
+        elif method in ('set_noise_model', 'set_noise_model_by_name'):
+            matches = lambda entry: entry[0] in ('set_noise_model', 'set_noise_model_by_name')
+        elif method in ('add_package', 'add_project'):
+            matches = lambda entry: entry == (method, args)
+        else:
+            matches = lambda entry: False
+        self._journal = [entry for entry in self._journal if not matches(entry)]
+        self._journal.append((method, args))
+
+    def _replay_journal(self) -> None:
+        # Replaying records each call again.
+        journal, self._journal = self._journal, []
+        for method, args in journal:
+            logger.debug(f"Replaying {method}{args!r}.")
+            try:
+                getattr(self, method)(*args)
+            except Exception as ex:
+                logger.warning(f"Failed to replay {method} after restarting the IQ# kernel.", exc_info=ex)
+
+    def _restart_held(self) -> None:
+        """
+        Restarts the kernel and replays the journal into it. The calling
+        thread must hold the kernel.
+        """
+        logger.info("Restarting IQ# kernel...")
+        with self._changing_workspace():
+            try:
+                self.kernel_client.hb_channel.stop()
+            except:
+                pass
+            if self.kernel_manager.is_alive():
+                self.kernel_manager.shutdown_kernel(now=True)
+            self.start()
+            # Requests made while replaying run on this thread while it holds
+            # the kernel, and so must not wait for it.
+            restarting_thread, self._restarting_thread = self._restarting_thread, threading.get_ident()
+            try:
+                if not self.wait_until_ready():
+                    raise IQSharpError(["IQ# kernel did not become ready after restarting."])
+                self._replay_journal()
+            finally:
+                self._restarting_thread = restarting_thread
+
+    @contextmanager
+    def _changing_workspace(self):
+        """
+        Changes the workspace version once the enclosed call completes,
+        whether or not it succeeds, since a failed call may still have
+        changed which callables are available.
+        """
+        try:
+            yield
+        finally:
+            self._workspace_version += 1
+
+    @contextmanager
+    def _hold_kernel(self, priority : int = 0):
+        """
+        Waits for exclusive use of the kernel, unless the calling thread is
+        already holding it to restart the kernel.
+        """
+        if self._restarting_thread == threading.get_ident():
+            yield
+        else:
+            with self.scheduler.acquire(priority=priority):
+                yield
+
+    def _execute_shots_magic(self, magic : str, op, shots : int, seed : Optional[int] = None, **kwargs) -> List[Tuple[Any, int]]:
+        kwargs.setdefault('_timeout_', None)
+        kwargs['__shots__'] = shots
+        if seed is not None:
+            kwargs['__seed__'] = seed
+        return self._execute_callable_magic(magic, op, **kwargs)
+
     def _handle_message(self, msg, handlers=None, error_callback=None, fallback_hook=None):
         if handlers is None:
             handlers = {}
@@ -296,19 +804,7 @@ class IQSharpClient(object):
             else:
                 fallback_hook(msg)
 
-    def _execute(self, input, return_full_result=False, raise_on_stderr : bool = False, output_hook=None, display_data_handler=None, _timeout_=DEFAULT_TIMEOUT, _quiet_ : bool = False, **kwargs):
-        logger.debug(f"sending:\n{input}")
-        logger.debug(f"timeout: {_timeout_}")
-
-        # make sure the server is still running:
-        try:
-            self.check_status()
-        except:
-            raise IQSharpError(["IQ# is not running."])
-
-        results = []
-        errors = []
-
+    def _make_output_hook(self, results : List[Any], errors : List[str], raise_on_stderr : bool = False, output_hook=None, display_data_handler=None, _quiet_ : bool = False):
         def log_error(msg):
             errors.append(msg)
 
@@ -339,40 +835,296 @@ class IQSharpClient(object):
 
             handlers['display_data'] = filter_display_data
 
-        _output_hook = partial(
+        # Kernel task timings are added to the trace of the running call,
+        # rather than displayed.
+        display_handler = handlers['display_data']
+        def handle_display_data(msg):
+            data = msg['content']['data']
+            if KERNEL_TASKS_MIME_TYPE not in data:
+                return display_handler(msg)
+            span = tracer.current
+            if span is not None:
+                add_kernel_tasks(span, loads(data[KERNEL_TASKS_MIME_TYPE]))
+        handlers['display_data'] = handle_display_data
+
+        return partial(
             self._handle_message,
             error_callback=log_error if raise_on_stderr else None,
             fallback_hook=output_hook,
             handlers=handlers
         )
 
+    def _execute(self, input, return_full_result=False, raise_on_stderr : bool = False, output_hook=None, display_data_handler=None, decode : Optional[Callable[[str], Any]] = None, _timeout_=DEFAULT_TIMEOUT, _quiet_ : bool = False, _priority_ : int = 0, **kwargs):
+        logger.debug(f"sending:\n{input}")
+        logger.debug(f"timeout: {_timeout_}")
+
+        # make sure the server is still running:
         try:
-            if self._busy:
-                # Trying to execute while already executing can corrupt the
-                # ordering of messages internally to ZeroMQ
-                # (see https://github.com/Microsoft/QuantumLibraries/issues/69),
-                # so we need to throw early rather than letting the problem
-                # propagate to a Jupyter protocol error.
-                raise AlreadyExecutingError("Cannot execute through the IQ# client while another execution is completing.")
-            self._busy = True
-            reply = self.kernel_client.execute_interactive(input, timeout=_timeout_, output_hook=_output_hook, **kwargs)
-        finally:
-            self._busy = False
+            self.check_status()
+        except:
+            raise IQSharpError(["IQ# is not running."])
+
+        results = []
+        errors = []
+        _output_hook = self._make_output_hook(
+            results, errors,
+            raise_on_stderr=raise_on_stderr, output_hook=output_hook,
+            display_data_handler=display_data_handler, _quiet_=_quiet_
+        )
+
+        if self.scheduler.held_by_current_thread and self._restarting_thread != threading.get_ident():
+            # Trying to execute while already executing can corrupt the
+            # ordering of messages internally to ZeroMQ
+            # (see https://github.com/Microsoft/QuantumLibraries/issues/69),
+            # and waiting for our own request would never finish, so we need
+            # to throw early rather than letting the problem propagate to a
+            # Jupyter protocol error.
+            raise AlreadyExecutingError("Cannot execute through the IQ# client while another execution is completing.")
+
+        # Calls replayed while restarting the kernel must complete, even if
+        # the request that led to the restart was cancelled.
+        token = current_token() if self._restarting_thread != threading.get_ident() else None
+
+        with tracer.call(_call_name(input)) as span:
+            span.attributes['bytes_out'] = span.attributes.get('bytes_out', 0) + len(input)
+
+            # Requests from other threads wait in the scheduler's queue until
+            # the kernel is free. While we hold the kernel, only messages whose
+            # parent msg_id matches our request are handled.
+            queued = span.add_child('queue', time.perf_counter())
+            with self._hold_kernel(priority=_priority_):
+                queued.end = time.perf_counter()
+                if token is not None:
+                    token.raise_if_cancelled()
+                with span.child('send'):
+                    msg_id = self.kernel_client.execute(input, allow_stdin=False, **kwargs)
+                deadline = None if _timeout_ is None else time.monotonic() + _timeout_
+                reply = self._wait_for_reply(msg_id, _output_hook, deadline, token, span=span)
+                if reply is None:
+                    # Don't leave the kernel running a request that nobody is
+                    # waiting for, as the next request would then queue behind
+                    # it, and could see its output.
+                    self._abandon(msg_id)
+                    if token is not None and token.cancelled:
+                        raise CancelledError()
+                    raise TimeoutError(f"Timeout waiting for reply to request after {_timeout_} seconds.")
+
+            logger.debug(f"received:\n{reply}")
+
+            if errors:
+                raise IQSharpError(errors)
+            with span.child('decode'):
+                span.attributes['bytes_in'] = span.attributes.get('bytes_in', 0) + sum(
+                    len(self._get_qsharp_data(result['content']) or '')
+                    for result in results if 'data' in result['content']
+                )
+                return self._decode_result(results, return_full_result=return_full_result, decode=decode)
+
+    def _wait_for_reply(self, msg_id : str, output_hook : Callable[[Any], None], deadline : Optional[float], token : Optional[CancellationToken] = None, span : Optional[Span] = None, reply : Optional[Dict[str, Any]] = None, is_idle : bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Passes output from the request `msg_id` to `output_hook` until both
+        its execute_reply and its idle status have arrived, returning the
+        reply. Returns None if `deadline` passes or `token` is cancelled
+        first. If the reply or the idle status have already been received,
+        they are passed as `reply` and `is_idle`.
+
+        Raises IQSharpError if the kernel exits or stops answering
+        heartbeats before the reply arrives.
+
+        If `span` is given, the time from now until the first output and
+        until the reply are added to it as `first_iopub` and
+        `execute_reply` spans.
+        """
+        sent = time.perf_counter()
+        first_iopub = None
+        poller = zmq.Poller()
+        iopub_socket = self.kernel_client.iopub_channel.socket
+        shell_socket = self.kernel_client.shell_channel.socket
+        poller.register(iopub_socket, zmq.POLLIN)
+        poller.register(shell_socket, zmq.POLLIN)
+
+        liveness = _KernelLiveness(self)
+        while reply is None or not is_idle:
+            if token is not None and token.cancelled:
+                return None
+            timeout = LIVENESS_POLL_INTERVAL if token is None else CANCEL_POLL_INTERVAL
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                timeout = min(timeout, remaining)
+            events = dict(poller.poll(int(1000 * timeout)))
+            if not events:
+                liveness.check()
+            if iopub_socket in events:
+                msg = self.kernel_client.get_iopub_msg(timeout=0)
+                # Output from earlier requests that were abandoned is dropped.
+                if msg['parent_header'].get('msg_id') == msg_id:
+                    if span is not None and first_iopub is None:
+                        first_iopub = span.add_child('first_iopub', sent, time.perf_counter())
+                    output_hook(msg)
+                    if msg['msg_type'] == 'status' and msg['content']['execution_state'] == 'idle':
+                        is_idle = True
+            if shell_socket in events:
+                msg = self.kernel_client.get_shell_msg(timeout=0)
+                if msg['parent_header'].get('msg_id') == msg_id:
+                    reply = msg
+                    if span is not None:
+                        span.add_child('execute_reply', sent, time.perf_counter())
+        return reply
+
+    def _abandon(self, msg_id : str, reply : Optional[Dict[str, Any]] = None, is_idle : bool = False) -> bool:
+        """
+        Interrupts the request `msg_id` and discards its remaining output,
+        restarting the kernel if it does not stop within INTERRUPT_TIMEOUT
+        seconds. The calling thread must hold the kernel.
+
+        If the `reply` or idle status of the request have already been
+        received, it has finished running, and only its remaining output is
+        discarded. Returns whether the request stopped without restarting
+        the kernel.
+        """
+        if reply is None and not is_idle:
+            logger.info("Interrupting IQ# kernel to abandon a request.")
+            try:
+                self.interrupt()
+            except Exception as ex:
+                logger.warning("Failed to interrupt IQ# kernel.", exc_info=ex)
+        if self._wait_for_reply(msg_id, lambda msg: None, time.monotonic() + INTERRUPT_TIMEOUT, reply=reply, is_idle=is_idle) is not None:
+            return True
+        if self.kernel_manager is None:
+            logger.warning(f"IQ# kernel did not stop within {INTERRUPT_TIMEOUT} seconds of being interrupted; later requests will wait for it.")
+            return False
+        logger.warning(f"IQ# kernel did not stop within {INTERRUPT_TIMEOUT} seconds of being interrupted; restarting.")
+        self._restart_held()
+        return False
+
+    def _execute_pipelined(self, inputs : List[str], window : int = DEFAULT_PIPELINE_WINDOW, raise_on_stderr : bool = False, decode : Optional[Callable[[str], Any]] = None, span : Optional[Span] = None, _timeout_=DEFAULT_TIMEOUT, _quiet_ : bool = False, _priority_ : int = 0) -> List[Any]:
+        if window < 1:
+            raise ValueError(f"Pipeline window must be at least 1, but was {window}.")
 
-        logger.debug(f"received:\n{reply}")
+        try:
+            self.check_status()
+        except:
+            raise IQSharpError(["IQ# is not running."])
+
+        if self.scheduler.held_by_current_thread:
+            raise AlreadyExecutingError("Cannot execute through the IQ# client while another execution is completing.")
+
+        n_inputs = len(inputs)
+        results = [[] for _ in inputs]
+        errors = [[] for _ in inputs]
+        hooks = [
+            self._make_output_hook(results[idx], errors[idx], raise_on_stderr=raise_on_stderr, _quiet_=_quiet_)
+            for idx in range(n_inputs)
+        ]
+        # For each request still in flight, track its execute_reply on shell
+        # and whether we have seen its idle status on iopub, as both are
+        # needed before all of its output can be assumed to have arrived.
+        in_flight : Dict[str, List[Any]] = {}
+        n_sent = 0
+        n_done = 0
+        deadline = None if _timeout_ is None else time.monotonic() + _timeout_
+        token = current_token()
+        liveness = _KernelLiveness(self)
+
+        def route(msg, is_reply):
+            nonlocal n_done
+            state = in_flight.get(msg['parent_header'].get('msg_id'))
+            if state is None:
+                # Stale output from an earlier request.
+                return
+            idx, reply, is_idle = state
+            if is_reply:
+                reply = msg
+            elif msg['msg_type'] == 'status':
+                is_idle = is_idle or msg['content']['execution_state'] == 'idle'
+            else:
+                hooks[idx](msg)
+            if reply is not None and is_idle:
+                del in_flight[msg['parent_header']['msg_id']]
+                n_done += 1
+            else:
+                state[1:] = [reply, is_idle]
+
+        def abandon_in_flight():
+            # The kernel runs requests one at a time, in the order they were
+            # sent, so abandon them in that order too. Once the kernel has
+            # been restarted, or is left running a request, the requests
+            # queued behind it need not be waited for.
+            for msg_id, (_, reply, is_idle) in list(in_flight.items()):
+                if not self._abandon(msg_id, reply=reply, is_idle=is_idle):
+                    break
+
+        poller = zmq.Poller()
+        iopub_socket = self.kernel_client.iopub_channel.socket
+        shell_socket = self.kernel_client.shell_channel.socket
+        poller.register(iopub_socket, zmq.POLLIN)
+        poller.register(shell_socket, zmq.POLLIN)
+
+        # The caller (e.g. `map`) opens the span for the whole call; when
+        # called directly, the phases are timed but not recorded.
+        if span is None:
+            span = Span('map', time.perf_counter())
+        span.attributes['n_requests'] = n_inputs
+        span.attributes['bytes_out'] = sum(len(input) for input in inputs)
+        queued = span.add_child('queue', time.perf_counter())
+        with self.scheduler.acquire(priority=_priority_):
+            queued.end = time.perf_counter()
+            if token is not None:
+                token.raise_if_cancelled()
+            while n_done < n_inputs:
+                if token is not None and token.cancelled:
+                    abandon_in_flight()
+                    raise CancelledError()
+                # Keep the window full.
+                while n_sent < n_inputs and len(in_flight) < window:
+                    logger.debug(f"sending:\n{inputs[n_sent]}")
+                    # Don't let a failure in one request abort the requests
+                    # queued behind it.
+                    msg_id = self.kernel_client.execute(inputs[n_sent], store_history=False, stop_on_error=False)
+                    in_flight[msg_id] = [n_sent, None, False]
+                    n_sent += 1
+
+                timeout = LIVENESS_POLL_INTERVAL if token is None else CANCEL_POLL_INTERVAL
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        abandon_in_flight()
+                        raise TimeoutError(f"Timeout waiting for {n_inputs - n_done} of {n_inputs} pipelined requests.")
+                    timeout = min(timeout, remaining)
+                events = dict(poller.poll(int(1000 * timeout)))
+                if not events:
+                    liveness.check()
+                if iopub_socket in events:
+                    route(self.kernel_client.get_iopub_msg(timeout=0), is_reply=False)
+                if shell_socket in events:
+                    route(self.kernel_client.get_shell_msg(timeout=0), is_reply=True)
+
+        for input_errors in errors:
+            if input_errors:
+                raise IQSharpError(input_errors)
+        with span.child('decode'):
+            span.attributes['bytes_in'] = sum(
+                len(self._get_qsharp_data(result['content']) or '')
+                for input_results in results for result in input_results if 'data' in result['content']
+            )
+            return [self._decode_result(input_results, decode=decode) for input_results in results]
 
+    @classmethod
+    def _decode_result(cls, results, return_full_result=False, decode : Optional[Callable[[str], Any]] = None):
         # There should be either zero or one execute_result messages.
-        if errors:
-            raise IQSharpError(errors)
         if results:
             assert len(results) == 1
             content = results[0]['content']
             if 'executionPath' in content:
                 obj = content['executionPath']
             else:
-                qsharp_data = self._get_qsharp_data(content)
+                qsharp_data = cls._get_qsharp_data(content)
                 if qsharp_data:
-                    obj = unmap_tuples(json.loads(qsharp_data))
+                    # Decoders take the JSON itself, such that large results
+                    # can be decoded in a single pass, or lazily.
+                    obj = (loads_tuples if decode is None else decode)(qsharp_data)
                 else:
                     obj = None
             return (obj, content) if return_full_result else obj
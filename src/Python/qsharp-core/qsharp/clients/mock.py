@@ -10,10 +10,15 @@
 import atexit
 import json
 
-from typing import List, Dict, Callable, Any, Optional
+from typing import Iterator, List, Dict, Callable, Any, Optional
 from distutils.version import LooseVersion
 from contextlib import contextmanager
 
+from qsharp.clients.cancellation import CancellableFuture, submit
+from qsharp.clients.streaming import StreamEvent
+from qsharp.results.diagnostics import new_container
+from qsharp.results.performance import KernelPerformance
+
 ## LOGGING ##
 
 import logging
@@ -27,6 +32,7 @@ class MockClient(object):
 
     def __init__(self):
         self.packages = []
+        self.workspace_version = 0
 
     ## Server Lifecycle ##
 
@@ -41,6 +47,10 @@ class MockClient(object):
         logger.debug("MockClient.is_ready called.")
         return True
 
+    def wait_until_ready(self, timeout : float = 0) -> bool:
+        logger.debug(f"MockClient.wait_until_ready called with timeout {timeout}.")
+        return True
+
     def check_status(self):
         logger.debug("MockClient.check_status called.")
 
@@ -51,8 +61,13 @@ class MockClient(object):
         logger.debug("MockClient.busy accessed.")
         return False
 
+    def submit(self, method : str, *args, **kwargs) -> CancellableFuture:
+        logger.debug(f"MockClient.submit called for method {method}.")
+        return submit(getattr(self, method), *args, **kwargs)
+
     def compile(self, body):
         logger.debug(f"MockClient.compile called with body:\n{body}")
+        self.workspace_version += 1
         return ["Workspace.Snippet.Example"]
 
     def get_available_operations(self) -> List[str]:
@@ -69,10 +84,12 @@ class MockClient(object):
 
     def reload(self) -> None:
         logger.debug("MockClient.reload called.")
+        self.workspace_version += 1
         return None
 
     def add_package(self, name : str) -> None:
         logger.debug(f"MockClient.add_package called with name {name}.")
+        self.workspace_version += 1
         return self.packages.append(name)
 
     def get_packages(self) -> List[str]:
@@ -83,10 +100,21 @@ class MockClient(object):
         logger.debug(f"MockClient.simulate called with operation {op} and params:\n{params}")
         return ()
 
+    def simulate_stream(self, op, **params) -> Iterator[StreamEvent]:
+        logger.debug(f"MockClient.simulate_stream called with operation {op} and params:\n{params}")
+        yield StreamEvent('result', ())
+
     def toffoli_simulate(self, op, **params) -> Any:
         logger.debug(f"MockClient.toffoli_simulate called with operation {op} and params:\n{params}")
         return ()
 
+    def performance(self, **kwargs) -> KernelPerformance:
+        logger.debug(f"MockClient.performance called with keyword arguments:\n{kwargs}")
+        return KernelPerformance(total_ram=0, virtual_memory=0, user_time=0.0, total_time=0.0, managed_ram=0, peak_total_ram=0)
+
+    def sample_performance(self) -> KernelPerformance:
+        return self.performance()
+
     def component_versions(self, **kwargs) -> Dict[str, LooseVersion]:
         """
         Returns a dictionary from components of the IQ# kernel to their
@@ -96,6 +124,10 @@ class MockClient(object):
         return {}
 
     @contextmanager
-    def capture_diagnostics(self, passthrough: bool) -> List[Any]:
-        data = []
-        yield data
+    def capture_diagnostics(self, passthrough: bool, max_items : Optional[int] = None, sink : Optional[str] = None) -> List[Any]:
+        data = new_container(max_items=max_items, sink=sink)
+        try:
+            yield data
+        finally:
+            if sink is not None:
+                data.close()
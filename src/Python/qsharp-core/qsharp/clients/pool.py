@@ -0,0 +1,307 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+##
+# pool.py: Client that distributes work across several IQ# kernels.
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+
+## IMPORTS ##
+
+import os
+import queue
+import threading
+
+from contextlib import contextmanager, ExitStack
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Iterable, Iterator, List, Dict, Tuple, Callable, Any, Optional
+from distutils.version import LooseVersion
+
+from qsharp.clients.cancellation import CancellableFuture, call_with_token, current_token, submit
+from qsharp.clients.iqsharp import IQSharpClient, DEFAULT_PIPELINE_WINDOW, DEFAULT_STARTUP_TIMEOUT
+from qsharp.clients.streaming import StreamEvent
+from qsharp.results.diagnostics import new_container
+from qsharp.results.performance import KernelPerformance
+
+## LOGGING ##
+
+import logging
+logger = logging.getLogger(__name__)
+
+## CLASSES ##
+
+class KernelPool(object):
+    """
+    Client that starts several IQ# kernels and sends each simulation request
+    to whichever kernel is currently idle, so that independent calls from
+    different Python threads can run in parallel.
+
+    Calls that change the state of a kernel (compiling snippets, adding
+    packages or projects, setting configuration options or noise models)
+    are replayed into every kernel in the pool, such that all kernels can
+    serve any later simulation request.
+
+    The number of kernels defaults to the value of the
+    `QSHARP_PY_POOL_SIZE` environment variable, or to the number of CPUs
+    if that variable is not set.
+    """
+    clients: List[Any]
+
+    def __init__(self, n_kernels : Optional[int] = None, kernel_name : str = 'iqsharp', client_factory : Optional[Callable[[], Any]] = None):
+        if n_kernels is None:
+            n_kernels = int(os.getenv("QSHARP_PY_POOL_SIZE", os.cpu_count() or 1))
+        if n_kernels < 1:
+            raise ValueError(f"A kernel pool must have at least one kernel, but {n_kernels} were requested.")
+        if client_factory is None:
+            client_factory = partial(IQSharpClient, kernel_name=kernel_name)
+
+        self.clients = [client_factory() for _ in range(n_kernels)]
+        self._idle = queue.Queue()
+        # Only one thread at a time may hold every kernel in the pool, so
+        # that two concurrent broadcasts can't each hold part of the pool
+        # and wait on each other.
+        self._broadcast_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.clients)
+
+    ## Server Lifecycle ##
+
+    def start(self):
+        logger.info(f"Starting pool of {len(self.clients)} IQ# kernels...")
+        for client in self.clients:
+            client.start()
+            self._idle.put(client)
+
+    def stop(self):
+        for client in self.clients:
+            client.stop()
+
+    def is_ready(self):
+        with ThreadPoolExecutor(max_workers=len(self.clients)) as executor:
+            return all(executor.map(lambda client: client.is_ready(), self.clients))
+
+    def wait_until_ready(self, timeout : float = DEFAULT_STARTUP_TIMEOUT) -> bool:
+        with ThreadPoolExecutor(max_workers=len(self.clients)) as executor:
+            return all(executor.map(lambda client: client.wait_until_ready(timeout), self.clients))
+
+    def check_status(self):
+        for client in self.clients:
+            client.check_status()
+
+    def restart(self, only_if_dead : bool = False) -> None:
+        for client in self.clients:
+            client.restart(only_if_dead=only_if_dead)
+
+    def enable_watchdog(self, interval : Optional[float] = None, max_memory : Optional[int] = None) -> List[Any]:
+        """
+        Starts monitoring every kernel in the pool, restarting any kernel
+        that exits, stops answering heartbeats, or uses more than
+        `max_memory` bytes of memory.
+        """
+        return [client.enable_watchdog(interval=interval, max_memory=max_memory) for client in self.clients]
+
+    ## Public Interface ##
+
+    @property
+    def busy(self) -> bool:
+        # The pool can only accept a new request without blocking if at
+        # least one kernel is idle.
+        return self._idle.empty()
+
+    @property
+    def workspace_version(self) -> int:
+        # Calls that change the workspace are broadcast to every kernel, and
+        # each kernel may be restarted on its own, so the workspace of the
+        # pool changes whenever that of any of its kernels does.
+        return sum(client.workspace_version for client in self.clients)
+
+    def submit(self, method : str, *args, **kwargs) -> CancellableFuture:
+        """
+        Calls a method of this pool on a background thread, returning a
+        future whose cancellation interrupts whichever kernel is running
+        the call.
+        """
+        return submit(getattr(self, method), *args, **kwargs)
+
+    def compile(self, body):
+        return self._broadcast('compile', body)
+
+    def get_available_operations(self) -> List[str]:
+        return self._dispatch('get_available_operations')
+
+    def get_operation_metadata(self, name : str) -> Dict[str, Any]:
+        return self._dispatch('get_operation_metadata', name)
+
+    def get_workspace_operations(self) -> List[str]:
+        return self._dispatch('get_workspace_operations')
+
+    def reload(self) -> None:
+        return self._broadcast('reload')
+
+    def get_config(self) -> Dict[str, object]:
+        return self._dispatch('get_config')
+
+    def set_config(self, name : str, value : object) -> None:
+        return self._broadcast('set_config', name, value)
+
+    def save_config(self) -> None:
+        # All kernels share the same configuration, and would all write the
+        # same file, so saving from a single kernel suffices.
+        return self._dispatch('save_config')
+
+    def add_package(self, name : str) -> None:
+        return self._broadcast('add_package', name)
+
+    def get_packages(self) -> List[str]:
+        return self._dispatch('get_packages')
+
+    def add_project(self, path : str) -> None:
+        return self._broadcast('add_project', path)
+
+    def get_projects(self) -> List[str]:
+        return self._dispatch('get_projects')
+
+    def simulate(self, op, **kwargs) -> Any:
+        return self._dispatch('simulate', op, **kwargs)
+
+    def simulate_sparse(self, op, **kwargs) -> Any:
+        return self._dispatch('simulate_sparse', op, **kwargs)
+
+    def toffoli_simulate(self, op, **kwargs) -> Any:
+        return self._dispatch('toffoli_simulate', op, **kwargs)
+
+    def simulate_noise(self, op, **kwargs) -> Any:
+        return self._dispatch('simulate_noise', op, **kwargs)
+
+    def simulate_batch(self, op, kwargs_list : Iterable[Dict[str, Any]], **kwargs) -> List[Any]:
+        return self._dispatch('simulate_batch', op, kwargs_list, **kwargs)
+
+    def simulate_shots(self, op, shots : int, seed : Optional[int] = None, **kwargs) -> List[Tuple[Any, int]]:
+        return self._dispatch('simulate_shots', op, shots, seed, **kwargs)
+
+    def simulate_sparse_shots(self, op, shots : int, seed : Optional[int] = None, **kwargs) -> List[Tuple[Any, int]]:
+        return self._dispatch('simulate_sparse_shots', op, shots, seed, **kwargs)
+
+    def simulate_stream(self, op, **kwargs) -> Iterator[StreamEvent]:
+        # Keep the kernel out of the idle queue until the stream is closed,
+        # rather than only while the stream is being created.
+        with self._acquire() as client:
+            yield from client.simulate_stream(op, **kwargs)
+
+    def trace(self, op, **kwargs) -> Any:
+        return self._dispatch('trace', op, **kwargs)
+
+    def compile_to_qir(self, op, **kwargs) -> None:
+        return self._dispatch('compile_to_qir', op, **kwargs)
+
+    def map(self, op, kwargs_list : Iterable[Dict[str, Any]], magic : str = 'simulate', window : int = DEFAULT_PIPELINE_WINDOW, **kwargs) -> List[Any]:
+        """
+        Runs a Q# callable once for each dictionary of keyword arguments in
+        `kwargs_list`, splitting the calls across all kernels in the pool and
+        pipelining the calls sent to each kernel.
+        """
+        kwargs_list = list(kwargs_list)
+        n_kernels = len(self.clients)
+        results = [None] * len(kwargs_list)
+        # Cancelling the future running this call cancels the calls made to
+        # each kernel on its behalf.
+        token = current_token()
+        with ThreadPoolExecutor(max_workers=n_kernels) as executor:
+            futures = {
+                idx_kernel: executor.submit(
+                    call_with_token, token, self._dispatch, 'map', op, kwargs_list[idx_kernel::n_kernels],
+                    magic=magic, window=window, **kwargs
+                )
+                for idx_kernel in range(min(n_kernels, len(kwargs_list)))
+            }
+            for idx_kernel, future in futures.items():
+                results[idx_kernel::n_kernels] = future.result()
+        return results
+
+    def performance(self, **kwargs) -> KernelPerformance:
+        """
+        Returns the memory and CPU time used by all kernels in the pool.
+        """
+        return KernelPerformance.total(client.performance(**kwargs) for client in self.clients)
+
+    def sample_performance(self) -> KernelPerformance:
+        """
+        Returns the memory and CPU time used by all kernels in the pool,
+        measured from outside of the kernels if possible.
+        """
+        return KernelPerformance.total(client.sample_performance() for client in self.clients)
+
+    def component_versions(self, **kwargs) -> Dict[str, LooseVersion]:
+        """
+        Returns a dictionary from components of the IQ# kernel to their
+        versions.
+        """
+        return self._dispatch('component_versions', **kwargs)
+
+    @contextmanager
+    def capture_diagnostics(self, passthrough: bool, max_items : Optional[int] = None, sink : Optional[str] = None) -> List[Any]:
+        captured_data = new_container(max_items=max_items, sink=sink)
+        try:
+            with ExitStack() as stack:
+                for client in self.clients:
+                    stack.enter_context(client._capture_diagnostics_into(captured_data, passthrough))
+                yield captured_data
+        finally:
+            if sink is not None:
+                captured_data.close()
+
+    def get_noise_model(self) -> str:
+        return self._dispatch('get_noise_model')
+
+    def get_noise_model_by_name(self, name : str) -> None:
+        return self._dispatch('get_noise_model_by_name', name)
+
+    def set_noise_model(self, json_data : str) -> None:
+        return self._broadcast('set_noise_model', json_data)
+
+    def set_noise_model_by_name(self, name : str) -> None:
+        return self._broadcast('set_noise_model_by_name', name)
+
+    ## Internal-Use Methods ##
+
+    @contextmanager
+    def _acquire(self):
+        client = self._idle.get()
+        try:
+            yield client
+        finally:
+            self._idle.put(client)
+
+    def _dispatch(self, method : str, *args, **kwargs) -> Any:
+        """
+        Calls a method on the first kernel that becomes idle.
+        """
+        with self._acquire() as client:
+            return getattr(client, method)(*args, **kwargs)
+
+    def _broadcast(self, method : str, *args, **kwargs) -> Any:
+        """
+        Calls a method on every kernel in the pool, waiting for any running
+        requests to complete first. Returns the result reported by the first
+        kernel in the pool.
+        """
+        with self._broadcast_lock:
+            # Take every kernel out of the idle queue so that no simulation
+            # can observe a kernel whose state is only partially updated.
+            held = [self._idle.get() for _ in self.clients]
+            try:
+                with ThreadPoolExecutor(max_workers=len(self.clients)) as executor:
+                    futures = [
+                        executor.submit(getattr(client, method), *args, **kwargs)
+                        for client in self.clients
+                    ]
+                    # Propagate the first exception, if any, after every
+                    # kernel has finished.
+                    results = [future.result() for future in futures]
+            finally:
+                for client in held:
+                    self._idle.put(client)
+        return results[0]
@@ -0,0 +1,130 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+##
+# scheduler.py: Queues concurrent requests to a single IQ# kernel.
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+
+## IMPORTS ##
+
+import heapq
+import itertools
+import threading
+import time
+
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import List, Optional
+
+## CLASSES ##
+
+@dataclass
+class SchedulerStats:
+    """
+    Summarizes how requests have waited for access to the kernel.
+    Times are given in seconds.
+    """
+    queue_depth: int
+    max_queue_depth: int
+    n_requests: int
+    total_wait: float
+    max_wait: float
+
+    @property
+    def mean_wait(self) -> float:
+        return self.total_wait / self.n_requests if self.n_requests else 0.0
+
+class RequestScheduler(object):
+    """
+    Grants exclusive use of a kernel's shell channel to one request at a
+    time. Requests with a higher priority are granted access first; requests
+    with equal priority are granted access in the order in which they
+    arrived.
+
+    Sending a second request while the kernel is still replying to the
+    first can interleave their messages on the ZeroMQ sockets (see
+    https://github.com/Microsoft/QuantumLibraries/issues/69), so callers
+    from other threads wait in this queue instead of failing.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._waiting : List[list] = []
+        self._counter = itertools.count()
+        self._owner : Optional[int] = None
+
+        self._max_queue_depth = 0
+        self._n_requests = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    @property
+    def busy(self) -> bool:
+        """
+        Whether any request currently holds the kernel.
+        """
+        return self._owner is not None
+
+    @property
+    def held_by_current_thread(self) -> bool:
+        """
+        Whether the calling thread currently holds the kernel, such that
+        waiting for it again would deadlock.
+        """
+        return self._owner == threading.get_ident()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiting)
+
+    @contextmanager
+    def acquire(self, priority : int = 0):
+        """
+        Returns a context manager that waits until the calling thread has
+        exclusive use of the kernel, and that releases the kernel on exit.
+        """
+        # Negate the priority, as heapq keeps the smallest entry first.
+        entry = [-priority, next(self._counter)]
+        queued_at = time.perf_counter()
+        with self._condition:
+            heapq.heappush(self._waiting, entry)
+            self._max_queue_depth = max(self._max_queue_depth, len(self._waiting))
+            try:
+                while self._owner is not None or self._waiting[0] is not entry:
+                    self._condition.wait()
+            except BaseException:
+                # Don't leave an abandoned entry at the head of the queue
+                # (e.g.: after a KeyboardInterrupt).
+                self._waiting.remove(entry)
+                heapq.heapify(self._waiting)
+                self._condition.notify_all()
+                raise
+            heapq.heappop(self._waiting)
+            self._owner = threading.get_ident()
+
+            wait = time.perf_counter() - queued_at
+            self._n_requests += 1
+            self._total_wait += wait
+            self._max_wait = max(self._max_wait, wait)
+
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._owner = None
+                self._condition.notify_all()
+
+    def stats(self) -> SchedulerStats:
+        """
+        Returns a snapshot of queueing metrics for this scheduler.
+        """
+        with self._condition:
+            return SchedulerStats(
+                queue_depth=len(self._waiting),
+                max_queue_depth=self._max_queue_depth,
+                n_requests=self._n_requests,
+                total_wait=self._total_wait,
+                max_wait=self._max_wait
+            )
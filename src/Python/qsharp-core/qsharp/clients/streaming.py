@@ -0,0 +1,172 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+##
+# streaming.py: Streams diagnostics and output from a running simulation to
+#     Python as they arrive.
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+
+## IMPORTS ##
+
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Iterator, Optional
+
+from qsharp.clients.cancellation import submit
+
+## LOGGING ##
+
+import logging
+logger = logging.getLogger(__name__)
+
+## CONSTANTS ##
+
+DEFAULT_MAX_BUFFERED = 64
+
+# What to do with a new event when the buffer is full:
+#     block: wait for the consumer to take an event, which in turn stops
+#         reading messages from the kernel;
+#     drop_oldest: discard the oldest buffered event to make room;
+#     drop_newest: discard the new event.
+POLICIES = ('block', 'drop_oldest', 'drop_newest')
+
+## CLASSES ##
+
+@dataclass
+class StreamEvent:
+    """
+    A single item streamed from a running simulation.
+
+    `kind` is one of `diagnostic` (e.g.: the output of `DumpMachine`,
+    decoded from JSON where possible), `stdout` or `stderr` (e.g.: text
+    from `Message`), or `result` for the output of the simulated callable,
+    which is always the last event. `dropped` counts the events discarded
+    before this one because the buffer was full.
+    """
+    kind: str
+    data: Any
+    dropped: int = 0
+
+class SimulationStream(object):
+    """
+    Runs a simulation on a background thread, buffering at most
+    `max_buffered` of the events it produces until they are consumed.
+
+    The final `result` event is never dropped. Closing the stream before
+    the simulation has completed cancels it.
+    """
+
+    def __init__(self, run : Callable[[Callable[[str, Any], None]], Any],
+                 max_buffered : int = DEFAULT_MAX_BUFFERED, policy : str = 'block'):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown stream buffer policy {policy!r}; expected one of {', '.join(POLICIES)}.")
+        if max_buffered < 1:
+            raise ValueError(f"Stream buffer must hold at least one event, but max_buffered was {max_buffered}.")
+        self.max_buffered = max_buffered
+        self.policy = policy
+        self.dropped = 0
+        self._events = deque()
+        self._condition = threading.Condition()
+        self._finished = False
+        self._closed = False
+        self._error : Optional[BaseException] = None
+        self._future = submit(self._produce, run)
+
+    def _produce(self, run : Callable[[Callable[[str, Any], None]], Any]) -> None:
+        try:
+            result = run(self._emit)
+            self._put(StreamEvent('result', result, self.dropped), force=True)
+        except BaseException as ex:
+            with self._condition:
+                self._error = ex
+        finally:
+            with self._condition:
+                self._finished = True
+                self._condition.notify_all()
+
+    def _emit(self, kind : str, data : Any) -> None:
+        self._put(StreamEvent(kind, data, self.dropped))
+
+    def _put(self, event : StreamEvent, force : bool = False) -> None:
+        with self._condition:
+            if not force and len(self._events) >= self.max_buffered:
+                if self.policy == 'drop_newest':
+                    self.dropped += 1
+                    return
+                elif self.policy == 'drop_oldest':
+                    self._events.popleft()
+                    self.dropped += 1
+                else:
+                    self._condition.wait_for(lambda: self._closed or len(self._events) < self.max_buffered)
+            if self._closed:
+                return
+            self._events.append(event)
+            self._condition.notify_all()
+
+    def next_event(self) -> Optional[StreamEvent]:
+        """
+        Waits for the next event, returning None once the simulation has
+        completed and every event has been consumed. Raises any error raised
+        by the simulation.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._events or self._finished or self._closed)
+            if self._events:
+                event = self._events.popleft()
+                self._condition.notify_all()
+                return event
+            if self._error is not None and not self._closed:
+                raise self._error
+            return None
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            self._events.clear()
+            self._condition.notify_all()
+        self._future.cancel()
+        if self.dropped:
+            logger.info(f"Dropped {self.dropped} streamed events, as the stream buffer was full.")
+
+## FUNCTIONS ##
+
+def iterate(stream : SimulationStream) -> Iterator[StreamEvent]:
+    """
+    Yields the events of a stream, closing it when the generator is closed
+    (e.g.: by breaking out of a `for` loop over it).
+    """
+    try:
+        while True:
+            event = stream.next_event()
+            if event is None:
+                return
+            yield event
+    finally:
+        stream.close()
+
+async def aiterate(events : Iterator[StreamEvent]) -> AsyncIterator[StreamEvent]:
+    """
+    Yields the events of a stream generator (e.g.: as returned by
+    `simulate_stream`) without blocking the running event loop.
+    """
+    # Imported here, as asyncio is slow to import and only needed by
+    # asynchronous callers.
+    import asyncio
+    pending = None
+    try:
+        while True:
+            pending = submit(next, events, None)
+            event = await asyncio.wrap_future(pending)
+            if event is None:
+                return
+            yield event
+    finally:
+        if pending is None:
+            events.close()
+        else:
+            # A generator can't be closed while another thread is running
+            # it, so close it once that thread has its next event.
+            pending.add_done_callback(lambda _: events.close())
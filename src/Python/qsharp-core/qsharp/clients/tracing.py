@@ -0,0 +1,251 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+##
+# tracing.py: Timing spans and latency statistics for calls made through Q#
+#     clients.
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+
+## IMPORTS ##
+
+import copy
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+## LOGGING ##
+
+import logging
+logger = logging.getLogger(__name__)
+
+## CONSTANTS ##
+
+# Latencies are counted in buckets whose upper bounds grow geometrically by
+# BUCKET_GROWTH, starting from MIN_LATENCY seconds; the last bucket counts
+# every latency longer than that (about ten minutes).
+MIN_LATENCY = 1e-5
+BUCKET_GROWTH = 1.25
+N_BUCKETS = 82
+BUCKET_BOUNDS = [MIN_LATENCY * BUCKET_GROWTH ** idx for idx in range(N_BUCKETS)]
+
+## CLASSES ##
+
+@dataclass
+class Span:
+    """
+    Times one phase of a call, in seconds as measured by
+    `time.perf_counter`. Spans nest: the span for a whole call has a child
+    span for each of its phases (e.g.: `map_tuples`, `queue`, `send`,
+    `first_iopub`, `execute_reply` and `decode`).
+    """
+    name: str
+    start: float
+    end: Optional[float] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    children: List["Span"] = field(default_factory=list)
+
+    @property
+    def duration(self) -> Optional[float]:
+        return None if self.end is None else self.end - self.start
+
+    def add_child(self, name : str, start : float, end : Optional[float] = None, **attributes) -> "Span":
+        child = Span(name, start, end, attributes)
+        self.children.append(child)
+        return child
+
+    @contextmanager
+    def child(self, name : str, **attributes) -> Iterator["Span"]:
+        """
+        Times the body of a `with` statement as a child of this span.
+        """
+        child = self.add_child(name, time.perf_counter(), **attributes)
+        try:
+            yield child
+        finally:
+            child.end = time.perf_counter()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'start': self.start,
+            'duration': self.duration,
+            'attributes': dict(self.attributes),
+            'children': [child.to_dict() for child in self.children]
+        }
+
+@dataclass
+class CallStats:
+    """
+    Aggregated statistics for all calls of one kind (e.g.: `%simulate`).
+    Latency percentiles are estimated from a histogram, and are accurate to
+    within a factor of BUCKET_GROWTH.
+    """
+    count: int = 0
+    n_errors: int = 0
+    total_seconds: float = 0.0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    buckets: List[int] = field(default_factory=lambda: [0] * N_BUCKETS)
+
+    def record(self, span : Span) -> None:
+        duration = span.duration
+        self.count += 1
+        self.total_seconds += duration
+        self.bytes_in += span.attributes.get('bytes_in', 0)
+        self.bytes_out += span.attributes.get('bytes_out', 0)
+        if 'error' in span.attributes:
+            self.n_errors += 1
+        self.buckets[min(bisect_left(BUCKET_BOUNDS, duration), N_BUCKETS - 1)] += 1
+
+    def percentile(self, q : float) -> Optional[float]:
+        """
+        Returns the upper bound of the bucket that holds the `q`-th
+        percentile latency, in seconds.
+        """
+        if self.count == 0:
+            return None
+        rank = q / 100 * self.count
+        seen = 0
+        for bound, count in zip(BUCKET_BOUNDS, self.buckets):
+            seen += count
+            if seen >= rank and count:
+                return bound
+        return BUCKET_BOUNDS[-1]
+
+    @property
+    def p50(self) -> Optional[float]:
+        return self.percentile(50)
+
+    @property
+    def p95(self) -> Optional[float]:
+        return self.percentile(95)
+
+    @property
+    def p99(self) -> Optional[float]:
+        return self.percentile(99)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'n_errors': self.n_errors,
+            'total_seconds': self.total_seconds,
+            'p50': self.p50,
+            'p95': self.p95,
+            'p99': self.p99,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'buckets': {bound: count for bound, count in zip(BUCKET_BOUNDS, self.buckets) if count}
+        }
+
+class Tracer(object):
+    """
+    Times calls made through Q# clients, aggregates their latencies by
+    kind of call, and passes the span of each completed call to every
+    registered hook (e.g.: to export it to a tracing system).
+
+    Calls nest: a call started while another call is running on the same
+    thread adds its phases to the span of that outer call, rather than
+    starting a span of its own.
+    """
+    hooks : List[Callable[[Span], None]]
+
+    def __init__(self):
+        self.hooks = []
+        self._stats : Dict[str, CallStats] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def add_hook(self, hook : Callable[[Span], None]) -> None:
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook : Callable[[Span], None]) -> None:
+        self.hooks.remove(hook)
+
+    @property
+    def current(self) -> Optional[Span]:
+        """
+        The span of the call running on the calling thread, if any.
+        """
+        return getattr(self._local, 'span', None)
+
+    @contextmanager
+    def call(self, name : str, **attributes) -> Iterator[Span]:
+        span = self.current
+        if span is not None:
+            yield span
+            return
+
+        span = Span(name, time.perf_counter(), attributes=attributes)
+        self._local.span = span
+        try:
+            yield span
+        except BaseException as ex:
+            span.attributes['error'] = type(ex).__name__
+            raise
+        finally:
+            span.end = time.perf_counter()
+            self._local.span = None
+            self._finish(span)
+
+    def _finish(self, span : Span) -> None:
+        with self._lock:
+            self._stats.setdefault(span.name, CallStats()).record(span)
+        for hook in list(self.hooks):
+            try:
+                hook(span)
+            except Exception as ex:
+                logger.warning(f"Span hook {hook!r} failed.", exc_info=ex)
+
+    def stats(self, reset : bool = False) -> Dict[str, CallStats]:
+        """
+        Returns a copy of the statistics for each kind of call, optionally
+        clearing them such that no call is either counted twice or missed.
+        """
+        with self._lock:
+            stats = copy.deepcopy(self._stats)
+            if reset:
+                self._stats.clear()
+            return stats
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+
+## FUNCTIONS ##
+
+def add_kernel_tasks(span : Span, report : Dict[str, Any], received : Optional[float] = None) -> None:
+    """
+    Adds the tasks timed by the IQ# kernel while executing a request (as
+    reported when the `internal.tracePerf` configuration option is set) as
+    children of the span for that request, named `kernel:<task id>`.
+
+    Reports are sent as the kernel finishes executing, so kernel times are
+    aligned to the time at which the report was `received`.
+    """
+    if received is None:
+        received = time.perf_counter()
+    start = received - report.get('total_ms', 0) / 1000
+    for task in report.get('tasks', []):
+        _add_kernel_task(span, task, start)
+
+def _add_kernel_task(parent : Span, task : Dict[str, Any], start : float) -> None:
+    task_start = start + task['start_ms'] / 1000
+    duration_ms = task.get('duration_ms')
+    child = parent.add_child(
+        f"kernel:{task['id']}", task_start,
+        None if duration_ms is None else task_start + duration_ms / 1000,
+        description=task.get('description', ''),
+        statuses={status['id']: status['at_ms'] / 1000 for status in task.get('statuses', [])}
+    )
+    for subtask in task.get('children', []):
+        _add_kernel_task(child, subtask, start)
+
+## GLOBALS ##
+
+# Shared by every client, so that statistics cover all kernels in a pool.
+tracer = Tracer()
@@ -0,0 +1,166 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+##
+# watchdog.py: Monitors the health of an IQ# kernel, restarting it when
+#     needed.
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+
+## IMPORTS ##
+
+import threading
+from typing import Any, Optional
+
+from qsharp.results.performance import KernelPerformance
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+## LOGGING ##
+
+import logging
+logger = logging.getLogger(__name__)
+
+## CONSTANTS ##
+
+DEFAULT_WATCHDOG_INTERVAL = 5
+DEFAULT_MAX_MISSED_HEARTBEATS = 3
+
+## FUNCTIONS ##
+
+def _kernel_pid(kernel_manager) -> Optional[int]:
+    """
+    Returns the process ID of the kernel started by a kernel manager, if
+    known.
+    """
+    # Newer versions of jupyter_client launch kernels through provisioners,
+    # while older versions keep the kernel process on the manager itself.
+    provisioner = getattr(kernel_manager, 'provisioner', None)
+    if provisioner is not None:
+        return getattr(provisioner, 'pid', None)
+    return getattr(getattr(kernel_manager, 'kernel', None), 'pid', None)
+
+def kernel_memory(kernel_manager) -> Optional[int]:
+    """
+    Returns the resident memory used by a kernel and its child processes,
+    in bytes, or None if this can't be determined (e.g.: if psutil is not
+    installed).
+    """
+    pid = _kernel_pid(kernel_manager)
+    if psutil is None or pid is None:
+        return None
+    try:
+        process = psutil.Process(pid)
+        return sum(
+            proc.memory_info().rss
+            for proc in [process] + process.children(recursive=True)
+        )
+    except psutil.Error:
+        return None
+
+def kernel_performance(kernel_manager) -> Optional[KernelPerformance]:
+    """
+    Measures the memory and CPU time used by a kernel and its child
+    processes from outside of the kernel, such that the kernel can be
+    measured while it is busy. Returns None if this can't be determined
+    (e.g.: if psutil is not installed).
+    """
+    pid = _kernel_pid(kernel_manager)
+    if psutil is None or pid is None:
+        return None
+    try:
+        process = psutil.Process(pid)
+        processes = [process] + process.children(recursive=True)
+        memory = [proc.memory_info() for proc in processes]
+        cpu_times = [proc.cpu_times() for proc in processes]
+    except psutil.Error:
+        return None
+    return KernelPerformance(
+        total_ram=sum(info.rss for info in memory),
+        virtual_memory=sum(info.vms for info in memory),
+        user_time=sum(times.user for times in cpu_times),
+        total_time=sum(times.user + times.system for times in cpu_times)
+    )
+
+## CLASSES ##
+
+class KernelWatchdog(object):
+    """
+    Checks the health of a client's kernel every `interval` seconds on a
+    background thread, and restarts the kernel through `client.restart()`
+    if it has exited, has missed `max_missed_heartbeats` heartbeats in a
+    row, or uses more than `max_memory` bytes of memory.
+
+    Restarts wait for any running request to complete, so that a kernel
+    running low on memory is recycled between two requests rather than in
+    the middle of one. Measuring memory requires psutil; without it, only
+    liveness and heartbeats are checked.
+    """
+
+    def __init__(self, client : Any, interval : float = DEFAULT_WATCHDOG_INTERVAL,
+                 max_memory : Optional[int] = None,
+                 max_missed_heartbeats : int = DEFAULT_MAX_MISSED_HEARTBEATS):
+        self.client = client
+        self.interval = interval
+        self.max_memory = max_memory
+        self.max_missed_heartbeats = max_missed_heartbeats
+        self.n_restarts = 0
+        self._missed_heartbeats = 0
+        self._stopped = threading.Event()
+        self._thread : Optional[threading.Thread] = None
+
+        if max_memory is not None and psutil is None:
+            logger.warning("psutil is not installed, so the memory used by the IQ# kernel will not be monitored.")
+
+    def start(self) -> None:
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="qsharp-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def check(self) -> Optional[str]:
+        """
+        Returns why the kernel needs to be restarted, or None if it is
+        healthy.
+        """
+        kernel_manager = self.client.kernel_manager
+        if kernel_manager is None:
+            return None
+        if not kernel_manager.is_alive():
+            return "the kernel exited"
+
+        hb_channel = self.client.kernel_client.hb_channel
+        if hb_channel.is_alive() and not hb_channel.is_beating():
+            self._missed_heartbeats += 1
+            if self._missed_heartbeats >= self.max_missed_heartbeats:
+                return f"the kernel missed {self._missed_heartbeats} heartbeats"
+        else:
+            self._missed_heartbeats = 0
+
+        if self.max_memory is not None:
+            memory = kernel_memory(kernel_manager)
+            if memory is not None and memory > self.max_memory:
+                return f"the kernel is using {memory / 2**20:.0f} MiB of memory, more than the limit of {self.max_memory / 2**20:.0f} MiB"
+
+        return None
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            reason = self.check()
+            if reason is None:
+                continue
+            logger.warning(f"Restarting IQ# kernel, as {reason}.")
+            try:
+                # If the kernel has exited, another thread may restart it
+                # before we get to; don't restart that new kernel again.
+                self.client.restart(only_if_dead=not self.client.kernel_manager.is_alive())
+                self.n_restarts += 1
+            except Exception as ex:
+                logger.error("Failed to restart IQ# kernel.", exc_info=ex)
+            self._missed_heartbeats = 0
@@ -9,15 +9,109 @@
 
 import sys
 import logging
+import threading
 from types import ModuleType, new_class
 from importlib.abc import MetaPathFinder, Loader
-from typing import Iterable, Optional, Any, Dict, Tuple
+from typing import AsyncIterator, FrozenSet, Iterable, Iterator, Optional, Any, Dict, List, Tuple
 
 import qsharp
-from qsharp.clients.iqsharp import IQSharpError
+from qsharp.clients.cancellation import CancellableFuture, submit
+from qsharp.clients.streaming import DEFAULT_MAX_BUFFERED, StreamEvent
+from qsharp.results.histogram import Histogram
+from qsharp.signatures import CallableCodec, GENERIC_CODEC, compile_codec
 
 logger = logging.getLogger(__name__)
 
+class _NamespaceNode(object):
+    __slots__ = ('children', 'callables')
+
+    def __init__(self):
+        # Nodes for namespaces whose names extend that of this node by one
+        # more part, keyed by that part.
+        self.children : Dict[str, "_NamespaceNode"] = {}
+        self.callables : FrozenSet[str] = frozenset()
+
+class NamespaceIndex(object):
+    """
+    The Q# namespaces available in a workspace, as listed by the kernel,
+    along with the callables in each namespace.
+
+    Namespaces are kept in a trie keyed by each part of their names, which
+    also includes prefixes of those names (e.g.: `Microsoft` and
+    `Microsoft.Quantum` for `Microsoft.Quantum.Intrinsic`), since those can
+    be imported as Python packages. Lookups take time proportional to the
+    number of parts of the name looked up, however many namespaces there are.
+    """
+    # Callables by the name of the namespace that they are members of.
+    callables : Dict[str, List[str]]
+
+    def __init__(self, callables : Dict[str, List[str]]):
+        self.callables = callables
+        self._root = _NamespaceNode()
+        for ns_name, ns_callables in callables.items():
+            node = self._root
+            for part in ns_name.split("."):
+                child = node.children.get(part)
+                if child is None:
+                    child = node.children[part] = _NamespaceNode()
+                node = child
+            node.callables = frozenset(ns_callables)
+
+    def _find(self, ns_name : str) -> Optional[_NamespaceNode]:
+        node = self._root
+        for part in ns_name.split("."):
+            node = node.children.get(part)
+            if node is None:
+                return None
+        return node
+
+    def __contains__(self, ns_name : str) -> bool:
+        return self._find(ns_name) is not None
+
+    def has_callable(self, ns_name : str, name : str) -> bool:
+        node = self._find(ns_name)
+        return node is not None and name in node.callables
+
+    def members(self, ns_name : str) -> List[str]:
+        """
+        Returns the names of the sub-namespaces and callables of a given
+        namespace, sorted.
+        """
+        node = self._find(ns_name)
+        return [] if node is None else sorted([*node.children, *node.callables])
+
+# The index for the workspace of qsharp.client, along with that client and
+# its workspace version when the index was built.
+_index : Optional[NamespaceIndex] = None
+_index_key : Optional[Tuple[Any, int]] = None
+_index_lock = threading.RLock()
+
+def _current_index_key() -> Optional[Tuple[Any, int]]:
+    client = qsharp.client
+    version = getattr(client, 'workspace_version', None)
+    return None if version is None else (client, version)
+
+def namespace_index() -> NamespaceIndex:
+    """
+    Returns the index of Q# namespaces available from `qsharp.client`,
+    listing them from the kernel only when its workspace may have changed
+    since the index was last built, that is, after compiling snippets,
+    reloading the workspace, adding packages or projects, or restarting the
+    kernel. Clients that do not report a `workspace_version` are asked for
+    their namespaces every time.
+    """
+    global _index, _index_key
+    # Read the version before listing namespaces, such that changes made
+    # while listing them invalidate the index that is built.
+    key = _current_index_key()
+    if key is None:
+        return NamespaceIndex(qsharp.get_available_operations_by_namespace())
+    with _index_lock:
+        if _index is None or _index_key != key:
+            _index = NamespaceIndex(qsharp.get_available_operations_by_namespace())
+            _index_key = key
+        return _index
+
 
 class QSharpModuleFinder(MetaPathFinder):
     def find_module(self, full_name : str, path : Optional[str] = None) -> Loader:
@@ -41,18 +135,35 @@ class QSharpModuleFinder(MetaPathFinder):
         if qsharp.client.busy:
             return None
 
+        # Every failed import reaches this finder, including optional
+        # dependencies that some Python package tries and fails to import, so
+        # we never start the client from here: until it has been started by
+        # some other call, no name is a Q# namespace. While prewarm steps
+        # that may add namespaces are running, only names that look like Q#
+        # namespaces, which are conventionally capitalized, rather than like
+        # Python packages, wait for them.
+        if not getattr(qsharp.client, 'started', True):
+            return None
+        if not full_name[:1].isupper() and getattr(qsharp.client, 'prewarming', False):
+            return None
+
         # At this point, we should be safe to rely on the public API again.
-        ops = qsharp.get_available_operations_by_namespace()
-
-        if full_name not in ops:
-            # We may have been given part of the qualified name of a namespace.
-            # E.g., if we try to import Microsoft.Quantum.Intrinsic, we'll
-            # see calls with "Microsoft" and "Microsoft.Quantum" first.
-            if not any(
-                ns_name.startswith(full_name + ".")
-                for ns_name in ops
-            ):
-                return None
+        # Names are looked up in the namespace index, which only needs the
+        # kernel if the workspace has changed since the last lookup, as this
+        # finder is asked about every module that no other finder can load.
+        # The index also includes prefixes of namespace names, since if we
+        # try to import Microsoft.Quantum.Intrinsic, we'll see calls with
+        # "Microsoft" and "Microsoft.Quantum" first.
+        # If the kernel can't list its namespaces, the import fails with ImportError as it would have
+        # without this finder, such that code which guards an optional import
+        # with `except ImportError` keeps working.
+        try:
+            index = namespace_index()
+        except Exception as ex:
+            logger.debug(f"Could not list Q# namespaces while importing {full_name}.", exc_info=ex)
+            return None
+        if full_name not in index:
+            return None
 
         return QSharpModuleLoader()
 
@@ -70,6 +181,12 @@ class QSharpModuleLoader(Loader):
 
 class QSharpCallable(object):
     _name : str
+    # The signature of this callable as reported by the kernel (empty if the
+    # kernel did not report one), or None if it has not been fetched yet.
+    _signature : Optional[str] = None
+    # The codec compiled from that signature, once it has been fetched.
+    _codec : Optional[CallableCodec] = None
+
     def __init__(self, callable_name : str, source : str):
         self._name = callable_name
         self.source = source
@@ -77,6 +194,39 @@ class QSharpCallable(object):
     def __repr__(self) -> str:
         return f"<Q# callable {self._name}>"
 
+    def _get_codec(self) -> CallableCodec:
+        """
+        Returns the codec for the arguments and output of this callable,
+        compiling it from the signature of this callable the first time that
+        it is needed. Clients use whichever codec has been compiled, so this
+        is called before calls are sent to the client, rather than by the
+        client while it holds a kernel.
+        """
+        if self._codec is None:
+            if self._signature is None:
+                try:
+                    metadata = qsharp.client.get_operation_metadata(self._name)
+                except Exception as ex:
+                    logger.debug(f"Could not get the signature of {self._name}.", exc_info=ex)
+                    return GENERIC_CODEC
+                self._signature = (metadata or {}).get('signature') or ''
+            self._codec = compile_codec(self._signature)
+        return self._codec
+
+    async def _get_codec_async(self) -> CallableCodec:
+        """
+        Like `_get_codec`, but asks the asyncio client for the signature of
+        this callable, such that the running event loop is not blocked.
+        """
+        if self._codec is None and self._signature is None:
+            try:
+                metadata = await qsharp.get_async_client().get_operation_metadata(self._name)
+            except Exception as ex:
+                logger.debug(f"Could not get the signature of {self._name}.", exc_info=ex)
+                return GENERIC_CODEC
+            self._signature = (metadata or {}).get('signature') or ''
+        return self._get_codec()
+
     def __call__(self, **kwargs) -> Any:
         """
         Executes this function or operation on the QuantumSimulator target
@@ -88,14 +238,97 @@ class QSharpCallable(object):
         """
         Executes this function or operation on the QuantumSimulator target
         machine, returning its output as a Python object.
+
+        Arrays of numbers, booleans or results in the output are returned
+        as NumPy arrays if `_as_numpy_=True` is given, or by default if set
+        by `qsharp.serialization.set_as_numpy`.
         """
+        self._get_codec()
         return qsharp.client.simulate(self, **kwargs)
 
+    def simulate_batch(self, kwargs_list : Iterable[Dict[str, Any]], batch_size : Optional[int] = None, **kwargs) -> List[Any]:
+        """
+        Executes this function or operation on the QuantumSimulator target
+        machine once for each dictionary of arguments in `kwargs_list`,
+        returning a list with the output of each call.
+
+        All calls are sent to the kernel in a single request, rather than
+        one request per call.
+
+        :param batch_size: If given, sends at most this many calls per
+            request, such that very large sweeps don't have to be encoded
+            into a single message.
+        """
+        self._get_codec()
+        kwargs_list = list(kwargs_list)
+        if batch_size is None:
+            batch_size = max(len(kwargs_list), 1)
+        results = []
+        for idx_start in range(0, len(kwargs_list), batch_size):
+            results.extend(qsharp.client.simulate_batch(
+                self, kwargs_list[idx_start:idx_start + batch_size], **kwargs
+            ))
+        return results
+
+    def simulate_shots(self, shots : int, seed : Optional[int] = None, **kwargs) -> Histogram:
+        """
+        Executes this function or operation `shots` times on a single
+        instance of the QuantumSimulator target machine, returning a
+        histogram of how many times each output was returned.
+
+        All shots run in a single request to the kernel.
+
+        :param seed: If given, seeds the random number generator of the
+            simulator, such that the returned histogram is reproducible.
+        """
+        self._get_codec()
+        return Histogram.from_counts(qsharp.client.simulate_shots(self, shots, seed, **kwargs))
+
+    def simulate_sparse_shots(self, shots : int, seed : Optional[int] = None, **kwargs) -> Histogram:
+        """
+        Executes this function or operation `shots` times on a single
+        instance of the sparse simulator, returning a histogram of how many
+        times each output was returned.
+
+        :param seed: If given, seeds the random number generator of the
+            simulator, such that the returned histogram is reproducible.
+        """
+        self._get_codec()
+        return Histogram.from_counts(qsharp.client.simulate_sparse_shots(self, shots, seed, **kwargs))
+
+    def simulate_stream(self, max_buffered : int = DEFAULT_MAX_BUFFERED, policy : str = 'block', **kwargs) -> Iterator[StreamEvent]:
+        """
+        Executes this function or operation on the QuantumSimulator target
+        machine, yielding each diagnostic (e.g.: from `DumpMachine`) and
+        message as soon as it is emitted, followed by a `result` event with
+        the output of the callable.
+
+        :param max_buffered: The number of events held in memory while
+            waiting for them to be consumed.
+        :param policy: What to do when `max_buffered` events are held:
+            `block` pauses reading from the kernel, while `drop_oldest` and
+            `drop_newest` discard an event.
+        """
+        self._get_codec()
+        return qsharp.client.simulate_stream(self, max_buffered=max_buffered, policy=policy, **kwargs)
+
+    def simulate_iter(self, **kwargs) -> Iterator[Any]:
+        """
+        Executes this function or operation on the QuantumSimulator target
+        machine, yielding the items of its output (which must be an array)
+        one at a time. Each item is only decoded once it is requested, such
+        that very large outputs never need to be held in memory at once as
+        Python objects.
+        """
+        self._get_codec()
+        return iter(qsharp.client.simulate(self, _lazy_=True, **kwargs))
+
     def simulate_sparse(self, **kwargs) -> Any:
         """
         Executes this function or operation on the sparse simulator, returning
         its output as a Python object.
         """
+        self._get_codec()
         return qsharp.client.simulate_sparse(self, **kwargs)
 
     def toffoli_simulate(self, **kwargs) -> Any:
@@ -103,6 +336,7 @@ class QSharpCallable(object):
         Executes this function or operation on the ToffoliSimulator target
         machine, returning its output as a Python object.
         """
+        self._get_codec()
         return qsharp.client.toffoli_simulate(self, **kwargs)
 
     def trace(self, **kwargs) -> Any:
@@ -118,8 +352,74 @@ class QSharpCallable(object):
         using the currently set noise model and returning its output as a
         Python object.
         """
+        self._get_codec()
         return qsharp.client.simulate_noise(self, **kwargs)
 
+    def submit(self, method : str = 'simulate', **kwargs) -> CancellableFuture:
+        """
+        Starts running this function or operation in the background with
+        the given method (e.g.: `simulate`, `simulate_sparse` or
+        `simulate_shots`), returning a future for its output.
+
+        Cancelling the future, or exceeding a `_timeout_` given in seconds,
+        interrupts the kernel, such that later calls don't wait for the
+        abandoned simulation to complete.
+        """
+        return submit(getattr(self, method), **kwargs)
+
+    async def simulate_async(self, **kwargs) -> Any:
+        """
+        Executes this function or operation on the QuantumSimulator target
+        machine without blocking the running event loop, returning its output
+        as a Python object.
+        """
+        await self._get_codec_async()
+        return await qsharp.get_async_client().simulate(self, **kwargs)
+
+    async def simulate_stream_async(self, max_buffered : int = DEFAULT_MAX_BUFFERED, policy : str = 'block', **kwargs) -> AsyncIterator[StreamEvent]:
+        """
+        Like `simulate_stream`, but yields events without blocking the
+        running event loop.
+        """
+        from qsharp.clients.streaming import aiterate
+        async for event in aiterate(self.simulate_stream(max_buffered=max_buffered, policy=policy, **kwargs)):
+            yield event
+
+    async def simulate_sparse_async(self, **kwargs) -> Any:
+        """
+        Executes this function or operation on the sparse simulator without
+        blocking the running event loop, returning its output as a Python
+        object.
+        """
+        await self._get_codec_async()
+        return await qsharp.get_async_client().simulate_sparse(self, **kwargs)
+
+    async def toffoli_simulate_async(self, **kwargs) -> Any:
+        """
+        Executes this function or operation on the ToffoliSimulator target
+        machine without blocking the running event loop, returning its output
+        as a Python object.
+        """
+        await self._get_codec_async()
+        return await qsharp.get_async_client().toffoli_simulate(self, **kwargs)
+
+    async def trace_async(self, **kwargs) -> Any:
+        """
+        Returns a structure representing the set of gates and qubits
+        used to execute this operation, without blocking the running event
+        loop.
+        """
+        return await qsharp.get_async_client().trace(self, **kwargs)
+
+    async def simulate_noise_async(self, **kwargs) -> Any:
+        """
+        Executes this function or operation on the open systems simulator
+        without blocking the running event loop, using the currently set noise
+        model and returning its output as a Python object.
+        """
+        await self._get_codec_async()
+        return await qsharp.get_async_client().simulate_noise(self, **kwargs)
+
     def as_qir(self, **kwargs) -> str:
         """
         Returns the QIR representation of the callable,
@@ -146,6 +446,21 @@ class QSharpCallable(object):
                                             **kwargs)
         if data and ("Text" in data):
             return data['Text']
+        from qsharp.clients.iqsharp import IQSharpError
+        raise IQSharpError([f'Error in generating QIR. {data}'])
+
+    async def as_qir_async(self, **kwargs) -> str:
+        """
+        Returns the QIR representation of the callable without blocking the
+        running event loop, assuming the callable is an entry point.
+
+        Accepts the same keyword arguments as `as_qir`.
+        """
+        data = await qsharp.get_async_client().compile_to_qir(self,
+                                                             **kwargs)
+        if data and ("Text" in data):
+            return data['Text']
+        from qsharp.clients.iqsharp import IQSharpError
         raise IQSharpError([f'Error in generating QIR. {data}'])
 
     def _repr_qir_(self, **kwargs: Any) -> bytes:
@@ -183,39 +498,11 @@ class QSharpModule(ModuleType):
         self.__path__ = []
         self.__loader__ = loader
 
-    def _all_sub_namespaces_as_parts(self) -> Iterable[Tuple[str]]:
-        qs_namespaces = qsharp.get_available_operations_by_namespace().keys()
-        all_namespaces = set()
-        for ns in qs_namespaces:
-            parts = tuple(ns.split("."))
-            all_namespaces.add(parts)
-            for idx_part in range(1, len(parts)):
-                all_namespaces.add(tuple(parts[:-idx_part]))
-
-        return all_namespaces
-
-    def _immediate_sub_namespaces(self) -> Iterable[str]:
-        parts = tuple(self._qs_name.split("."))
-        for ns in self._all_sub_namespaces_as_parts():
-            if ns[:len(parts)] == parts and len(ns) > len(parts):
-                yield ns[len(parts)]
-
-    def _all_sub_namespaces(self) -> Iterable[str]:
-        return [
-            ".".join(ns)
-            for ns in self._all_sub_namespaces_as_parts()
-            if ".".join(ns).startswith(self._qs_name + ".")
-        ]
-
     def __dir__(self) -> Iterable[str]:
-        ops = qsharp.get_available_operations_by_namespace()
-        return list(sorted(
-            list(self._immediate_sub_namespaces()) + 
-            ops.get(self._qs_name, [])
-        ))
+        return namespace_index().members(self._qs_name)
 
     def __getattr__(self, name):
-        ops = qsharp.get_available_operations_by_namespace()
+        index = namespace_index()
         # NB: Our Q# namespace name may not exist as a key, as the namespace
         #     name may be a prefix (e.g.: `Microsoft` and `Microsoft.Quantum.`
         #     may be empty, even though `Microsoft.Quantum.Intrinsic` is not).
@@ -225,19 +512,21 @@ class QSharpModule(ModuleType):
         #     and are needed to make tab completion on imports work correctly.
         #
         #     Start by looking for sub-namespaces.
-        sub_namespaces = list(self._all_sub_namespaces())
         qualified_name = f"{self._qs_name}.{name}"
-        if qualified_name in sub_namespaces:
+        if qualified_name in index:
             return self.__loader__.load_module(qualified_name)
 
-        if self._qs_name in ops and name in ops[self._qs_name]:
+        if index.has_callable(self._qs_name, name):
             op_cls = new_class(name, (QSharpCallable, ))
 
             # Copy over metadata from the operation's header.
             metadata = qsharp.client.get_operation_metadata(f"{self._qs_name}.{name}")
             op_cls.__doc__ = metadata.get('documentation', '')
             op_cls.__file__ = metadata.get('source', None)
-            return op_cls(f"{self._qs_name}.{name}", "workspace")
+            op_cls._signature = metadata.get('signature') or ''
+            op = op_cls(f"{self._qs_name}.{name}", "workspace")
+            op._get_codec()
+            return op
         raise AttributeError(f"Q# namespace {self._qs_name} does not contain a callable {name}.")
 
     def __repr__(self) -> str:
@@ -7,8 +7,10 @@
 # Licensed under the MIT License.
 ##
 
-from distutils.version import LooseVersion
-from typing import Iterable, Tuple
+from typing import Iterable, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from distutils.version import LooseVersion
 
 ## LOGGING ##
 
@@ -27,7 +29,8 @@ class Packages(object):
     def __init__(self, client):
         self._client = client
 
-    def __iter__(self) -> Iterable[Tuple[str, LooseVersion]]:
+    def __iter__(self) -> Iterable[Tuple[str, 'LooseVersion']]:
+        from distutils.version import LooseVersion
         for pkg_spec in self._client.get_packages():
             name, version = pkg_spec.split("::", 1)
             yield name, LooseVersion(version)
@@ -0,0 +1,176 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+##
+# prewarm.py: Loads packages, projects and configuration into a Q# client in
+#     the background.
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+
+## IMPORTS ##
+
+import json
+import threading
+from dataclasses import dataclass, field, fields
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+## LOGGING ##
+
+import logging
+logger = logging.getLogger(__name__)
+
+## CONSTANTS ##
+
+# Prewarm steps are grouped into categories, which run in this order.
+CATEGORIES = ('config', 'packages', 'projects', 'workspace')
+
+# Client methods that only depend on some categories of prewarm steps having
+# completed. Methods listed in INDEPENDENT_METHODS don't depend on any
+# prewarm step, while all other methods (e.g.: compiling or simulating Q#
+# code, which may use callables from any package or project) depend on every
+# step having completed.
+DEPENDENCIES = {
+    'get_config': ('config',),
+    'set_config': ('config',),
+    'save_config': ('config',),
+    'add_package': ('packages',),
+    'get_packages': ('packages',),
+    'add_project': ('projects',),
+    'get_projects': ('projects',),
+}
+
+INDEPENDENT_METHODS = frozenset({
+    'busy', 'start', 'stop', 'is_ready', 'wait_until_ready', 'check_status', 'interrupt',
+    'scheduler_stats', 'component_versions', 'get_connection_info',
+    'performance', 'sample_performance', 'workspace_version',
+    'attached', 'capture_diagnostics', 'get_noise_model',
+    'get_noise_model_by_name', 'set_noise_model', 'set_noise_model_by_name',
+})
+
+## CLASSES ##
+
+@dataclass
+class PrewarmSpec:
+    """
+    Describes the packages, projects and configuration options to load into
+    a Q# client as soon as it starts, and whether to reload the workspace
+    afterwards.
+    """
+    packages: List[str] = field(default_factory=list)
+    projects: List[str] = field(default_factory=list)
+    config: Dict[str, Any] = field(default_factory=dict)
+    reload: bool = False
+
+    @classmethod
+    def from_file(cls, path : str) -> "PrewarmSpec":
+        """
+        Reads a prewarm spec from a JSON file with any of the keys
+        `packages`, `projects`, `config` and `reload`.
+        """
+        with open(path) as f:
+            spec = json.load(f)
+        if not isinstance(spec, dict):
+            raise ValueError(f"Prewarm spec {path} must be a JSON object, but was {type(spec).__name__}.")
+        known = {spec_field.name for spec_field in fields(cls)}
+        unknown = sorted(set(spec) - known)
+        if unknown:
+            raise ValueError(
+                f"Prewarm spec {path} has unknown keys {', '.join(unknown)}; "
+                f"expected any of {', '.join(sorted(known))}."
+            )
+        return cls(**spec)
+
+    def steps(self) -> Iterable[Tuple[str, str, Callable[[Any], Any]]]:
+        """
+        Yields the category, a description and a function of the client for
+        each step of this spec, in the order in which they should run.
+        """
+        for name, value in self.config.items():
+            yield 'config', f"set config {name}", lambda client, name=name, value=value: client.set_config(name, value)
+        for package in self.packages:
+            yield 'packages', f"add package {package}", lambda client, package=package: client.add_package(package)
+        for project in self.projects:
+            yield 'projects', f"add project {project}", lambda client, project=project: client.add_project(project)
+        if self.reload:
+            yield 'workspace', "reload workspace", lambda client: client.reload()
+
+class Prewarm(object):
+    """
+    Runs the steps of a prewarm spec against a client on a background
+    thread, and lets callers wait for only those steps that they depend on.
+
+    Steps that fail are logged and recorded in `errors`, rather than failing
+    later calls; `wait` raises the first such error.
+    """
+    errors : List[Tuple[str, Exception]]
+
+    def __init__(self, spec : PrewarmSpec, after : Optional["Prewarm"] = None):
+        self.spec = spec
+        self.errors = []
+        self._after = after
+        self._events = {category: threading.Event() for category in CATEGORIES}
+        self._thread : Optional[threading.Thread] = None
+
+    def __repr__(self) -> str:
+        return f"<Prewarm ({'done' if self.done else 'running'}) of {self.spec!r}>"
+
+    @property
+    def done(self) -> bool:
+        return all(event.is_set() for event in self._events.values())
+
+    def start(self, get_client : Callable[[], Any]) -> None:
+        """
+        Starts running prewarm steps on a background thread, against the
+        client returned by `get_client`.
+        """
+        self._thread = threading.Thread(target=self._run, args=(get_client,), name="qsharp-prewarm", daemon=True)
+        self._thread.start()
+
+    def wait_for(self, method : str, timeout : Optional[float] = None) -> None:
+        """
+        Waits for the prewarm steps that a given client method depends on.
+        """
+        # Calls made from the prewarm thread itself (e.g.: by an import hook
+        # while a step runs) must not wait for that thread.
+        if method in INDEPENDENT_METHODS or threading.current_thread() is self._thread:
+            return
+        for category in DEPENDENCIES.get(method, CATEGORIES):
+            self._events[category].wait(timeout)
+
+    def wait(self, timeout : Optional[float] = None) -> None:
+        """
+        Waits for every prewarm step to complete, raising the first error
+        raised by any step, or TimeoutError if the steps have not completed
+        within `timeout` seconds.
+        """
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                raise TimeoutError(f"Prewarm did not complete within {timeout} seconds.")
+        if self.errors:
+            description, error = self.errors[0]
+            raise RuntimeError(f"Prewarm step failed: {description}") from error
+
+    def _run(self, get_client : Callable[[], Any]) -> None:
+        try:
+            if self._after is not None and self._after._thread is not None:
+                self._after._thread.join()
+            client = get_client()
+            for category, description, step in self.spec.steps():
+                # Steps are ordered by category, so every earlier category
+                # has completed once we reach this one.
+                for earlier in CATEGORIES[:CATEGORIES.index(category)]:
+                    self._events[earlier].set()
+                logger.debug(f"Prewarm: {description}.")
+                try:
+                    step(client)
+                except Exception as ex:
+                    logger.warning(f"Prewarm step failed: {description}.", exc_info=ex)
+                    self.errors.append((description, ex))
+        except Exception as ex:
+            logger.warning("Prewarm could not start the Q# client.", exc_info=ex)
+            self.errors.append(("start client", ex))
+        finally:
+            for event in self._events.values():
+                event.set()
@@ -0,0 +1,103 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+##
+# diagnostics.py: Containers for diagnostics captured from Q# programs.
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+
+## IMPORTS ##
+
+import os
+import threading
+from collections import deque
+from typing import Any, BinaryIO, Callable, Iterator, List, Optional, Union
+
+from qsharp.serialization import dumps, loads
+
+## CLASSES ##
+
+class DiagnosticsFile(object):
+    """
+    Append-only file of captured diagnostics, written as one JSON document
+    per line. Any existing file at `path` is replaced.
+
+    Diagnostics are written as soon as they are captured, and are only read
+    back (one at a time) when iterated over or indexed, such that capturing
+    many large diagnostics (e.g.: state vectors of many qubits) does not
+    hold them all in memory.
+
+    :param convert: If given, applied to each diagnostic as it is read.
+    """
+
+    def __init__(self, path : Union[str, os.PathLike], convert : Optional[Callable[[Any], Any]] = None):
+        self.path = os.fspath(path)
+        self.convert = convert
+        # Byte offset of each diagnostic, used to read single diagnostics
+        # without scanning the file.
+        self._offsets : List[int] = []
+        self._size = 0
+        self._file : Optional[BinaryIO] = open(self.path, 'wb')
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return f"<DiagnosticsFile {self.path!r} ({len(self)} diagnostics)>"
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def append(self, diagnostic : Any) -> None:
+        line = (dumps(diagnostic) + "\n").encode('utf-8')
+        with self._lock:
+            if self._file is None:
+                raise ValueError(f"Cannot append to {self.path}, as it has been closed.")
+            self._file.write(line)
+            self._offsets.append(self._size)
+            self._size += len(line)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _read(self, line : bytes) -> Any:
+        diagnostic = loads(line)
+        return diagnostic if self.convert is None else self.convert(diagnostic)
+
+    def __iter__(self) -> Iterator[Any]:
+        self._flush()
+        n_diagnostics = len(self)
+        with open(self.path, 'rb') as f:
+            for _, line in zip(range(n_diagnostics), f):
+                yield self._read(line)
+
+    def __getitem__(self, idx : int) -> Any:
+        offset = self._offsets[idx]
+        self._flush()
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            return self._read(f.readline())
+
+    def _flush(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+
+## FUNCTIONS ##
+
+def new_container(max_items : Optional[int] = None, sink : Optional[Union[str, os.PathLike]] = None) -> Any:
+    """
+    Returns an empty container for captured diagnostics: a list, a deque
+    keeping only the last `max_items` diagnostics, or a file at `sink`.
+    """
+    if max_items is not None and sink is not None:
+        raise ValueError("Diagnostics can be captured either into a ring buffer (max_items) or into a file (sink), but not both.")
+    if max_items is not None:
+        if max_items < 1:
+            raise ValueError(f"max_items must be at least 1, but was {max_items}.")
+        return deque(maxlen=max_items)
+    if sink is not None:
+        return DiagnosticsFile(sink)
+    return []
@@ -0,0 +1,82 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+##
+# histogram.py: Counts of the outputs observed over many shots of a Q#
+#     callable.
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+
+## IMPORTS ##
+
+from collections import Counter
+from typing import Any, Dict, Iterable, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+## FUNCTIONS ##
+
+def _as_key(value : Any) -> Any:
+    """
+    Converts a decoded Q# output into a hashable value, replacing arrays
+    (decoded as lists or NumPy arrays) by tuples. The items of NumPy arrays
+    are kept as NumPy scalars, such that `to_numpy` returns outputs of the
+    same type.
+    """
+    if isinstance(value, (list, tuple)) or getattr(value, 'ndim', 0) > 0:
+        return tuple(_as_key(item) for item in value)
+    return value
+
+## CLASSES ##
+
+class Histogram(Counter):
+    """
+    Counts how many times each output was returned over several shots of a
+    Q# callable. Outputs are keyed by their decoded Python values, with
+    Q# arrays represented as tuples so that they can be used as keys.
+    """
+
+    @classmethod
+    def from_counts(cls, counts : Iterable[Tuple[Any, int]]) -> "Histogram":
+        """
+        Builds a histogram from (output, count) pairs, as returned by the
+        IQ# kernel.
+        """
+        histogram = cls()
+        for value, count in counts:
+            histogram[_as_key(value)] += count
+        return histogram
+
+    @property
+    def shots(self) -> int:
+        """
+        The total number of shots counted by this histogram.
+        """
+        return sum(self.values())
+
+    def probabilities(self) -> Dict[Any, float]:
+        """
+        Returns the fraction of shots that returned each output.
+        """
+        shots = self.shots
+        return {value: count / shots for value, count in self.items()}
+
+    def to_numpy(self) -> Tuple["np.ndarray", "np.ndarray"]:
+        """
+        Returns an array of the distinct outputs and an array of how many
+        times each was returned, in the same order.
+        """
+        import numpy as np
+        outputs = list(self.keys())
+        return np.array(outputs), np.fromiter(self.values(), dtype=np.int64, count=len(self))
+
+    def samples(self) -> "np.ndarray":
+        """
+        Returns an array with one entry for each shot, grouped by output
+        rather than in the order in which the shots ran.
+        """
+        import numpy as np
+        outputs, counts = self.to_numpy()
+        return np.repeat(outputs, counts, axis=0)
@@ -0,0 +1,171 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+##
+# performance.py: Memory and CPU usage of the IQ# kernel, and time series
+#     of them sampled while a workload runs.
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+
+## IMPORTS ##
+
+import csv
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, fields
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+## LOGGING ##
+
+import logging
+logger = logging.getLogger(__name__)
+
+## CONSTANTS ##
+
+DEFAULT_MONITOR_INTERVAL = 1.0
+
+## CLASSES ##
+
+@dataclass
+class KernelPerformance:
+    """
+    Resource usage of an IQ# kernel process, with memory measured in bytes
+    and CPU time in seconds since the kernel started.
+
+    `managed_ram` is only known when reported by the kernel itself (e.g.: by
+    `qsharp.performance()`), and is None when measured from outside the
+    kernel process.
+    """
+    total_ram: int
+    virtual_memory: int
+    user_time: float
+    total_time: float
+    managed_ram: Optional[int] = None
+    peak_total_ram: Optional[int] = None
+
+    @classmethod
+    def from_dict(cls, data : Dict[str, Any]) -> "KernelPerformance":
+        return cls(**{
+            field.name: data.get(field.name)
+            for field in fields(cls)
+        })
+
+    @classmethod
+    def total(cls, samples : Iterable["KernelPerformance"]) -> "KernelPerformance":
+        """
+        Adds up the resource usage of several kernels (e.g.: of each kernel
+        in a pool).
+        """
+        samples = list(samples)
+        def add(name):
+            values = [getattr(sample, name) for sample in samples]
+            return None if any(value is None for value in values) else sum(values)
+        return cls(**{field.name: add(field.name) for field in fields(cls)})
+
+class PerformanceMonitor(object):
+    """
+    Samples the resource usage of the IQ# kernel every `interval` seconds
+    on a background thread, from when the monitor is started until it is
+    stopped. Use as a context manager to monitor a block of code:
+
+        with qsharp.monitor(interval=0.5) as monitor:
+            MyOperation.simulate(nQubits=28)
+        print(max(monitor.to_numpy()['total_ram']))
+
+    :param sample: Called to take each sample; samples that fail are logged
+        and skipped.
+    """
+
+    def __init__(self, sample : Callable[[], KernelPerformance], interval : float = DEFAULT_MONITOR_INTERVAL):
+        if interval <= 0:
+            raise ValueError(f"Sampling interval must be positive, but was {interval}.")
+        self.interval = interval
+        # Seconds since the monitor was started, for each sample.
+        self.times : List[float] = []
+        self.samples : List[KernelPerformance] = []
+        self._sample = sample
+        self._started : Optional[float] = None
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+        self._thread : Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def __enter__(self) -> "PerformanceMonitor":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._started = time.monotonic()
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="qsharp-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops sampling, after taking one last sample.
+        """
+        if self._thread is None:
+            return
+        self._stopped.set()
+        self._thread.join()
+        self._thread = None
+        self._take_sample()
+
+    def _run(self) -> None:
+        self._take_sample()
+        while not self._stopped.wait(self.interval):
+            self._take_sample()
+
+    def _take_sample(self) -> None:
+        try:
+            sample = self._sample()
+        except Exception as ex:
+            logger.warning("Failed to sample IQ# kernel performance.", exc_info=ex)
+            return
+        with self._lock:
+            self.times.append(time.monotonic() - self._started)
+            self.samples.append(sample)
+
+    def to_numpy(self) -> Dict[str, "np.ndarray"]:
+        """
+        Returns the samples taken so far as a dictionary from each metric
+        (plus `time`, in seconds since the monitor started) to an array of
+        its values. Metrics that were not measured are NaN.
+        """
+        import numpy as np
+        with self._lock:
+            columns = {'time': np.array(self.times, dtype=float)}
+            for field in fields(KernelPerformance):
+                columns[field.name] = np.array(
+                    [np.nan if value is None else value for value in (getattr(sample, field.name) for sample in self.samples)],
+                    dtype=float
+                )
+        return columns
+
+    def to_csv(self, path : Union[str, os.PathLike]) -> None:
+        """
+        Writes the samples taken so far to a CSV file, with one row per
+        sample and one column per metric (plus `time`, in seconds since the
+        monitor started). Metrics that were not measured are left empty.
+        """
+        with self._lock:
+            rows = [
+                {'time': sample_time, **asdict(sample)}
+                for sample_time, sample in zip(self.times, self.samples)
+            ]
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=['time'] + [field.name for field in fields(KernelPerformance)])
+            writer.writeheader()
+            writer.writerows(rows)
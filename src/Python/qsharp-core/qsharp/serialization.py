@@ -7,13 +7,142 @@
 # Licensed under the MIT License.
 ##
 
-try:
-    import numpy as np
-except ImportError:
-    np = None
-except Exception as ex:
-    print("Failed to import numpy. Please check your numpy installation.")
-    raise
+import json
+import os
+import sys
+from itertools import chain
+
+import logging
+logger = logging.getLogger(__name__)
+
+def _numpy():
+    """
+    Returns the numpy module if it has already been imported, and None
+    otherwise. Values can only be NumPy arrays or scalars if NumPy has been
+    imported, so there is no need to pay for importing it here.
+    """
+    return sys.modules.get('numpy')
+
+# Kinds of values, as far as mapping tuples to and from JSON is concerned.
+_LEAF, _SCALAR, _COMPLEX, _TUPLE, _LIST, _ARRAY, _DICT = range(7)
+
+# Kinds of values of common types, such that most values can be classified
+# by a single lookup. Other types are classified by isinstance checks the
+# first time that they are seen, and then added to the table.
+_MAP_KINDS = {
+    type(None): _LEAF, bool: _LEAF, int: _LEAF, float: _LEAF, complex: _COMPLEX, str: _LEAF,
+    tuple: _TUPLE, list: _LIST, dict: _DICT
+}
+_UNMAP_KINDS = {
+    type(None): _LEAF, bool: _LEAF, int: _LEAF, float: _LEAF, str: _LEAF,
+    list: _LIST, dict: _DICT
+}
+
+# For tuples of more than 7 items, the .NET type is ValueTuple<T1,T2,T3,T4,T5,T6,T7,TRest>.
+# Items beyond Item7 must be nested inside a key called "Rest".
+_MAX_TUPLE_LENGTH = 7
+_ITEM_KEYS = [f"Item{idx + 1}" for idx in range(64)]
+
+# Kinds of NumPy arrays (see numpy.dtype.kind) that ndarray.tolist()
+# converts entirely to plain Python values: booleans, signed and unsigned
+# integers, floats and strings.
+_BULK_DTYPE_KINDS = frozenset('biufU')
+
+def _map_kind(obj, np):
+    kind = _MAP_KINDS.get(type(obj))
+    if kind is None:
+        if isinstance(obj, tuple):
+            kind = _TUPLE
+        elif isinstance(obj, list):
+            kind = _LIST
+        elif np and isinstance(obj, np.ndarray):
+            kind = _ARRAY
+        elif isinstance(obj, dict):
+            kind = _DICT
+        elif np and isinstance(obj, np.complexfloating):
+            kind = _COMPLEX
+        elif np and isinstance(obj, np.generic):
+            kind = _SCALAR
+        else:
+            kind = _LEAF
+        _MAP_KINDS[type(obj)] = kind
+    return kind
+
+def _unmap_kind(obj):
+    kind = _UNMAP_KINDS.get(type(obj))
+    if kind is None:
+        if isinstance(obj, dict):
+            kind = _DICT
+        elif isinstance(obj, list):
+            kind = _LIST
+        else:
+            kind = _LEAF
+        _UNMAP_KINDS[type(obj)] = kind
+    return kind
+
+def _map_complex(value):
+    """
+    Maps a complex number to a (real, imaginary) pair, as expected for
+    Microsoft.Quantum.Math.Complex values and for (Double, Double) tuples.
+    """
+    return {'@type': 'tuple', 'Item1': float(value.real), 'Item2': float(value.imag)}
+
+def _nest(items, shape):
+    """
+    Nests a flat list of the items of an array with a given shape into
+    lists, as ndarray.tolist() would.
+    """
+    # Group items along the innermost axis first.
+    for dim in reversed(shape[1:]):
+        items = [items[idx:idx + dim] for idx in range(0, len(items), dim)]
+    return items
+
+def _map_complex_array(array):
+    """
+    Maps an ndarray of complex numbers to (nested) lists of (real,
+    imaginary) pairs, without visiting each element as a NumPy scalar.
+    """
+    if array.size == 0:
+        return array.real.tolist()
+    pairs = [
+        {'@type': 'tuple', 'Item1': real, 'Item2': imag}
+        for real, imag in zip(array.real.ravel().tolist(), array.imag.ravel().tolist())
+    ]
+    return pairs[0] if array.ndim == 0 else _nest(pairs, array.shape)
+
+def _map_record_array(array):
+    """
+    Maps a structured ndarray whose fields are all numbers or strings to
+    (nested) lists of tuples, or returns None for other structured arrays.
+    """
+    fields = [array.dtype.fields[name][0] for name in array.dtype.names]
+    if array.size == 0 or len(fields) > _MAX_TUPLE_LENGTH or any(
+        field.kind not in _BULK_DTYPE_KINDS or field.shape for field in fields
+    ):
+        return None
+    keys = ('@type', *_ITEM_KEYS[:len(fields)])
+    records = [dict(zip(keys, ('tuple', *record))) for record in array.ravel().tolist()]
+    return records[0] if array.ndim == 0 else _nest(records, array.shape)
+
+def _tuple_items(obj):
+    """
+    Returns the items of a dictionary that represents a tuple, that is, the
+    values of its keys Item1, Item2, ..., up to the first missing key.
+    """
+    # Tuples sent by the kernel have no other keys than @type, so guess the
+    # number of items from the number of keys first.
+    n_items = len(obj) - ('@type' in obj)
+    if n_items <= len(_ITEM_KEYS):
+        try:
+            return [obj[item] for item in _ITEM_KEYS[:n_items]]
+        except KeyError:
+            pass
+    items = []
+    while True:
+        item = _ITEM_KEYS[len(items)] if len(items) < len(_ITEM_KEYS) else f"Item{len(items) + 1}"
+        if item not in obj:
+            return items
+        items.append(obj[item])
 
 # Tuples are json encoded differently in C#, this makes sure they are in the right format.
 def map_tuples(obj):
@@ -21,37 +150,69 @@ def map_tuples(obj):
     Given a Python object to be serialized, converts any tuples to dictionaries
     of a form expected by the Q# backend.
     """
-    if isinstance(obj, tuple):
-        result = {
-            '@type': 'tuple'
-        }
-        
-        # For tuples of more than 7 items, the .NET type is ValueTuple<T1,T2,T3,T4,T5,T6,T7,TRest>.
-        # Items beyond Item7 must be nested inside a key called "Rest".
-        max_tuple_length = 7
-        for i in range(min(len(obj), max_tuple_length)):
-            result[f"Item{i+1}"] = map_tuples(obj[i])
-        if len(obj) > max_tuple_length:
-            result["Rest"] = map_tuples(obj[max_tuple_length:])
-        return result
-
-    elif isinstance(obj, list) or (np and isinstance(obj, np.ndarray)):
-        result = []
-        for i in obj:
-            result.append(map_tuples(i))
-        return result
-
-    elif isinstance(obj, dict):
-        result = {}
-        for i in obj:
-            result[i] = map_tuples(obj[i])
-        return result
-
-    elif np and isinstance(obj, np.generic):
-        return obj.item()
-
-    else:
-        return obj
+    np = _numpy()
+    kinds = _MAP_KINDS
+    # Rather than recursing, containers are mapped from a work list, such
+    # that deeply nested values don't hit the recursion limit. Each entry is
+    # an empty mapped container, already placed in its parent, along with
+    # the (key, value) pairs to be mapped into it.
+    root = [None]
+    pending = [(root, ((0, obj),))]
+    while pending:
+        target, items = pending.pop()
+        for key, value in items:
+            kind = kinds.get(type(value))
+            if kind is None:
+                kind = _map_kind(value, np)
+            if kind is _LEAF:
+                target[key] = value
+            elif kind is _SCALAR:
+                target[key] = value.item()
+            elif kind is _COMPLEX:
+                target[key] = _map_complex(value)
+            elif kind is _ARRAY:
+                # Convert arrays of numbers and strings in bulk, rather than
+                # one NumPy scalar at a time.
+                dtype_kind = value.dtype.kind
+                if dtype_kind in _BULK_DTYPE_KINDS:
+                    target[key] = value.tolist()
+                elif dtype_kind == 'c':
+                    target[key] = _map_complex_array(value)
+                else:
+                    records = None if value.dtype.names is None else _map_record_array(value)
+                    if records is not None:
+                        target[key] = records
+                    else:
+                        # Elements of other structured arrays are converted
+                        # to tuples, and those of object arrays are left as
+                        # they are, so both still need to be mapped.
+                        target[key] = None
+                        pending.append((target, ((key, value.tolist()),)))
+            elif kind is _LIST:
+                # Arrays of numbers, strings and the like are very common,
+                # and can be copied without visiting each element again.
+                for item in value:
+                    if kinds.get(type(item)) is not _LEAF:
+                        mapped = target[key] = [None] * len(value)
+                        pending.append((mapped, enumerate(value)))
+                        break
+                else:
+                    target[key] = list(value)
+            elif kind is _TUPLE:
+                mapped = target[key] = {'@type': 'tuple'}
+                if len(value) > _MAX_TUPLE_LENGTH:
+                    pending.append((mapped, [*zip(_ITEM_KEYS, value[:_MAX_TUPLE_LENGTH]), ("Rest", value[_MAX_TUPLE_LENGTH:])]))
+                else:
+                    for item in value:
+                        if kinds.get(type(item)) is not _LEAF:
+                            pending.append((mapped, zip(_ITEM_KEYS, value)))
+                            break
+                    else:
+                        mapped.update(zip(_ITEM_KEYS, value))
+            else:
+                mapped = target[key] = {}
+                pending.append((mapped, value.items()))
+    return root[0]
 
 def unmap_tuples(obj):
     """
@@ -60,25 +221,345 @@ def unmap_tuples(obj):
     tuples if they either contain a key `@type` with the value `tuple`, or if
     they have a key `item1`.
     """
-    if isinstance(obj, dict):
-        # Does this dict represent a tuple?
-        if obj.get('@type', None) in ('tuple', '@tuple') or 'Item1' in obj:
-            values = []
-            while True:
-                item = f"Item{len(values) + 1}"
-                if item in obj:
-                    values.append(unmap_tuples(obj[item]))
+    kinds = _UNMAP_KINDS
+    # As in map_tuples, containers are unmapped from a work list. Tuples are
+    # immutable, so their items are first unmapped into lists, which are
+    # only converted to tuples once everything else has been unmapped.
+    root = [None]
+    pending = [(root, ((0, obj),))]
+    tuples = []
+    while pending:
+        target, items = pending.pop()
+        for key, value in items:
+            kind = kinds.get(type(value))
+            if kind is None:
+                kind = _unmap_kind(value)
+            if kind is _LEAF:
+                target[key] = value
+            elif kind is _LIST:
+                for item in value:
+                    if kinds.get(type(item)) is not _LEAF:
+                        unmapped = target[key] = [None] * len(value)
+                        pending.append((unmapped, enumerate(value)))
+                        break
+                else:
+                    target[key] = list(value)
+            # Does this dict represent a tuple?
+            elif value.get('@type', None) in ('tuple', '@tuple') or 'Item1' in value:
+                tuple_items = _tuple_items(value)
+                for item in tuple_items:
+                    if kinds.get(type(item)) is not _LEAF:
+                        unmapped = target[key] = [None] * len(tuple_items)
+                        tuples.append((target, key, unmapped))
+                        pending.append((unmapped, enumerate(tuple_items)))
+                        break
+                else:
+                    target[key] = tuple(tuple_items)
+            else:
+                # Since this is a plain dict, unmap its values and we're good.
+                unmapped = target[key] = {}
+                pending.append((unmapped, value.items()))
+    # Tuples are only ever found after the tuples that contain them, so
+    # converting them in reverse converts the items of each tuple first.
+    for target, key, unmapped in reversed(tuples):
+        target[key] = tuple(unmapped)
+    return root[0]
+
+# JSON codecs, keyed by name, as (loads, dumps) pairs. Each codec must
+# produce exactly the same output as the json module does with the
+# separators below (that is, compact JSON with non-ASCII characters
+# escaped), so that the JSON sent to the kernel never depends on which
+# optional packages are installed; faster codecs fall back to the json
+# module for any value that they would encode differently.
+_JSON_SEPARATORS = (',', ':')
+
+def _json_dumps(obj):
+    return json.dumps(obj, separators=_JSON_SEPARATORS)
+
+_JSON_CODECS = {'json': (json.loads, _json_dumps)}
+
+# Maps each digit to 0, and each other character to a space, such that
+# runs of digits can be found by searching for runs of 0s, which is much
+# faster than searching with regular expressions.
+_DIGITS_TABLE = bytes(ord('0') if ord('0') <= code <= ord('9') else ord(' ') for code in range(256))
+
+def _may_have_large_ints(s):
+    """
+    Returns whether the JSON in `s` could contain integers too large for 64
+    bits (that is, whether it has a run of 19 or more digits).
+    """
+    encoded = s.encode('utf-8', 'surrogatepass') if isinstance(s, str) else bytes(s)
+    return b'0' * 19 in encoded.translate(_DIGITS_TABLE)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    # orjson formats some floats differently (e.g.: 1e-07 as 1e-7, and 1e-05
+    # as 0.00001) and encodes NaN and infinities as null, so output that
+    # could contain any of those is encoded again by the json module. orjson
+    # also parses integers too large for 64 bits as floats, so input that
+    # could contain any of those is decoded by the json module.
+    # Zeros are told apart from other digits, so that floats such as
+    # 1.0000000000000002 are not mistaken for small numbers.
+    _ORJSON_DUMPS_TABLE = bytes(
+        code if chr(code) in '0.enul' else ord('1') if chr(code) in '123456789' else ord(' ')
+        for code in range(256)
+    )
+    _ORJSON_INEXACT_DUMPS = (b'0e', b'1e', b'0.0000', b'null')
+    # Encode subclasses of built-in types, dataclasses and dates the way
+    # that the json module does, rather than the way that orjson does.
+    _ORJSON_OPTIONS = (
+        orjson.OPT_PASSTHROUGH_SUBCLASS | orjson.OPT_PASSTHROUGH_DATACLASS |
+        orjson.OPT_PASSTHROUGH_DATETIME
+    )
+
+    def _orjson_dumps(obj):
+        try:
+            encoded = orjson.dumps(obj, option=_ORJSON_OPTIONS)
+        except TypeError:
+            # Values that orjson cannot encode, such as integers too large
+            # for 64 bits, non-string keys or lone surrogates.
+            return _json_dumps(obj)
+        # The json module escapes all non-ASCII characters, and also DEL,
+        # which orjson writes as is.
+        if not encoded.isascii() or b'\x7f' in encoded:
+            return _json_dumps(obj)
+        masked = encoded.translate(_ORJSON_DUMPS_TABLE)
+        if any(inexact in masked for inexact in _ORJSON_INEXACT_DUMPS):
+            return _json_dumps(obj)
+        return encoded.decode('ascii')
+
+    def _orjson_loads(s):
+        if _may_have_large_ints(s):
+            return json.loads(s)
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError:
+            # orjson rejects NaN and Infinity, which the json module accepts.
+            return json.loads(s)
+
+    _JSON_CODECS['orjson'] = (_orjson_loads, _orjson_dumps)
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+if ujson is not None:
+    # ujson formats floats differently from the json module, so it is only
+    # used to decode JSON, and only when no integer in that JSON could be
+    # too large for 64 bits.
+    def _ujson_loads(s):
+        if _may_have_large_ints(s):
+            return json.loads(s)
+        try:
+            return ujson.loads(s)
+        except ValueError:
+            return json.loads(s)
+
+    _JSON_CODECS['ujson'] = (_ujson_loads, _json_dumps)
+
+def json_codecs():
+    """
+    Returns the names of the JSON codecs that are available, fastest first.
+    """
+    return [name for name in ('orjson', 'ujson', 'json') if name in _JSON_CODECS]
+
+def set_json_codec(name=None):
+    """
+    Sets the codec used to encode arguments to and decode results from Q#
+    callables: one of `orjson`, `ujson` (if those packages are installed),
+    or `json`. By default, uses the codec named by the `QSHARP_PY_JSON`
+    environment variable, or else the fastest codec available.
+
+    Returns the name of the codec now in use.
+    """
+    global json_codec, _loads, _dumps
+    if name is None:
+        name = os.getenv("QSHARP_PY_JSON") or json_codecs()[0]
+    if name not in _JSON_CODECS:
+        raise ValueError(f"JSON codec {name!r} is not available; expected one of {json_codecs()}.")
+    json_codec = name
+    _loads, _dumps = _JSON_CODECS[name]
+    return name
+
+def loads(s):
+    """
+    Decodes a str or bytes object holding JSON, exactly as json.loads would.
+    """
+    return _loads(s)
+
+def dumps(obj):
+    """
+    Encodes a value as compact JSON with non-ASCII characters escaped,
+    exactly as json.dumps(obj, separators=(',', ':')) would.
+    """
+    return _dumps(obj)
+
+def _unmap_object(obj):
+    """
+    Converts a dictionary that represents a tuple to a tuple as soon as it
+    has been decoded, and leaves other dictionaries as they are.
+    """
+    if obj.get('@type', None) in ('tuple', '@tuple') or 'Item1' in obj:
+        return tuple(_tuple_items(obj))
+    return obj
+
+# The json module calls object hooks on each object once its values have
+# been decoded, that is, on the items of tuples before the tuples
+# themselves, which is exactly the order in which unmap_tuples converts them.
+_TUPLE_DECODER = json.JSONDecoder(object_hook=_unmap_object)
+_PLAIN_DECODER = json.JSONDecoder()
+_WHITESPACE = json.decoder.WHITESPACE
+
+def loads_tuples(s):
+    """
+    Decodes a str or bytes object holding JSON, converting any dictionaries
+    that represent tuples back to Python tuples as they are decoded. Returns
+    the same value as unmap_tuples(loads(s)), but without building a second
+    copy of every container in the value, which matters for large results.
+    """
+    if isinstance(s, (bytes, bytearray)):
+        s = s.decode('utf-8')
+    if '{' not in s:
+        # Without any objects, there are no tuples to convert, so use the
+        # fastest codec available.
+        return _loads(s)
+    return _TUPLE_DECODER.decode(s)
+
+def iter_array(s, decode=None):
+    """
+    Given a str or bytes object holding a JSON array, yields its elements
+    one at a time, each decoded only once it is requested, such that the
+    whole array never needs to be held in memory at once.
+
+    By default, dictionaries that represent tuples are converted back to
+    Python tuples, as by loads_tuples. Otherwise, each element is decoded
+    as by loads and then passed to `decode`, whose result is yielded.
+
+    Raises json.JSONDecodeError if `s` does not hold a JSON array; elements
+    before the first error are still yielded.
+    """
+    if isinstance(s, (bytes, bytearray)):
+        s = s.decode('utf-8')
+    decoder = _TUPLE_DECODER if decode is None else _PLAIN_DECODER
+    idx = _WHITESPACE.match(s, 0).end()
+    if s[idx:idx + 1] != '[':
+        raise json.JSONDecodeError("Expecting '['", s, idx)
+    idx = _WHITESPACE.match(s, idx + 1).end()
+    if s[idx:idx + 1] != ']':
+        while True:
+            value, idx = decoder.raw_decode(s, idx)
+            yield value if decode is None else decode(value)
+            idx = _WHITESPACE.match(s, idx).end()
+            if s[idx:idx + 1] != ',':
+                break
+            idx = _WHITESPACE.match(s, idx + 1).end()
+        if s[idx:idx + 1] != ']':
+            raise json.JSONDecodeError("Expecting ',' delimiter", s, idx)
+    idx = _WHITESPACE.match(s, idx + 1).end()
+    if idx != len(s):
+        raise json.JSONDecodeError("Extra data", s, idx)
+
+# NumPy types of arrays whose leaves are all of the given Python types.
+# Integers are widened to floats when mixed with them, as NumPy does.
+_NUMPY_DTYPES = {
+    frozenset({float}): 'float64',
+    frozenset({int}): 'int64',
+    frozenset({bool}): 'bool',
+    frozenset({int, float}): 'float64',
+}
+
+def _leaf_types(value) -> set:
+    """
+    Returns the types of the leaves of a list, possibly nested. Lists that
+    mix other lists with leaves have list among their leaf types.
+    """
+    types = set(map(type, value))
+    depth = 0
+    while types == {list}:
+        # Chain the items one level further down from the list itself, as
+        # the iterator chained for the level above has been consumed.
+        depth += 1
+        leaves = value
+        for _ in range(depth):
+            leaves = chain.from_iterable(leaves)
+        types = set(map(type, leaves))
+    return types
+
+def _numeric_array(value, np):
+    """
+    Returns a list of numbers or booleans, possibly nested, as a NumPy
+    array, or None if it has any other items or is not rectangular.
+    """
+    dtype = _NUMPY_DTYPES.get(frozenset(_leaf_types(value)))
+    if dtype is None:
+        return None
+    # Ragged arrays and integers that don't fit into an int64 are left as
+    # lists.
+    try:
+        return np.array(value, dtype=dtype)
+    except (ValueError, TypeError, OverflowError):
+        return None
+
+def to_numpy(obj):
+    """
+    Given a Python object deserialized from JSON (and unmapped with
+    unmap_tuples), converts any lists of floats, integers or booleans,
+    including nested rectangular lists, to NumPy arrays of type float64,
+    int64 or bool, respectively. Empty lists are left as lists, since the
+    type of their items is not known.
+    """
+    import numpy as np
+    root = [None]
+    pending = [(root, ((0, obj),))]
+    tuples = []
+    while pending:
+        target, items = pending.pop()
+        for key, value in items:
+            kind = type(value)
+            if kind is list:
+                array = _numeric_array(value, np)
+                if array is not None:
+                    target[key] = array
                 else:
-                    break
-            return tuple(values)
-        # Since this is a plain dict, unmap its values and we're good.
-        return {
-            key: unmap_tuples(value)
-            for key, value in obj.items()
-        }
-
-    elif isinstance(obj, list):
-        return [unmap_tuples(value) for value in obj]
-
-    else:
-        return obj
+                    converted = target[key] = [None] * len(value)
+                    pending.append((converted, enumerate(value)))
+            elif kind is tuple:
+                converted = target[key] = [None] * len(value)
+                tuples.append((target, key, converted))
+                pending.append((converted, enumerate(value)))
+            elif kind is dict:
+                converted = target[key] = {}
+                pending.append((converted, value.items()))
+            else:
+                target[key] = value
+    # As in unmap_tuples, tuples are converted innermost first.
+    for target, key, converted in reversed(tuples):
+        target[key] = tuple(converted)
+    return root[0]
+
+def set_as_numpy(enabled=True):
+    """
+    Sets whether arrays of numbers returned by Q# callables are decoded as
+    NumPy arrays (see to_numpy) by default, rather than as lists. Either
+    way, each call can override this with its `_as_numpy_` argument. The
+    default is read from the `QSHARP_PY_AS_NUMPY` environment variable.
+    """
+    global as_numpy
+    as_numpy = bool(enabled)
+
+# Whether arrays of numbers returned by Q# callables are decoded as NumPy
+# arrays by default.
+as_numpy = os.getenv("QSHARP_PY_AS_NUMPY", "").lower() in ("1", "true", "yes")
+
+# The name of the JSON codec in use.
+json_codec = 'json'
+_loads, _dumps = _JSON_CODECS[json_codec]
+try:
+    set_json_codec()
+except ValueError as ex:
+    logger.warning(f"{ex} Using the {set_json_codec(json_codecs()[0])} codec instead.")
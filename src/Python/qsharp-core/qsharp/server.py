@@ -0,0 +1,136 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+##
+# server.py: Keeps a pool of warm IQ# kernels running for local processes to
+#     attach to.
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+
+"""
+Usage:
+
+    python -m qsharp.server --kernels 4 --connection-dir ./.qsharp-kernels
+
+Starts `--kernels` IQ# kernels in the current directory, which is used as
+their Q# workspace, and writes one Jupyter connection file for each kernel
+into `--connection-dir` once that kernel is ready. Other processes can then
+attach to those kernels instead of starting their own, by setting the
+`QSHARP_PY_CONNECTION_FILE` environment variable to that directory (or to
+a single connection file) before using the qsharp package:
+
+    QSHARP_PY_CONNECTION_FILE=./.qsharp-kernels python my_job.py
+
+Kernels that exit are restarted, and their connection files rewritten.
+All kernels are shut down, and their connection files removed, when the
+server is interrupted or terminated.
+
+Note that processes attached to the same kernel share its state: Q# code
+compiled, packages added and configuration set by one process are visible
+to all others.
+"""
+
+## IMPORTS ##
+
+import argparse
+import json
+import os
+import signal
+import time
+from typing import Dict, Any, List
+
+from qsharp.clients.iqsharp import IQSharpClient, DEFAULT_STARTUP_TIMEOUT
+
+## LOGGING ##
+
+import logging
+logger = logging.getLogger(__name__)
+
+## CONSTANTS ##
+
+STATUS_CHECK_INTERVAL = 5
+
+## FUNCTIONS ##
+
+def _default_connection_dir() -> str:
+    from jupyter_core.paths import jupyter_runtime_dir
+    return os.path.join(jupyter_runtime_dir(), "qsharp-server")
+
+def write_connection_file(path : str, connection_info : Dict[str, Any]) -> None:
+    """
+    Writes a Jupyter connection file, replacing any existing file at once so
+    that readers never see a partially written file.
+
+    As connection files hold the key used to sign messages to the kernel,
+    only the current user can read or write them.
+    """
+    connection_info = dict(connection_info)
+    if isinstance(connection_info.get('key'), bytes):
+        connection_info['key'] = connection_info['key'].decode('ascii')
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    # A file left over from an earlier run may have had wider permissions.
+    os.chmod(temp_path, 0o600)
+    with open(fd, 'w') as f:
+        json.dump(connection_info, f, indent=2)
+    os.replace(temp_path, path)
+
+def _start_kernel(client : IQSharpClient, path : str) -> None:
+    client.start()
+    if not client.wait_until_ready(timeout=DEFAULT_STARTUP_TIMEOUT):
+        raise RuntimeError(f"IQ# kernel for {path} was not ready within {DEFAULT_STARTUP_TIMEOUT} seconds.")
+    write_connection_file(path, client.get_connection_info())
+    logger.info(f"Wrote connection file {path}.")
+
+def serve(n_kernels : int, connection_dir : str, kernel_name : str = 'iqsharp') -> None:
+    """
+    Starts `n_kernels` kernels, writes their connection files into
+    `connection_dir`, and keeps the kernels running until interrupted.
+    """
+    os.makedirs(connection_dir, mode=0o700, exist_ok=True)
+    clients : List[IQSharpClient] = [IQSharpClient(kernel_name=kernel_name) for _ in range(n_kernels)]
+    paths = [os.path.join(connection_dir, f"kernel-{idx}.json") for idx in range(n_kernels)]
+
+    # Treat termination like an interrupt, so that kernels are always shut
+    # down and connection files removed.
+    def terminate(signum, frame):
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, terminate)
+
+    try:
+        for client, path in zip(clients, paths):
+            _start_kernel(client, path)
+        print(f"Serving {n_kernels} IQ# kernel(s). Attach with:")
+        print(f"    QSHARP_PY_CONNECTION_FILE={connection_dir}", flush=True)
+
+        while True:
+            time.sleep(STATUS_CHECK_INTERVAL)
+            for client, path in zip(clients, paths):
+                if not client.kernel_manager.is_alive():
+                    logger.warning(f"IQ# kernel for {path} exited; restarting.")
+                    if os.path.exists(path):
+                        os.remove(path)
+                    _start_kernel(client, path)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for client, path in zip(clients, paths):
+            if os.path.exists(path):
+                os.remove(path)
+            client.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--kernels", type=int, default=1, help="Number of kernels to keep running.")
+    parser.add_argument("--connection-dir", default=None, help="Directory into which connection files are written.")
+    parser.add_argument("--kernel-name", default=os.getenv("QSHARP_PY_IQSHARP_KERNEL_NAME", "iqsharp"))
+    args = parser.parse_args()
+    if args.kernels < 1:
+        parser.error("At least one kernel is required.")
+
+    logging.basicConfig(level=logging.INFO)
+    serve(args.kernels, args.connection_dir or _default_connection_dir(), kernel_name=args.kernel_name)
+
+if __name__ == "__main__":
+    main()
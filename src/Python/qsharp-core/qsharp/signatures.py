@@ -0,0 +1,596 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+##
+# signatures.py: Parses the signatures of Q# callables, and compiles them into
+#     argument encoders and output decoders specialized for their types.
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+
+## IMPORTS ##
+
+import re
+from itertools import chain
+from operator import itemgetter
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import qsharp.serialization as serialization
+from qsharp.serialization import _ITEM_KEYS, _LEAF, _MAP_KINDS, _MAX_TUPLE_LENGTH, _UNMAP_KINDS, _tuple_items, iter_array, loads, loads_tuples, map_tuples, to_numpy, unmap_tuples
+from qsharp.types import Pauli, Result
+
+## LOGGING ##
+
+import logging
+logger = logging.getLogger(__name__)
+
+## CONSTANTS ##
+
+# Types whose values are sent as JSON numbers, booleans or strings.
+LEAF_TYPES = frozenset({'Int', 'BigInt', 'Double', 'Bool', 'String'})
+
+# Splits a signature into identifiers (possibly qualified by a namespace, or
+# type parameters such as 'T), array brackets, arrows and punctuation.
+_TOKEN = re.compile(r"\s*(=>|->|\[\s*\]|'?[A-Za-z_][\w.]*|[(),:<>+])")
+
+# Results and Pauli operators, keyed by their values as encoded by the kernel.
+_RESULTS = {int(result): result for result in Result}
+_PAULIS = {int(pauli): pauli for pauli in Pauli}
+
+# NumPy types of the items of arrays decoded as NumPy arrays, keyed by the
+# Q# type of their items. Results are decoded as their values, 0 or 1.
+_NUMPY_DTYPES = {'Double': 'float64', 'Int': 'int64', 'Bool': 'bool', 'Result': 'uint8'}
+
+## CLASSES ##
+
+@dataclass(frozen=True)
+class QSharpType:
+    """
+    A Q# type, as far as encoding and decoding its values is concerned:
+    `Int`, `BigInt`, `Double`, `Bool`, `String`, `Result`, `Pauli` and
+    `Unit` are named, arrays are `Array` with their item type, and tuples are
+    `Tuple` with the type of each item. Any other type (e.g.: user-defined
+    types, callables or type parameters) is `Other`, with its name.
+    """
+    kind: str
+    items: Tuple["QSharpType", ...] = ()
+    name: Optional[str] = None
+
+    def __str__(self) -> str:
+        if self.kind == 'Array':
+            return f"{self.items[0]}[]"
+        if self.kind == 'Tuple':
+            return f"({', '.join(map(str, self.items))})"
+        return self.name or self.kind
+
+@dataclass(frozen=True)
+class CallableSignature:
+    """
+    The types of the inputs and output of a Q# callable, parsed from a
+    signature such as `Foo (a : Int, b : Double[]) : Result[]`.
+    """
+    name: str
+    inputs: Dict[str, QSharpType]
+    output: QSharpType
+
+    def __str__(self) -> str:
+        inputs = ', '.join(f"{name} : {input_type}" for name, input_type in self.inputs.items())
+        return f"{self.name} ({inputs}) : {self.output}"
+
+class _Mismatch(Exception):
+    """
+    Raised by compiled encoders and decoders when a value does not have the
+    type that they were compiled for.
+    """
+
+class CallableCodec(object):
+    """
+    Encodes the arguments to and decodes the output of a Q# callable.
+
+    Arguments and outputs whose values match the types in the signature of
+    the callable are encoded and decoded without probing the type of each
+    value, and outputs of type `Result` and `Pauli` are decoded as
+    `qsharp.Result` and `qsharp.Pauli` values. Anything else (including
+    callables whose signature is not known) falls back to `map_tuples` and
+    `unmap_tuples`.
+
+    Outputs can also be decoded with arrays of numbers, booleans and results
+    as NumPy arrays: of type `float64`, `int64`, `bool` and `uint8`,
+    respectively, or as converted by `to_numpy` where the signature of the
+    callable is not known.
+    """
+    signature : Optional[CallableSignature]
+
+    def __init__(self, signature : Optional[CallableSignature] = None):
+        self.signature = signature
+        if signature is None:
+            self._encoders = {}
+            self._decoders = self._item_decoders = (None, None)
+        else:
+            self._encoders = {
+                name: _compile_encoder(input_type)
+                for name, input_type in signature.inputs.items()
+            }
+            # Decoders are compiled both without and with NumPy arrays,
+            # indexed by as_numpy.
+            output = signature.output
+            self._decoders = tuple(_compile_decoder(output, as_numpy) for as_numpy in (False, True))
+            self._item_decoders = (None, None) if output.kind != 'Array' else tuple(
+                _compile_decoder(output.items[0], as_numpy) for as_numpy in (False, True)
+            )
+
+    def __repr__(self) -> str:
+        return f"<CallableCodec for {self.signature}>" if self.signature else "<CallableCodec>"
+
+    def encode_arguments(self, kwargs : Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Maps keyword arguments to the callable into values that can be
+        dumped as JSON, exactly as `map_tuples(kwargs)` would.
+        """
+        encoders = self._encoders
+        if not encoders:
+            return map_tuples(kwargs)
+        encoded = {}
+        for name, value in kwargs.items():
+            encoder = encoders.get(name)
+            if encoder is None:
+                encoded[name] = map_tuples(value)
+            else:
+                try:
+                    encoded[name] = encoder(value)
+                except _Mismatch:
+                    encoded[name] = map_tuples(value)
+        return encoded
+
+    def decode_output(self, value : Any, as_numpy : Optional[bool] = None) -> Any:
+        """
+        Converts the output of the callable, as loaded from JSON, back into
+        Python values.
+
+        :param as_numpy: Whether to decode arrays as NumPy arrays; by
+            default, as set by `qsharp.serialization.set_as_numpy`.
+        """
+        if as_numpy is None:
+            as_numpy = serialization.as_numpy
+        return _decode_or_unmap(self._decoders[as_numpy], value, as_numpy)
+
+    def decode_json(self, data : str, as_numpy : Optional[bool] = None) -> Any:
+        """
+        Decodes the output of the callable from the JSON sent by the kernel,
+        as `decode_output(loads(data))` would. Outputs without a compiled
+        decoder are decoded in a single pass by `loads_tuples`.
+        """
+        if as_numpy is None:
+            as_numpy = serialization.as_numpy
+        decoder = self._decoders[as_numpy]
+        if decoder is None or decoder is unmap_tuples or decoder is _unmap_to_numpy:
+            value = loads_tuples(data)
+            return to_numpy(value) if as_numpy else value
+        return _decode_or_unmap(decoder, loads(data), as_numpy)
+
+    def iter_json(self, data : str, as_numpy : Optional[bool] = None) -> Iterator[Any]:
+        """
+        Given the JSON sent by the kernel for an output of the callable that
+        is an array, yields its items one at a time, each decoded only once
+        it is requested.
+        """
+        if as_numpy is None:
+            as_numpy = serialization.as_numpy
+        decode_item = self._item_decoders[as_numpy]
+        if decode_item is None or decode_item is unmap_tuples or decode_item is _unmap_to_numpy:
+            items = iter_array(data)
+            return map(to_numpy, items) if as_numpy else items
+        return iter_array(data, lambda item: _decode_or_unmap(decode_item, item, as_numpy))
+
+    def decode_counts_json(self, data : str, as_numpy : Optional[bool] = None) -> List[Tuple[Any, int]]:
+        """
+        Decodes the (output, count) pairs sent by the kernel for many shots
+        of the callable, decoding each distinct output as `decode_output`
+        would.
+        """
+        if as_numpy is None:
+            as_numpy = serialization.as_numpy
+        decoder = self._decoders[as_numpy]
+        counts = []
+        for pair in loads(data):
+            value, count = _tuple_items(pair) if type(pair) is dict else pair
+            counts.append((_decode_or_unmap(decoder, value, as_numpy), count))
+        return counts
+
+## FUNCTIONS ##
+
+def _tokens(text : str) -> List[str]:
+    tokens = []
+    idx = 0
+    text = text.rstrip()
+    while idx < len(text):
+        match = _TOKEN.match(text, idx)
+        if match is None:
+            raise ValueError(f"Unexpected {text[idx:]!r} in Q# signature {text!r}.")
+        tokens.append(re.sub(r"\s", "", match.group(1)))
+        idx = match.end()
+    return tokens
+
+class _Parser(object):
+    def __init__(self, text : str):
+        self.text = text
+        self.tokens = _tokens(text)
+        self.idx = 0
+
+    def peek(self) -> Optional[str]:
+        return self.tokens[self.idx] if self.idx < len(self.tokens) else None
+
+    def next(self) -> str:
+        token = self.peek()
+        if token is None:
+            raise ValueError(f"Unexpected end of Q# signature {self.text!r}.")
+        self.idx += 1
+        return token
+
+    def expect(self, expected : str) -> None:
+        token = self.next()
+        if token != expected:
+            raise ValueError(f"Expected {expected!r} but found {token!r} in Q# signature {self.text!r}.")
+
+    def skip_to_closing(self) -> None:
+        # Skips past the parenthesis that closes one that was already read.
+        depth = 1
+        while depth:
+            token = self.next()
+            depth += {'(': 1, ')': -1}.get(token, 0)
+
+    def parse_type(self) -> QSharpType:
+        token = self.next()
+        if token == '(':
+            items = []
+            while self.peek() != ')':
+                items.append(self.parse_type())
+                if self.peek() in ('=>', '->'):
+                    # Callables are passed by name, so their own signatures
+                    # do not matter here.
+                    self.skip_to_closing()
+                    return self._arrays(QSharpType('Other', name='Callable'))
+                if self.peek() == ',':
+                    self.next()
+            self.expect(')')
+            if not items:
+                parsed = QSharpType('Unit')
+            elif len(items) == 1:
+                # Q# identifies singleton tuples with their only item.
+                parsed = items[0]
+            else:
+                parsed = QSharpType('Tuple', tuple(items))
+        elif token in LEAF_TYPES or token in ('Result', 'Pauli', 'Unit'):
+            parsed = QSharpType(token)
+        elif token[:1] == "'" or token[:1].isalpha() or token[:1] == '_':
+            parsed = QSharpType('Other', name=token)
+        else:
+            raise ValueError(f"Unexpected {token!r} in Q# signature {self.text!r}.")
+        return self._arrays(parsed)
+
+    def _arrays(self, parsed : QSharpType) -> QSharpType:
+        while self.peek() == '[]':
+            self.next()
+            parsed = QSharpType('Array', (parsed,))
+        return parsed
+
+def parse_type(text : str) -> QSharpType:
+    """
+    Parses a Q# type, such as `(Int, Double[])[]`.
+    """
+    parser = _Parser(text)
+    parsed = parser.parse_type()
+    if parser.peek() is not None:
+        raise ValueError(f"Unexpected {parser.peek()!r} in Q# type {text!r}.")
+    return parsed
+
+def parse_signature(text : str) -> CallableSignature:
+    """
+    Parses the signature of a Q# callable, as reported by the kernel (e.g.:
+    `Foo (a : Int, b : Double[]) : Result[]`), ignoring type parameters and
+    characteristics.
+    """
+    parser = _Parser(text)
+    name = parser.next()
+    if parser.peek() == '<':
+        while parser.next() != '>':
+            pass
+    parser.expect('(')
+    inputs = {}
+    while parser.peek() != ')':
+        input_name = parser.next()
+        if input_name == '(':
+            raise ValueError(f"Nested argument tuples are not supported in Q# signature {text!r}.")
+        parser.expect(':')
+        inputs[input_name] = parser.parse_type()
+        if parser.peek() == ',':
+            parser.next()
+    parser.expect(')')
+    parser.expect(':')
+    return CallableSignature(name, inputs, parser.parse_type())
+
+def compile_codec(signature : Optional[str]) -> CallableCodec:
+    """
+    Compiles the signature of a Q# callable into a codec for its arguments
+    and output. Signatures that are missing or cannot be parsed give a codec
+    that uses `map_tuples` and `unmap_tuples`.
+    """
+    if not signature:
+        return GENERIC_CODEC
+    try:
+        return CallableCodec(parse_signature(signature))
+    except ValueError as ex:
+        logger.debug(f"Could not parse Q# signature {signature!r}.", exc_info=ex)
+        return GENERIC_CODEC
+
+def callable_codec(op : Any) -> CallableCodec:
+    """
+    Returns the codec compiled for a Q# callable, if any has been compiled,
+    and a codec that uses `map_tuples` and `unmap_tuples` otherwise.
+    """
+    return getattr(op, '_codec', None) or GENERIC_CODEC
+
+## ENCODERS ##
+
+# Each encoder returns its value mapped exactly as map_tuples would map it,
+# or raises _Mismatch if the value does not have the expected type, such
+# that map_tuples can be used instead.
+
+def _is_leaf_type(qsharp_type : QSharpType) -> bool:
+    return qsharp_type.kind in LEAF_TYPES or qsharp_type.kind in ('Result', 'Pauli')
+
+def _all_leaves(values, kinds) -> bool:
+    # Checks each type of value once, rather than each value.
+    return all(kinds.get(value_type) is _LEAF for value_type in set(map(type, values)))
+
+# Comprehensions that map arrays of tuples of leaves, specialized for each
+# number of items up to _MAX_TUPLE_LENGTH, as unpacking each tuple into
+# names is much faster than zipping it with the keys of its items.
+_LEAF_TUPLE_ARRAY_ENCODERS = {
+    1: lambda value: [{'@type': 'tuple', 'Item1': a} for (a,) in value],
+    2: lambda value: [{'@type': 'tuple', 'Item1': a, 'Item2': b} for a, b in value],
+    3: lambda value: [{'@type': 'tuple', 'Item1': a, 'Item2': b, 'Item3': c} for a, b, c in value],
+    4: lambda value: [{'@type': 'tuple', 'Item1': a, 'Item2': b, 'Item3': c, 'Item4': d} for a, b, c, d in value],
+    5: lambda value: [
+        {'@type': 'tuple', 'Item1': a, 'Item2': b, 'Item3': c, 'Item4': d, 'Item5': e}
+        for a, b, c, d, e in value
+    ],
+    6: lambda value: [
+        {'@type': 'tuple', 'Item1': a, 'Item2': b, 'Item3': c, 'Item4': d, 'Item5': e, 'Item6': f}
+        for a, b, c, d, e, f in value
+    ],
+    7: lambda value: [
+        {'@type': 'tuple', 'Item1': a, 'Item2': b, 'Item3': c, 'Item4': d, 'Item5': e, 'Item6': f, 'Item7': g}
+        for a, b, c, d, e, f, g in value
+    ],
+}
+
+def _encode_leaf(value):
+    if _MAP_KINDS.get(type(value)) is not _LEAF:
+        raise _Mismatch()
+    return value
+
+def _encode_leaf_array(value):
+    if type(value) is not list or not _all_leaves(value, _MAP_KINDS):
+        raise _Mismatch()
+    return list(value)
+
+def _compile_encoder(qsharp_type : QSharpType) -> Callable[[Any], Any]:
+    kind = qsharp_type.kind
+    if _is_leaf_type(qsharp_type):
+        return _encode_leaf
+    if kind == 'Array':
+        item_type = qsharp_type.items[0]
+        if _is_leaf_type(item_type):
+            return _encode_leaf_array
+        if item_type.kind == 'Tuple' and len(item_type.items) <= _MAX_TUPLE_LENGTH and all(map(_is_leaf_type, item_type.items)):
+            return _compile_leaf_tuple_array_encoder(len(item_type.items))
+        encode_item = _compile_encoder(item_type)
+        def encode_array(value):
+            if type(value) is not list:
+                raise _Mismatch()
+            return [encode_item(item) for item in value]
+        return encode_array
+    if kind == 'Tuple':
+        return _compile_tuple_encoder(qsharp_type.items)
+    # Other types are mapped as a whole, without needing to fall back.
+    return map_tuples
+
+def _compile_leaf_tuple_array_encoder(n_items : int) -> Callable[[Any], Any]:
+    encode_tuples = _LEAF_TUPLE_ARRAY_ENCODERS[n_items]
+    def encode_leaf_tuple_array(value):
+        if type(value) is not list or (value and (
+            set(map(type, value)) != {tuple} or set(map(len, value)) != {n_items} or
+            not _all_leaves(chain.from_iterable(value), _MAP_KINDS)
+        )):
+            raise _Mismatch()
+        return encode_tuples(value)
+    return encode_leaf_tuple_array
+
+def _compile_tuple_encoder(item_types : Tuple[QSharpType, ...]) -> Callable[[Any], Any]:
+    n_items = len(item_types)
+    encoders = [_compile_encoder(item_type) for item_type in item_types[:_MAX_TUPLE_LENGTH]]
+    keys = _ITEM_KEYS[:len(encoders)]
+    if n_items > _MAX_TUPLE_LENGTH:
+        encode_rest = _compile_tuple_encoder(item_types[_MAX_TUPLE_LENGTH:])
+    else:
+        encode_rest = None
+    def encode_tuple(value):
+        if type(value) is not tuple or len(value) != n_items:
+            raise _Mismatch()
+        encoded = {'@type': 'tuple'}
+        for key, encoder, item in zip(keys, encoders, value):
+            encoded[key] = encoder(item)
+        if encode_rest is not None:
+            encoded['Rest'] = encode_rest(value[_MAX_TUPLE_LENGTH:])
+        return encoded
+    return encode_tuple
+
+## DECODERS ##
+
+# Each decoder returns its value unmapped as unmap_tuples would unmap it,
+# except that results and Pauli operators are decoded as enums, or raises
+# _Mismatch if the value does not have the expected type.
+
+def _enum_values(qsharp_type : QSharpType) -> Optional[Dict[int, Any]]:
+    return _RESULTS if qsharp_type.kind == 'Result' else _PAULIS if qsharp_type.kind == 'Pauli' else None
+
+def _decode_leaf(value):
+    if _UNMAP_KINDS.get(type(value)) is not _LEAF:
+        raise _Mismatch()
+    return value
+
+def _decode_leaf_array(value):
+    if type(value) is not list or not _all_leaves(value, _UNMAP_KINDS):
+        raise _Mismatch()
+    return list(value)
+
+def _enum_decoder(values):
+    def decode_enum(value):
+        decoded = values.get(value) if type(value) is int else None
+        if decoded is None:
+            raise _Mismatch()
+        return decoded
+    return decode_enum
+
+def _enum_array_decoder(values):
+    def decode_enum_array(value):
+        if type(value) is not list:
+            raise _Mismatch()
+        # The kernel only ever sends integers for results and Pauli
+        # operators, so values are not checked to be integers rather than,
+        # say, booleans equal to them.
+        try:
+            return list(map(values.__getitem__, value))
+        except (KeyError, TypeError):
+            raise _Mismatch()
+    return decode_enum_array
+
+def _unmap_to_numpy(value):
+    return to_numpy(unmap_tuples(value))
+
+def _decode_or_unmap(decoder : Optional[Callable[[Any], Any]], value : Any, as_numpy : bool) -> Any:
+    if decoder is not None:
+        try:
+            return decoder(value)
+        except _Mismatch:
+            pass
+    return _unmap_to_numpy(value) if as_numpy else unmap_tuples(value)
+
+def _decode_unit(value):
+    if type(value) is not dict or len(value) != 1 or value.get('@type') not in ('tuple', '@tuple'):
+        raise _Mismatch()
+    return ()
+
+def _numpy_array_decoder(qsharp_type : QSharpType, decode_list : Callable[[Any], Any]) -> Optional[Callable[[Any], Any]]:
+    ndim = 0
+    leaf_type = qsharp_type
+    while leaf_type.kind == 'Array':
+        ndim += 1
+        leaf_type = leaf_type.items[0]
+    dtype = _NUMPY_DTYPES.get(leaf_type.kind)
+    if dtype is None:
+        return None
+    def decode_numpy_array(value):
+        import numpy as np
+        if type(value) is not list:
+            raise _Mismatch()
+        try:
+            array = np.array(value, dtype=dtype)
+        except (ValueError, TypeError, OverflowError):
+            return decode_list(value)
+        if array.ndim != ndim:
+            if array.size == 0:
+                # Empty arrays of arrays have no items to tell their shape.
+                return array.reshape(array.shape + (0,) * (ndim - array.ndim))
+            return decode_list(value)
+        return array
+    return decode_numpy_array
+
+def _compile_decoder(qsharp_type : QSharpType, as_numpy : bool = False) -> Callable[[Any], Any]:
+    kind = qsharp_type.kind
+    if kind in LEAF_TYPES:
+        return _decode_leaf
+    if _enum_values(qsharp_type) is not None:
+        return _enum_decoder(_enum_values(qsharp_type))
+    if kind == 'Unit':
+        return _decode_unit
+    if kind == 'Array':
+        item_type = qsharp_type.items[0]
+        decode_item = _compile_decoder(item_type, as_numpy)
+        def decode_array(value):
+            if type(value) is not list:
+                raise _Mismatch()
+            return [decode_item(item) for item in value]
+        if as_numpy:
+            # Arrays of arrays of different lengths are decoded as lists of
+            # NumPy arrays instead.
+            decode_numpy_array = _numpy_array_decoder(qsharp_type, decode_array)
+            if decode_numpy_array is not None:
+                return decode_numpy_array
+        if item_type.kind in LEAF_TYPES:
+            return _decode_leaf_array
+        if _enum_values(item_type) is not None:
+            return _enum_array_decoder(_enum_values(item_type))
+        if item_type.kind == 'Tuple' and all(map(_is_leaf_type, item_type.items)):
+            return _compile_leaf_tuple_array_decoder(item_type.items)
+        return decode_array
+    if kind == 'Tuple':
+        return _compile_tuple_decoder(qsharp_type.items, as_numpy)
+    # Other types (e.g.: user-defined types) are unmapped as a whole.
+    return _unmap_to_numpy if as_numpy else unmap_tuples
+
+def _item_keys(n_items : int) -> List[str]:
+    return _ITEM_KEYS[:n_items] if n_items <= len(_ITEM_KEYS) else [f"Item{idx + 1}" for idx in range(n_items)]
+
+def _compile_tuple_decoder(item_types : Tuple[QSharpType, ...], as_numpy : bool = False) -> Callable[[Any], Any]:
+    decoders = [_compile_decoder(item_type, as_numpy) for item_type in item_types]
+    keys = _item_keys(len(decoders))
+    n_keys = len(decoders) + 1
+    def decode_tuple(value):
+        # Tuples sent by the kernel have their items flattened into Item1,
+        # Item2, and so forth, whatever their length, along with @type.
+        # Dictionaries with that many keys, Item1 to ItemN among them, are
+        # unmapped to the same tuple by unmap_tuples.
+        if type(value) is not dict or len(value) != n_keys:
+            raise _Mismatch()
+        try:
+            return tuple([decoder(value[key]) for key, decoder in zip(keys, decoders)])
+        except KeyError:
+            raise _Mismatch()
+    return decode_tuple
+
+def _compile_leaf_tuple_array_decoder(item_types : Tuple[QSharpType, ...]) -> Callable[[Any], Any]:
+    n_keys = len(item_types) + 1
+    keys = _item_keys(len(item_types))
+    enum_values = [_enum_values(item_type) for item_type in item_types]
+    leaf_keys = [key for key, values in zip(keys, enum_values) if values is None]
+    if len(keys) > 1 and not any(enum_values):
+        # Given several keys, itemgetter returns the tuple of their items.
+        get_items = itemgetter(*keys)
+        decode_tuples = lambda tuples: list(map(get_items, tuples))
+    else:
+        # Otherwise, items are decoded a column at a time, and then zipped
+        # into tuples.
+        getters = [itemgetter(key) for key in keys]
+        def decode_tuples(tuples):
+            return list(zip(*[
+                map(get_item, tuples) if values is None else map(values.__getitem__, map(get_item, tuples))
+                for get_item, values in zip(getters, enum_values)
+            ]))
+    def decode_leaf_tuple_array(value):
+        if type(value) is not list or (value and (
+            set(map(type, value)) != {dict} or set(map(len, value)) != {n_keys} or
+            not all(_all_leaves([item[key] for item in value], _UNMAP_KINDS) for key in leaf_keys)
+        )):
+            raise _Mismatch()
+        try:
+            return decode_tuples(value)
+        except (KeyError, TypeError):
+            raise _Mismatch()
+    return decode_leaf_tuple_array
+
+## GLOBALS ##
+
+GENERIC_CODEC = CallableCodec()
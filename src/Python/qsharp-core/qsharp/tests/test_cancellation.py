@@ -0,0 +1,358 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+##
+# test_cancellation.py: Tests cancelling and timing out requests to the
+#     IQ# kernel.
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+
+## IMPORTS ##
+
+import asyncio
+import itertools
+import threading
+import time
+from concurrent.futures import CancelledError
+from types import SimpleNamespace
+
+import pytest
+import zmq
+
+import qsharp.clients.iqsharp
+from qsharp.clients.aio import AsyncIQSharpClient, _PendingRequest
+from qsharp.clients.cancellation import current_token, submit
+from qsharp.clients.iqsharp import IQSharpClient, IQSharpError
+
+## CLASSES ##
+
+class FakeKernelClient(object):
+    """
+    Stands in for a kernel client, answering execute requests over real
+    ZeroMQ sockets. Requests are only answered once `respond` is called,
+    or once the kernel is interrupted.
+    """
+    _ids = itertools.count()
+
+    def __init__(self):
+        self._context = zmq.Context()
+        prefix = f"inproc://fake-kernel-{next(self._ids)}"
+        self.iopub_channel = SimpleNamespace(socket=self._bind(f"{prefix}-iopub"))
+        self.shell_channel = SimpleNamespace(socket=self._bind(f"{prefix}-shell"))
+        self._iopub = self._connect(f"{prefix}-iopub")
+        self._shell = self._connect(f"{prefix}-shell")
+        self.session = SimpleNamespace(msg=lambda msg_type, content: {'msg_type': msg_type})
+        self.control_channel = SimpleNamespace(send=self._on_control)
+        self.hb_channel = SimpleNamespace(is_alive=lambda: False)
+        self.n_interrupts = 0
+        self.sent = []
+        self.answered = set()
+        self._lock = threading.Lock()
+
+    def _bind(self, address):
+        socket = self._context.socket(zmq.PULL)
+        socket.bind(address)
+        return socket
+
+    def _connect(self, address):
+        socket = self._context.socket(zmq.PUSH)
+        socket.connect(address)
+        return socket
+
+    def close(self):
+        self._context.destroy(linger=0)
+
+    def execute(self, code, **kwargs):
+        self.sent.append(f"request-{len(self.sent)}")
+        return self.sent[-1]
+
+    def get_iopub_msg(self, timeout=None):
+        return self.iopub_channel.socket.recv_json()
+
+    def get_shell_msg(self, timeout=None):
+        return self.shell_channel.socket.recv_json()
+
+    def _output_hook_default(self, msg):
+        pass
+
+    def respond(self, msg_id, value=None):
+        with self._lock:
+            self.answered.add(msg_id)
+            parent = {'msg_id': msg_id}
+            if value is not None:
+                self._iopub.send_json({
+                    'msg_type': 'execute_result', 'parent_header': parent,
+                    'content': {'data': {'application/x-qsharp-data': value}}
+                })
+            self._iopub.send_json({
+                'msg_type': 'status', 'parent_header': parent,
+                'content': {'execution_state': 'idle'}
+            })
+            self._shell.send_json({'msg_type': 'execute_reply', 'parent_header': parent, 'content': {'status': 'ok'}})
+
+    def _on_control(self, msg):
+        assert msg['msg_type'] == 'interrupt_request'
+        self.n_interrupts += 1
+        # The interrupted request still writes some output before stopping.
+        running = next(msg_id for msg_id in self.sent if msg_id not in self.answered)
+        self.respond(running, '"stale"')
+
+class FakeAsyncKernelClient(object):
+    """
+    Stands in for an asyncio kernel client, running execute requests one
+    at a time in the order they were sent. The running request finishes
+    once `respond` is called, or once the kernel is interrupted.
+    """
+    def __init__(self):
+        self._iopub = asyncio.Queue()
+        self._shell = asyncio.Queue()
+        self._ids = itertools.count()
+        self.queued = []
+        self.interrupted = []
+        self.session = SimpleNamespace(msg=self._msg)
+        self.shell_channel = SimpleNamespace(send=self._on_shell)
+        self.control_channel = SimpleNamespace(send=self._on_control)
+
+    def _msg(self, msg_type, content):
+        return {'msg_type': msg_type, 'header': {'msg_id': f"request-{next(self._ids)}"}, 'content': content}
+
+    async def get_iopub_msg(self):
+        return await self._iopub.get()
+
+    async def get_shell_msg(self):
+        return await self._shell.get()
+
+    def stop_channels(self):
+        pass
+
+    def _status(self, msg_id, state):
+        self._iopub.put_nowait({
+            'msg_type': 'status', 'parent_header': {'msg_id': msg_id},
+            'content': {'execution_state': state}
+        })
+
+    def _on_shell(self, msg):
+        self.queued.append(msg['header']['msg_id'])
+        if len(self.queued) == 1:
+            self._status(self.queued[0], 'busy')
+
+    def respond(self, value=None):
+        msg_id = self.queued.pop(0)
+        parent = {'msg_id': msg_id}
+        if value is not None:
+            self._iopub.put_nowait({
+                'msg_type': 'execute_result', 'parent_header': parent,
+                'content': {'data': {'application/x-qsharp-data': value}}
+            })
+        self._status(msg_id, 'idle')
+        self._shell.put_nowait({'msg_type': 'execute_reply', 'parent_header': parent, 'content': {'status': 'ok'}})
+        if self.queued:
+            self._status(self.queued[0], 'busy')
+
+    def _on_control(self, msg):
+        assert msg['msg_type'] == 'interrupt_request'
+        self.interrupted.append(self.queued[0])
+        # The interrupted request still writes some output before stopping.
+        self.respond('"stale"')
+
+## FUNCTIONS ##
+
+def _attach_async_client(**kwargs):
+    """
+    Returns an async client attached to a new fake kernel, along with that
+    kernel. Must be called from a running event loop.
+    """
+    client = AsyncIQSharpClient(connection_info={}, **kwargs)
+    client._loop = asyncio.get_running_loop()
+    client._start_lock = asyncio.Lock()
+    client.kernel_client = kernel = FakeAsyncKernelClient()
+    client._routers = [
+        asyncio.ensure_future(client._route(kernel.get_iopub_msg, _PendingRequest.on_iopub)),
+        asyncio.ensure_future(client._route(kernel.get_shell_msg, _PendingRequest.on_reply))
+    ]
+    return client, kernel
+
+## FIXTURES ##
+
+@pytest.fixture
+def client():
+    client = IQSharpClient(connection_info={})
+    client.kernel_client = FakeKernelClient()
+    yield client
+    client.kernel_client.close()
+
+## TESTS ##
+
+def test_future_result():
+    assert submit(lambda x: 2 * x, 21).result(timeout=5) == 42
+
+def test_cancel_running_future():
+    started = threading.Event()
+    def wait_for_cancel():
+        started.set()
+        while not current_token().cancelled:
+            time.sleep(0.001)
+        raise CancelledError()
+
+    future = submit(wait_for_cancel)
+    started.wait(5)
+    assert future.cancel()
+    with pytest.raises(CancelledError):
+        future.result(timeout=5)
+    assert future.cancelled()
+    assert not future.cancel() or future.done()
+
+def test_cancel_completed_future():
+    future = submit(lambda: 1)
+    assert future.result(timeout=5) == 1
+    assert not future.cancel()
+    assert not future.cancelled()
+
+def test_timeout_interrupts_and_drains(client):
+    kernel = client.kernel_client
+    with pytest.raises(TimeoutError):
+        client._execute("%simulate Sample", _timeout_=0.1, _quiet_=True)
+    assert kernel.n_interrupts == 1
+
+    # Answer the next request only after output from the abandoned request,
+    # which must not be mistaken for its result.
+    kernel.respond("request-0", '"stale"')
+    threading.Timer(0.05, kernel.respond, args=("request-1", '"fresh"')).start()
+    assert client._execute("%simulate Sample", _timeout_=5, _quiet_=True) == "fresh"
+    assert not client.busy
+
+def test_cancel_interrupts_kernel(client):
+    kernel = client.kernel_client
+    future = client.submit('get_workspace_operations')
+    while not kernel.sent:
+        time.sleep(0.001)
+    assert future.cancel()
+    with pytest.raises(CancelledError):
+        future.result(timeout=5)
+    assert kernel.n_interrupts == 1
+    assert not client.busy
+
+def test_kernel_exit_fails_running_request(client, monkeypatch):
+    monkeypatch.setattr(qsharp.clients.iqsharp, 'LIVENESS_POLL_INTERVAL', 0.05)
+    alive = threading.Event()
+    alive.set()
+    client.kernel_manager = SimpleNamespace(is_alive=alive.is_set)
+    # Requests without a timeout fail once the kernel exits, rather than
+    # holding the kernel forever and so blocking any restart.
+    threading.Timer(0.1, alive.clear).start()
+    with pytest.raises(IQSharpError, match="exited"):
+        client._execute("%simulate Sample", _timeout_=None, _quiet_=True)
+    assert not client.busy
+
+    alive.set()
+    threading.Timer(0.1, alive.clear).start()
+    with pytest.raises(IQSharpError, match="exited"):
+        client._execute_pipelined(["%simulate Sample"] * 2, _timeout_=None, _quiet_=True)
+    assert not client.busy
+
+def test_pipelined_timeout_abandons_every_request(client):
+    kernel = client.kernel_client
+    inputs = [f"%simulate Sample{idx}" for idx in range(4)]
+    with pytest.raises(TimeoutError):
+        client._execute_pipelined(inputs, window=2, _timeout_=0.1, _quiet_=True)
+    # Only the requests in flight were sent, and each was interrupted.
+    assert kernel.sent == ["request-0", "request-1"]
+    assert kernel.n_interrupts == 2
+
+    threading.Timer(0.05, kernel.respond, args=("request-2", '"fresh"')).start()
+    assert client._execute("%simulate Sample", _timeout_=5, _quiet_=True) == "fresh"
+    assert not client.busy
+
+def test_cancel_pipelined_future(client):
+    kernel = client.kernel_client
+    inputs = [f"%simulate Sample{idx}" for idx in range(4)]
+    future = client.submit('_execute_pipelined', inputs, window=2, _quiet_=True)
+    while len(kernel.sent) < 2:
+        time.sleep(0.001)
+    # A request that has finished is drained rather than interrupted.
+    kernel.respond("request-0", '"done"')
+    assert future.cancel()
+    with pytest.raises(CancelledError):
+        future.result(timeout=5)
+    assert kernel.n_interrupts == len(kernel.sent) - 1
+    assert not client.busy
+
+def test_async_timeout_interrupts_running_request():
+    async def run():
+        client, kernel = _attach_async_client(is_kernel_busy=lambda: False)
+        try:
+            with pytest.raises(asyncio.TimeoutError):
+                await client._execute("%simulate Sample", _timeout_=0.1, _quiet_=True)
+            assert kernel.interrupted == ["request-0"]
+
+            # Abandoning a request that is still queued interrupts it only
+            # once the kernel starts running it, rather than interrupting
+            # the request ahead of it.
+            first = asyncio.ensure_future(client._execute("%simulate First", _timeout_=5, _quiet_=True))
+            second = asyncio.ensure_future(client._execute("%simulate Second", _timeout_=5, _quiet_=True))
+            await asyncio.sleep(0.01)
+            second.cancel()
+            await asyncio.sleep(0.01)
+            assert kernel.interrupted == ["request-0"]
+            kernel.respond('"first"')
+            assert await first == "first"
+            with pytest.raises(asyncio.CancelledError):
+                await second
+            await asyncio.sleep(0.01)
+            assert kernel.interrupted == ["request-0", "request-3"]
+            assert not client.busy
+        finally:
+            await client.aclose()
+    asyncio.run(run())
+
+def test_async_abandon_interrupts_only_when_nothing_else_in_flight():
+    async def run():
+        client, kernel = _attach_async_client(is_kernel_busy=lambda: False)
+        try:
+            # The kernel isn't interrupted while a request is queued behind
+            # the abandoned one, as the interrupt could stop that request.
+            first = asyncio.ensure_future(client._execute("%simulate First", _timeout_=5, _quiet_=True))
+            second = asyncio.ensure_future(client._execute("%simulate Second", _timeout_=5, _quiet_=True))
+            await asyncio.sleep(0.01)
+            first.cancel()
+            await asyncio.sleep(0.01)
+            assert kernel.interrupted == []
+
+            # Once that request is abandoned too, both are interrupted.
+            second.cancel()
+            await asyncio.sleep(0.01)
+            assert kernel.interrupted == ["request-0", "request-1"]
+            assert not client.busy
+        finally:
+            await client.aclose()
+    asyncio.run(run())
+
+@pytest.mark.parametrize("is_kernel_busy", [None, lambda: True])
+def test_async_abandon_does_not_interrupt_shared_kernel(is_kernel_busy):
+    async def run():
+        client, kernel = _attach_async_client(is_kernel_busy=is_kernel_busy)
+        try:
+            # Other clients of the kernel may have requests in flight, so
+            # the abandoned request runs to completion instead.
+            with pytest.raises(asyncio.TimeoutError):
+                await client._execute("%simulate Sample", _timeout_=0.1, _quiet_=True)
+            assert kernel.interrupted == []
+            kernel.respond('"done"')
+            await asyncio.sleep(0.01)
+            assert not client.busy
+        finally:
+            await client.aclose()
+    asyncio.run(run())
+
+def test_async_client_gets_connection_info_off_loop():
+    threads = []
+    def get_connection_info():
+        threads.append(threading.current_thread())
+        raise RuntimeError("kernel failed to start")
+    async def run():
+        client = AsyncIQSharpClient(connection_info=get_connection_info)
+        with pytest.raises(RuntimeError, match="kernel failed to start"):
+            await client._ensure_started()
+    asyncio.run(run())
+    assert threads and threads[0] is not threading.main_thread()
@@ -0,0 +1,63 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+##
+# test_diagnostics.py: Tests containers for captured diagnostics.
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+
+## IMPORTS ##
+
+from collections import deque
+
+import pytest
+
+import qsharp
+import qsharp.clients.mock
+from qsharp.results.diagnostics import DiagnosticsFile, new_container
+
+## TESTS ##
+
+def test_new_container():
+    assert new_container() == []
+    ring = new_container(max_items=2)
+    ring.extend([1, 2, 3])
+    assert list(ring) == [2, 3]
+    with pytest.raises(ValueError):
+        new_container(max_items=2, sink="diagnostics.jsonl")
+    with pytest.raises(ValueError):
+        new_container(max_items=0)
+
+def test_diagnostics_file(tmp_path):
+    path = tmp_path / "diagnostics.jsonl"
+    diagnostics = DiagnosticsFile(path)
+    states = [{'qubit_ids': [0], 'amplitudes': {str(idx): [idx, "é"]}} for idx in range(5)]
+    for state in states:
+        diagnostics.append(state)
+
+    # Diagnostics can be read back while the file is still being written.
+    assert len(diagnostics) == 5
+    assert list(diagnostics) == states
+    assert diagnostics[3] == states[3]
+    assert diagnostics[-1] == states[-1]
+
+    diagnostics.close()
+    assert len(path.read_text(encoding='utf-8').splitlines()) == 5
+    diagnostics.convert = lambda state: state['amplitudes']
+    assert list(diagnostics)[1] == {'1': [1, "é"]}
+    with pytest.raises(ValueError):
+        diagnostics.append({})
+
+def test_capture_diagnostics_modes(tmp_path, monkeypatch):
+    # Doesn't need an IQ# kernel, as nothing is run while capturing.
+    monkeypatch.setattr(qsharp, 'client', qsharp.clients.mock.MockClient())
+    with qsharp.capture_diagnostics(max_items=3) as captured:
+        pass
+    assert isinstance(captured, deque)
+    assert captured.maxlen == 3
+
+    with qsharp.capture_diagnostics(sink=tmp_path / "captured.jsonl") as captured:
+        pass
+    assert isinstance(captured, DiagnosticsFile)
+    assert list(captured) == []
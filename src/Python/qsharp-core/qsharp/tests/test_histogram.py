@@ -0,0 +1,39 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+##
+# test_histogram.py: Tests counting outputs of repeated shots.
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+
+## IMPORTS ##
+
+import numpy as np
+
+from qsharp.results.histogram import Histogram
+
+## TESTS ##
+
+def test_from_counts():
+    histogram = Histogram.from_counts([([0, 1], 3), ([1, 1], 1), (((0, 1),), 2)])
+    assert histogram == {(0, 1): 3, (1, 1): 1, ((0, 1),): 2}
+    assert histogram.shots == 6
+    assert histogram.most_common(1) == [((0, 1), 3)]
+
+def test_probabilities():
+    histogram = Histogram.from_counts([(0, 3), (1, 1)])
+    assert histogram.probabilities() == {0: 0.75, 1: 0.25}
+
+def test_numpy():
+    histogram = Histogram.from_counts([([0, 1], 3), ([1, 1], 1)])
+    outputs, counts = histogram.to_numpy()
+    assert outputs.tolist() == [[0, 1], [1, 1]]
+    assert counts.tolist() == [3, 1]
+    assert np.array_equal(histogram.samples(), [[0, 1], [0, 1], [0, 1], [1, 1]])
+
+def test_numpy_outputs():
+    histogram = Histogram.from_counts([(np.array([0, 1], dtype=np.uint8), 3), (np.array([1, 1], dtype=np.uint8), 1)])
+    assert histogram == {(0, 1): 3, (1, 1): 1}
+    outputs, _ = histogram.to_numpy()
+    assert outputs.dtype == np.uint8
@@ -10,6 +10,7 @@
 ## IMPORTS ##
 
 import json
+import time
 
 from qsharp.utils import try_import_qutip
 import numpy as np
@@ -48,6 +49,15 @@ skip_if_conda = pytest.mark.skipif(is_conda, reason="Test is not supported from
 
 ## TESTS ##
 
+def test_wait_until_ready():
+    """
+    Checks that a running kernel is reported as ready, and that component
+    versions are cached after their first use.
+    """
+    assert qsharp.client.wait_until_ready(timeout=5)
+    assert qsharp.client.is_ready()
+    assert qsharp.component_versions() == qsharp.component_versions()
+
 @skip_if_no_workspace
 def test_simulate():
     """
@@ -73,6 +83,59 @@ def test_toffoli_simulate():
     """)
     assert foo.toffoli_simulate() == 1
 
+def test_simulate_async():
+    """
+    Checks that several asynchronous simulations can be in flight at once,
+    and that each caller receives its own result.
+    """
+    import asyncio
+    echo = qsharp.compile("""
+        function EchoInt(value : Int) : Int {
+            return value;
+        }
+    """)
+
+    async def run_all():
+        return await asyncio.gather(*[
+            echo.simulate_async(value=value)
+            for value in range(10)
+        ])
+
+    assert asyncio.run(run_all()) == list(range(10))
+
+def test_simulate_async_matches_simulate():
+    """
+    Checks that asynchronous simulations decode outputs with the codec
+    compiled from the signature of the callable, as synchronous ones do.
+    """
+    import asyncio
+    measure = qsharp.compile("""
+        operation MeasurePairs(n : Int) : (Result, Int)[] {
+            mutable pairs = [];
+            for idx in 0..n - 1 {
+                set pairs += [(One, idx)];
+            }
+            return pairs;
+        }
+    """)
+    assert asyncio.run(measure.simulate_async(n=3)) == measure.simulate(n=3) == [(qsharp.Result.One, idx) for idx in range(3)]
+    assert all(type(result) is qsharp.Result for result, _ in asyncio.run(measure.simulate_async(n=3)))
+
+def test_map():
+    """
+    Checks that pipelined calls return each result in the order in which
+    the arguments were given.
+    """
+    echo = qsharp.compile("""
+        function EchoPair(value : Int, label : String) : (Int, String) {
+            return (value, label);
+        }
+    """)
+    kwargs_list = [{'value': value, 'label': str(value)} for value in range(50)]
+    assert qsharp.client.map(echo, kwargs_list, window=8) == [
+        (value, str(value)) for value in range(50)
+    ]
+
 @skip_if_no_workspace
 def test_tuples():
     """
@@ -82,6 +145,287 @@ def test_tuples():
     r = IndexIntoTuple.simulate(count=2, tuples=[(0, "Zero"), (1, "One"), (0, "Two"), (0, "Three")])
     assert r == (0, "Two")
 
+@skip_if_no_workspace
+def test_simulate_batch():
+    """
+    Checks that a batch of simulations returns one result per set of
+    arguments, in order.
+    """
+    from Microsoft.Quantum.SanityTests import IndexIntoTuple
+    tuples = [(0, "Zero"), (1, "One"), (0, "Two")]
+    kwargs_list = [{'count': count, 'tuples': tuples} for count in range(3)]
+    assert IndexIntoTuple.simulate_batch(kwargs_list) == tuples
+    assert IndexIntoTuple.simulate_batch(kwargs_list, batch_size=2) == tuples
+
+def test_attach_to_running_kernel():
+    """
+    Checks that a second client can attach to the kernel of the first,
+    sharing its compiled callables, and leaves that kernel running when
+    stopped.
+    """
+    from qsharp.clients.iqsharp import IQSharpClient
+    echo = qsharp.compile("""
+        function EchoAttached(value : Int) : Int {
+            return value;
+        }
+    """)
+    attached = IQSharpClient(connection_info=qsharp.client.get_connection_info())
+    attached.start()
+    try:
+        assert attached.attached
+        assert attached.wait_until_ready(timeout=5)
+        assert attached.simulate(echo, value=42) == 42
+    finally:
+        attached.stop()
+    assert echo.simulate(value=7) == 7
+
+def test_restart_replays_state():
+    """
+    Checks that snippets compiled before the kernel restarts can still be
+    called afterwards.
+    """
+    echo = qsharp.compile("""
+        function EchoAfterRestart(value : Int) : Int {
+            return value;
+        }
+    """)
+    qsharp.client.restart()
+    assert echo.simulate(value=42) == 42
+
+def test_kernel_killed_during_call():
+    """
+    Checks that a call without a timeout fails when the kernel is killed
+    while running it, such that the watchdog can restart the kernel.
+    """
+    import signal
+    from qsharp.clients.iqsharp import IQSharpError
+    from qsharp.clients.watchdog import _kernel_pid
+    flip = qsharp.compile("""
+        open Microsoft.Quantum.Measurement;
+
+        operation FlipCoinUntilKilled() : Result {
+            use q = Qubit();
+            H(q);
+            return MResetZ(q);
+        }
+    """)
+    watchdog = qsharp.client.enable_watchdog(interval=0.5)
+    try:
+        future = flip.submit('simulate_shots', shots=10**9, _timeout_=None)
+        time.sleep(1)
+        os.kill(_kernel_pid(qsharp.client.kernel_manager), getattr(signal, 'SIGKILL', signal.SIGTERM))
+        with pytest.raises(IQSharpError):
+            future.result(timeout=60)
+        deadline = time.monotonic() + 60
+        while watchdog.n_restarts == 0 and time.monotonic() < deadline:
+            time.sleep(0.1)
+        assert watchdog.n_restarts == 1
+    finally:
+        watchdog.stop()
+    assert flip.simulate_shots(shots=10, seed=42).shots == 10
+
+def test_simulate_shots():
+    """
+    Checks that shots are counted into a histogram, and that seeding the
+    simulator makes that histogram reproducible.
+    """
+    flip = qsharp.compile("""
+        open Microsoft.Quantum.Measurement;
+
+        operation FlipCoins(nCoins : Int) : Result[] {
+            use qs = Qubit[nCoins];
+            ApplyToEach(H, qs);
+            return MultiM(qs);
+        }
+    """)
+    histogram = flip.simulate_shots(shots=200, seed=42, nCoins=2)
+    assert histogram.shots == 200
+    assert set(histogram) <= {(0, 0), (0, 1), (1, 0), (1, 1)}
+    assert histogram == flip.simulate_shots(shots=200, seed=42, nCoins=2)
+    assert flip.simulate_sparse_shots(shots=200, seed=42, nCoins=2).shots == 200
+
+    outputs, counts = histogram.to_numpy()
+    assert outputs.shape == (len(histogram), 2)
+    assert counts.sum() == 200
+    assert histogram.samples().shape == (200, 2)
+
+@skip_if_no_workspace
+def test_simulate_shots_decodes_results():
+    """
+    Checks that the outputs counted over many shots are decoded according
+    to the signature of the operation, as for a single shot.
+    """
+    from Microsoft.Quantum.SanityTests import EchoResult
+    histogram = EchoResult.simulate_shots(shots=10, input=qsharp.Result.One)
+    assert histogram == {qsharp.Result.One: 10}
+    assert all(type(output) is qsharp.Result for output in histogram)
+
+    flip = qsharp.compile("""
+        operation FlipCoin() : Result[] {
+            use q = Qubit();
+            H(q);
+            return [M(q)];
+        }
+    """)
+    outputs, _ = flip.simulate_shots(shots=20, seed=42, _as_numpy_=True).to_numpy()
+    assert outputs.dtype == np.uint8
+
+def test_cancel_simulation():
+    """
+    Checks that cancelling a running simulation, or letting it time out,
+    interrupts the kernel and leaves it ready for the next request.
+    """
+    from concurrent.futures import CancelledError
+    flip = qsharp.compile("""
+        open Microsoft.Quantum.Measurement;
+
+        operation FlipCoin() : Result {
+            use q = Qubit();
+            H(q);
+            return MResetZ(q);
+        }
+    """)
+    future = flip.submit('simulate_shots', shots=10**9)
+    time.sleep(1)
+    assert future.cancel()
+    with pytest.raises(CancelledError):
+        future.result(timeout=60)
+    assert future.cancelled()
+
+    with pytest.raises(TimeoutError):
+        flip.simulate_shots(shots=10**9, _timeout_=1)
+
+    assert flip.simulate_shots(shots=10, seed=42).shots == 10
+
+def test_simulate_stream():
+    """
+    Checks that diagnostics and messages are streamed in the order in which
+    they were emitted, followed by the result.
+    """
+    dump_loop = qsharp.compile("""
+        open Microsoft.Quantum.Diagnostics;
+
+        operation DumpInLoop(nDumps : Int) : Int {
+            use q = Qubit();
+            for idx in 1..nDumps {
+                Message($"dump {idx}");
+                DumpMachine();
+            }
+            return nDumps;
+        }
+    """)
+    events = list(dump_loop.simulate_stream(nDumps=3))
+    assert [event.kind for event in events] == ['stdout', 'diagnostic'] * 3 + ['result']
+    assert events[-1].data == 3
+
+    events = list(dump_loop.simulate_stream(max_buffered=1, policy='drop_oldest', nDumps=50))
+    assert events[-1].data == 50
+
+def test_stats():
+    """
+    Checks that each call is timed, and its phases passed to span hooks.
+    """
+    from qsharp.clients.tracing import tracer
+    hello = qsharp.compile("""
+        function HelloStats(count : Int) : Int {
+            return count;
+        }
+    """)
+    spans = []
+    tracer.add_hook(spans.append)
+    try:
+        qsharp.stats(reset=True)
+        for count in range(5):
+            assert hello.simulate(count=count) == count
+    finally:
+        tracer.remove_hook(spans.append)
+
+    stats = qsharp.stats()
+    assert stats['%simulate'].count == 5
+    assert stats['%simulate'].n_errors == 0
+    assert 0 < stats['%simulate'].p50 <= stats['%simulate'].p99
+    assert stats['%simulate'].bytes_out > 0
+    assert stats['%simulate'].bytes_in > 0
+    assert {child.name for child in spans[-1].children} >= {'map_tuples', 'send', 'execute_reply', 'decode'}
+
+def test_kernel_task_spans():
+    """
+    Checks that tasks timed by the kernel are added to the span of the call
+    that ran them.
+    """
+    from qsharp.clients.tracing import tracer
+    spans = []
+    tracer.add_hook(spans.append)
+    qsharp.config['internal.tracePerf'] = True
+    try:
+        qsharp.compile("""
+            function HelloKernelTasks() : Unit {}
+        """)
+    finally:
+        qsharp.config['internal.tracePerf'] = False
+        tracer.remove_hook(spans.append)
+
+    [compiled] = [span for span in spans if span.name == 'compile']
+    assert 'kernel:execute-mundane' in {child.name for child in compiled.children}
+
+def test_performance():
+    """
+    Checks that kernel resource usage can be read and sampled over time.
+    """
+    performance = qsharp.performance()
+    assert performance.total_ram > 0
+    assert performance.managed_ram > 0
+    assert performance.peak_total_ram >= performance.total_ram
+
+    flip = qsharp.compile("""
+        open Microsoft.Quantum.Measurement;
+
+        operation FlipCoins() : Result {
+            use q = Qubit();
+            H(q);
+            return MResetZ(q);
+        }
+    """)
+    with qsharp.monitor(interval=0.1) as monitor:
+        flip.simulate_shots(shots=1000)
+    assert len(monitor) >= 2
+    assert monitor.to_numpy()['total_time'][-1] >= monitor.to_numpy()['total_time'][0]
+
+@skip_if_no_workspace
+def test_signature_codecs():
+    """
+    Checks that callables decode their outputs according to their
+    signatures.
+    """
+    from Microsoft.Quantum.SanityTests import EchoResult, SwapFirstPauli, IndexIntoTuple
+    assert str(EchoResult._codec.signature) == "EchoResult (input : Result) : Result"
+    result = EchoResult.simulate(input=qsharp.Result.One)
+    assert result == qsharp.Result.One and type(result) is qsharp.Result
+    paulis, pauli = SwapFirstPauli.simulate(paulis=[qsharp.Pauli.I, qsharp.Pauli.X], pauliToSwap=qsharp.Pauli.Y)
+    assert paulis == [qsharp.Pauli.Y, qsharp.Pauli.X] and pauli == qsharp.Pauli.I
+    assert all(type(value) is qsharp.Pauli for value in paulis + [pauli])
+    assert IndexIntoTuple.simulate(count=1, tuples=[(0, "Zero"), (1, "One")]) == (qsharp.Result.One, "One")
+
+@skip_if_no_workspace
+def test_simulate_iter():
+    """
+    Checks that the items of array outputs can be decoded lazily.
+    """
+    from Microsoft.Quantum.SanityTests import HelloAgain
+    results = HelloAgain.simulate_iter(count=3, name="Ada")
+    assert next(results) == qsharp.Result.Zero
+    assert list(results) == [qsharp.Result.One, qsharp.Result.Zero]
+
+@skip_if_no_workspace
+def test_as_numpy():
+    """
+    Checks that arrays of results can be returned as NumPy arrays.
+    """
+    from Microsoft.Quantum.SanityTests import HelloAgain
+    results = HelloAgain.simulate(count=3, name="Ada", _as_numpy_=True)
+    assert isinstance(results, np.ndarray)
+    assert results.tolist() == [0, 1, 0]
+
 @skip_if_no_workspace
 def test_numpy_types():
     """
@@ -294,6 +638,27 @@ class TestCaptureDiagnostics:
         """
         assert json.dumps(json.loads(expected)) == json.dumps(captured[0])
 
+    def test_bounded_capture(self, tmp_path):
+        dump_loop = qsharp.compile("""
+            open Microsoft.Quantum.Diagnostics;
+
+            operation DumpRepeatedly(nDumps : Int) : Unit {
+                use q = Qubit();
+                for idx in 1..nDumps {
+                    DumpMachine();
+                }
+            }
+        """)
+
+        with qsharp.capture_diagnostics(max_items=2) as captured:
+            dump_loop.simulate(nDumps=10)
+        assert 2 == len(captured)
+
+        with qsharp.capture_diagnostics(sink=tmp_path / "dumps.jsonl") as captured:
+            dump_loop.simulate(nDumps=10)
+        assert 10 == len(captured)
+        assert all(diagnostic["n_qubits"] == 1 for diagnostic in captured)
+
 
     @skip_if_no_qutip
     def test_capture_diagnostics_as_qobj(self):
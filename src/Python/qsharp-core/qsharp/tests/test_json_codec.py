@@ -0,0 +1,116 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+##
+# test_json_codec.py: Checks that every available JSON codec encodes and
+#     decodes exactly as the json module does.
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+
+## IMPORTS ##
+
+import json
+import math
+import random
+import struct
+from collections import OrderedDict
+from enum import IntEnum
+
+import pytest
+
+import qsharp.serialization as serialization
+from qsharp.serialization import map_tuples, json_codecs, set_json_codec
+from .utils import set_environment_variables
+
+## SETUP ##
+
+@pytest.fixture(scope="session", autouse=True)
+def session_setup():
+    set_environment_variables()
+
+@pytest.fixture(params=json_codecs())
+def codec(request):
+    previous = serialization.json_codec
+    set_json_codec(request.param)
+    yield request.param
+    set_json_codec(previous)
+
+## PAYLOADS ##
+
+class Pauli(IntEnum):
+    PauliI = 0
+    PauliX = 1
+
+def _random_floats(n, seed=42):
+    rng = random.Random(seed)
+    floats = [rng.random() * 10 ** rng.randint(-30, 30) for _ in range(n // 2)]
+    # Random bit patterns cover subnormals and every exponent.
+    floats += [
+        struct.unpack('<d', struct.pack('<Q', rng.getrandbits(64)))[0]
+        for _ in range(n // 2)
+    ]
+    return [value for value in floats if math.isfinite(value)]
+
+def _nested(depth):
+    value = [1]
+    for _ in range(depth):
+        value = [value, {"depth": len(value)}]
+    return value
+
+PAYLOADS = {
+    'empty': [{}, [], "", 0],
+    'ints': [0, -1, 1, 2**31, -2**31 - 1, 2**63 - 1, -2**63, 2**63, 2**64 + 1, -2**70, 10**40],
+    'floats': [0.0, -0.0, 0.1, 1.5, -2.5, 1e-7, 1e-5, 1e-4, 0.00012, 1e16, 1e17, 1.7976931348623157e308, 5e-324, 123456789.123],
+    'non-finite floats': [math.nan, math.inf, -math.inf, [1.0, math.nan]],
+    'random floats': _random_floats(2000),
+    'bools and none': [True, False, None, [None, True]],
+    'strings': ["", "plain", "quote\"backslash\\slash/", "\b\f\n\r\t\x00\x1f\x7f", "café ∑ 𝜓 ☃", "  ", "null", "1e5"],
+    'delete': ["\x7f", "a\x7fb", {"\x7f": "\x7f\x7f"}],
+    'lone surrogates': ["\ud800", "a\udfffb"],
+    'all of the BMP': "".join(chr(code) for code in range(0xd800)) + "".join(chr(code) for code in range(0xe000, 0x10000)),
+    'keys': {"": 1, "Item1": 2, "café": 3, "@type": "tuple", "nested": {"a": {"b": [1, 2, {"c": None}]}}},
+    'subclasses': [OrderedDict([("b", 1), ("a", 2)]), Pauli.PauliX, True],
+    'non-string keys': {1: "one", 2.5: "two and a half", None: "none", True: "true"},
+    'deeply nested': _nested(300),
+    'tuples': map_tuples({"pair": (1, 2.5), "long": tuple(range(20)), "results": [(idx, idx % 2 == 0) for idx in range(100)]}),
+    'large': map_tuples({"shots": [(idx, [idx % 2] * 8, idx / 7) for idx in range(5000)]})
+}
+
+## TESTS ##
+
+def test_json_codecs():
+    codecs = json_codecs()
+    assert codecs[-1] == 'json'
+    assert serialization.json_codec in codecs
+    with pytest.raises(ValueError):
+        set_json_codec('not a codec')
+
+@pytest.mark.parametrize("name", list(PAYLOADS))
+def test_dumps_conformance(codec, name):
+    payload = PAYLOADS[name]
+    expected = json.dumps(payload, separators=(',', ':'))
+    assert serialization.dumps(payload) == expected
+
+@pytest.mark.parametrize("name", list(PAYLOADS))
+def test_loads_conformance(codec, name):
+    payload = PAYLOADS[name]
+    for encoded in (json.dumps(payload), json.dumps(payload, separators=(',', ':'), ensure_ascii=False)):
+        # Compare representations, so that NaNs compare equal and values
+        # that are equal but of different types (e.g.: 2**64 and 2.0**64)
+        # do not.
+        expected = repr(json.loads(encoded))
+        assert repr(serialization.loads(encoded)) == expected
+        if name != 'lone surrogates':
+            assert repr(serialization.loads(encoded.encode('utf-8'))) == expected
+
+def test_dumps_unserializable(codec):
+    with pytest.raises(TypeError):
+        serialization.dumps({"value": object()})
+    with pytest.raises(TypeError):
+        serialization.dumps({"value": {1, 2}})
+
+def test_loads_invalid(codec):
+    for invalid in ('', '[1, 2', '{"a" 1}', 'nul'):
+        with pytest.raises(ValueError):
+            serialization.loads(invalid)
@@ -0,0 +1,58 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+##
+# test_lazy_client.py: Tests deferring the start of a Q# client until first
+#     use.
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+
+## IMPORTS ##
+
+import pytest
+import qsharp.clients.mock
+from qsharp.clients import LazyClient
+
+## SETUP ##
+
+class CountingStarter(object):
+    """
+    Starts mock clients, counting how many were started.
+    """
+    def __init__(self):
+        self.n_started = 0
+
+    def __call__(self):
+        self.n_started += 1
+        client = qsharp.clients.mock.MockClient()
+        client.start()
+        return client
+
+## TESTS ##
+
+def test_starts_on_first_use():
+    starter = CountingStarter()
+    client = LazyClient(starter, in_background=False)
+    assert not client.busy
+    assert not client.started
+    assert starter.n_started == 0
+
+    assert client.get_available_operations() == qsharp.clients.mock.MockClient.mock_operations
+    client.add_package("Microsoft.Quantum.Numerics")
+    assert client.started
+    assert starter.n_started == 1
+    assert client.packages == ["Microsoft.Quantum.Numerics"]
+
+def test_starts_in_background():
+    starter = CountingStarter()
+    client = LazyClient(starter, in_background=True)
+    assert isinstance(client.get(), qsharp.clients.mock.MockClient)
+    assert starter.n_started == 1
+
+def test_background_error_is_raised_on_use():
+    def fail():
+        raise RuntimeError("kernel failed to start")
+    client = LazyClient(fail, in_background=True)
+    with pytest.raises(RuntimeError, match="kernel failed to start"):
+        client.get_available_operations()
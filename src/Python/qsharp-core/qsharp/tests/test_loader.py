@@ -16,6 +16,8 @@ import os
 import pytest
 import qsharp
 import qsharp.clients.mock
+from qsharp.clients import LazyClient
+from qsharp.loader import NamespaceIndex
 from .utils import set_environment_variables
 
 print ( qsharp.component_versions() )
@@ -48,3 +50,109 @@ def test_import_dir_is_correct():
 
     import A.B
     assert dir(A.B) == ["C", "D"]
+
+def test_missing_module_when_client_not_started(monkeypatch):
+    starts = []
+    def start():
+        starts.append(True)
+        raise RuntimeError("kernel failed to start")
+    monkeypatch.setattr(qsharp, 'client', LazyClient(start, in_background=False))
+    # Optional dependencies are probed by catching ImportError, whether or
+    # not their names look like Q# namespaces, and probing them doesn't
+    # start the client.
+    for name in ("some_missing_pkg", "SomeMissingPkg"):
+        try:
+            __import__(name)
+        except ImportError:
+            pass
+        else:
+            assert False, f"Expected {name} to be missing."
+    assert not starts
+    assert not qsharp.client.started
+
+def test_callable_codec_is_compiled_once(monkeypatch):
+    calls = []
+    def get_operation_metadata(name):
+        calls.append(name)
+        return {'signature': 'F (n : Int, angles : Double[]) : Result[]'}
+    monkeypatch.setattr(qsharp.client, 'get_operation_metadata', get_operation_metadata)
+
+    import A.E
+    op = A.E.F
+    assert str(op._codec.signature) == 'F (n : Int, angles : Double[]) : Result[]'
+    assert op._get_codec() is op._codec
+    op.simulate(n=3, angles=[0.5])
+    assert calls == ['A.E.F']
+    assert op._codec.decode_output([0, 1]) == [qsharp.Result.Zero, qsharp.Result.One]
+
+    # Callables compiled from snippets fetch their signature when first run.
+    snippet = qsharp.QSharpCallable('Snippet', 'snippets')
+    assert snippet._codec is None
+    snippet.simulate()
+    snippet.simulate()
+    assert calls == ['A.E.F', 'Snippet']
+    assert snippet._codec.signature.output == qsharp.signatures.parse_type('Result[]')
+
+def test_async_calls_use_compiled_codec(monkeypatch):
+    import asyncio
+    signature = 'F () : (Result, Int)[]'
+    output = [{'@type': '@tuple', 'Item1': 1, 'Item2': 2}]
+    class AsyncMockClient(object):
+        # Decodes outputs as the IQ# clients do, with whichever codec has
+        # been compiled for the callable by the time it is called.
+        async def get_operation_metadata(self, name):
+            return {'signature': signature}
+        async def simulate(self, op, **kwargs):
+            return qsharp.signatures.callable_codec(op).decode_output(output)
+    def simulate(op, **kwargs):
+        return qsharp.signatures.callable_codec(op).decode_output(output)
+    monkeypatch.setattr(qsharp.client, 'get_operation_metadata', lambda name: {'signature': signature})
+    monkeypatch.setattr(qsharp.client, 'simulate', simulate)
+    monkeypatch.setattr(qsharp, 'get_async_client', lambda: AsyncMockClient())
+
+    expected = [(qsharp.Result.One, 2)]
+    assert qsharp.QSharpCallable('Snippet', 'snippets').simulate() == expected
+    op = qsharp.QSharpCallable('Snippet', 'snippets')
+    assert asyncio.run(op.simulate_async()) == expected
+    assert type(asyncio.run(op.simulate_async())[0][0]) is qsharp.Result
+
+def test_namespace_index_is_cached(monkeypatch):
+    calls = []
+    def get_available_operations():
+        calls.append(None)
+        return ["A.B.C", "A.B.D", "A.E.F"]
+    monkeypatch.setattr(qsharp.client, 'get_available_operations', get_available_operations)
+    # Compiling snippets may add namespaces, so the index is built again
+    # after each compilation, but only once.
+    qsharp.compile("")
+
+    import A.B
+    for _ in range(3):
+        with pytest.raises(ImportError):
+            import not_a_qsharp_namespace
+    assert dir(A.B) == ["C", "D"]
+    assert A.B.C._name == "A.B.C"
+    assert len(calls) == 1
+
+    qsharp.compile("")
+    with pytest.raises(ImportError):
+        import A.Z
+    assert len(calls) == 2
+
+def test_namespace_index():
+    index = NamespaceIndex({
+        "Microsoft.Quantum.Intrinsic": ["H", "X"],
+        "Microsoft.Quantum.Chemistry.JordanWigner": ["Evolve"],
+        "Microsoft.Quantum": ["Root"],
+        "Other": []
+    })
+    for ns_name in ("Microsoft", "Microsoft.Quantum", "Microsoft.Quantum.Chemistry", "Microsoft.Quantum.Intrinsic", "Other"):
+        assert ns_name in index
+    for ns_name in ("Microsoft.Q", "Microsoft.Quantum.H", "Quantum", "numpy.core"):
+        assert ns_name not in index
+    assert index.has_callable("Microsoft.Quantum.Intrinsic", "H")
+    assert not index.has_callable("Microsoft.Quantum", "H")
+    assert not index.has_callable("Microsoft", "Quantum")
+    assert index.members("Microsoft.Quantum") == ["Chemistry", "Intrinsic", "Root"]
+    assert index.members("Microsoft") == ["Quantum"]
+    assert index.members("Missing") == []
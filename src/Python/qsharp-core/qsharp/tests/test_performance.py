@@ -0,0 +1,86 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+##
+# test_performance.py: Tests sampling of kernel resource usage.
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+
+## IMPORTS ##
+
+import csv
+import itertools
+import time
+
+import numpy as np
+import pytest
+
+import qsharp
+import qsharp.clients.mock
+from qsharp.results.performance import KernelPerformance, PerformanceMonitor
+
+## FUNCTIONS ##
+
+def _counting_sampler():
+    counter = itertools.count()
+    def sample():
+        idx = next(counter)
+        if idx == 1:
+            raise RuntimeError("sample failed")
+        return KernelPerformance(total_ram=1000 * idx, virtual_memory=2000 * idx, user_time=0.5 * idx, total_time=1.0 * idx)
+    return sample
+
+## TESTS ##
+
+def test_from_dict():
+    performance = KernelPerformance.from_dict({
+        'managed_ram': 1, 'total_ram': 2, 'peak_total_ram': 3,
+        'virtual_memory': 4, 'user_time': 0.5, 'total_time': 0.75
+    })
+    assert performance == KernelPerformance(
+        total_ram=2, virtual_memory=4, user_time=0.5, total_time=0.75, managed_ram=1, peak_total_ram=3
+    )
+
+def test_total():
+    total = KernelPerformance.total([
+        KernelPerformance(total_ram=1, virtual_memory=2, user_time=0.5, total_time=1.0, managed_ram=1),
+        KernelPerformance(total_ram=3, virtual_memory=4, user_time=0.5, total_time=2.0)
+    ])
+    assert total.total_ram == 4
+    assert total.total_time == 3.0
+    # Metrics that any kernel didn't report are unknown in total.
+    assert total.managed_ram is None
+
+def test_monitor(tmp_path):
+    with pytest.raises(ValueError):
+        PerformanceMonitor(_counting_sampler(), interval=0)
+
+    with PerformanceMonitor(_counting_sampler(), interval=0.01) as monitor:
+        while len(monitor) < 3:
+            time.sleep(0.01)
+    n_samples = len(monitor)
+    # Failed samples are skipped.
+    assert [sample.total_ram for sample in monitor.samples[:2]] == [0, 2000]
+    assert monitor.times == sorted(monitor.times)
+
+    columns = monitor.to_numpy()
+    assert set(columns) == {'time', 'total_ram', 'virtual_memory', 'user_time', 'total_time', 'managed_ram', 'peak_total_ram'}
+    assert columns['total_ram'].shape == (n_samples,)
+    assert np.isnan(columns['managed_ram']).all()
+
+    path = tmp_path / "performance.csv"
+    monitor.to_csv(path)
+    with open(path, newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == n_samples
+    assert rows[1]['total_ram'] == '2000'
+    assert rows[1]['managed_ram'] == ''
+
+def test_qsharp_monitor(monkeypatch):
+    # Sampling the IQ# kernel itself is tested in test_iqsharp.py.
+    monkeypatch.setattr(qsharp, 'client', qsharp.clients.mock.MockClient())
+    assert qsharp.performance().total_ram >= 0
+    with qsharp.monitor(interval=0.01) as monitor:
+        pass
+    assert len(monitor) >= 1
@@ -0,0 +1,94 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+##
+# test_pool.py: Tests that the kernel pool client replays state and
+#     dispatches calls across kernels.
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+
+## IMPORTS ##
+
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+import pytest
+import qsharp.clients.mock
+from qsharp.clients.cancellation import current_token
+from qsharp.clients.pool import KernelPool
+
+## SETUP ##
+
+class SlowMockClient(qsharp.clients.mock.MockClient):
+    """
+    Mock client that records which threads called simulate, and how many
+    calls were running at the same time.
+    """
+    running = 0
+    max_running = 0
+    lock = threading.Lock()
+
+    def simulate(self, op, **params):
+        with SlowMockClient.lock:
+            SlowMockClient.running += 1
+            SlowMockClient.max_running = max(SlowMockClient.max_running, SlowMockClient.running)
+        time.sleep(0.05)
+        with SlowMockClient.lock:
+            SlowMockClient.running -= 1
+        return params
+
+class CancellableMockClient(qsharp.clients.mock.MockClient):
+    """
+    Mock client whose map runs until it is cancelled.
+    """
+    def map(self, op, kwargs_list, **kwargs):
+        token = current_token()
+        while not (token is not None and token.cancelled):
+            time.sleep(0.001)
+        raise CancelledError()
+
+@pytest.fixture
+def pool():
+    pool = KernelPool(n_kernels=3, client_factory=SlowMockClient)
+    pool.start()
+    yield pool
+    pool.stop()
+
+## TESTS ##
+
+def test_invalid_size():
+    with pytest.raises(ValueError):
+        KernelPool(n_kernels=0, client_factory=qsharp.clients.mock.MockClient)
+
+def test_broadcast_reaches_every_kernel(pool):
+    pool.add_package("Microsoft.Quantum.Numerics")
+    assert all(
+        client.packages == ["Microsoft.Quantum.Numerics"]
+        for client in pool.clients
+    )
+    assert pool.compile("operation Example() : Unit {}") == ["Workspace.Snippet.Example"]
+
+def test_simulate_runs_in_parallel(pool):
+    SlowMockClient.max_running = 0
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        results = list(executor.map(
+            lambda idx: pool.simulate(None, idx=idx),
+            range(9)
+        ))
+    assert results == [{'idx': idx} for idx in range(9)]
+    assert 1 < SlowMockClient.max_running <= len(pool)
+    assert not pool.busy
+
+def test_cancel_map():
+    pool = KernelPool(n_kernels=2, client_factory=CancellableMockClient)
+    pool.start()
+    try:
+        future = pool.submit('map', None, [{}, {}, {}])
+        time.sleep(0.05)
+        assert future.cancel()
+        with pytest.raises(CancelledError):
+            future.result(timeout=5)
+    finally:
+        pool.stop()
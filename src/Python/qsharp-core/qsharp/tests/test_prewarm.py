@@ -0,0 +1,119 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+##
+# test_prewarm.py: Tests loading packages into a Q# client in the
+#     background.
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+
+## IMPORTS ##
+
+import json
+import threading
+
+import pytest
+import qsharp
+import qsharp.clients.mock
+from qsharp.clients import LazyClient
+from qsharp.prewarm import PrewarmSpec
+
+## SETUP ##
+
+class BlockingPackageClient(qsharp.clients.mock.MockClient):
+    """
+    Mock client whose add_package blocks until released, and which fails to
+    add packages named "Missing".
+    """
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def add_package(self, name : str) -> None:
+        self.release.wait()
+        if name == "Missing":
+            raise RuntimeError(f"Package {name} not found.")
+        super().add_package(name)
+
+@pytest.fixture
+def mock():
+    mock = BlockingPackageClient()
+    yield mock
+    mock.release.set()
+
+## TESTS ##
+
+def test_calls_wait_only_for_their_dependencies(mock):
+    client = LazyClient(lambda: mock, in_background=False)
+    prewarm = client.prewarm(PrewarmSpec(packages=["Microsoft.Quantum.Numerics"]))
+
+    # Neither of these depend on packages, and so return while the package
+    # is still being added.
+    assert client.component_versions() == {}
+    assert not client.busy
+    assert not prewarm.done
+
+    result = []
+    thread = threading.Thread(target=lambda: result.append(client.get_packages()))
+    thread.start()
+    thread.join(0.1)
+    assert thread.is_alive()
+
+    mock.release.set()
+    thread.join()
+    assert result == [["Microsoft.Quantum.Numerics"]]
+    prewarm.wait()
+    assert prewarm.done
+
+def test_import_does_not_wait_for_packages(mock, monkeypatch):
+    client = LazyClient(lambda: mock, in_background=False)
+    monkeypatch.setattr(qsharp, 'client', client)
+    prewarm = client.prewarm(PrewarmSpec(packages=["Microsoft.Quantum.Numerics"]))
+
+    # Reading the workspace version doesn't wait for packages to be added,
+    # nor do imports of optional dependencies, which reach the finder for
+    # Q# namespaces.
+    assert client.workspace_version == 0
+    def probe():
+        try:
+            import some_missing_optional_dependency
+        except ImportError:
+            pass
+    thread = threading.Thread(target=probe)
+    thread.start()
+    thread.join(5)
+    assert not thread.is_alive()
+    assert not prewarm.done
+
+    with pytest.raises(TimeoutError):
+        prewarm.wait(0.01)
+    mock.release.set()
+    prewarm.wait(5)
+    assert not client.prewarming
+
+def test_failed_steps_are_reported(mock):
+    mock.release.set()
+    client = LazyClient(lambda: mock, in_background=False)
+    prewarm = client.prewarm(PrewarmSpec(packages=["Missing", "Microsoft.Quantum.Numerics"]))
+    with pytest.raises(RuntimeError, match="add package Missing"):
+        prewarm.wait()
+    assert client.get_packages() == ["Microsoft.Quantum.Numerics"]
+
+def test_spec_from_file(tmp_path):
+    path = tmp_path / "prewarm.json"
+    path.write_text(json.dumps({"packages": ["Microsoft.Quantum.Numerics"], "reload": True}))
+    spec = PrewarmSpec.from_file(str(path))
+    assert [(category, description) for category, description, _ in spec.steps()] == [
+        ('packages', "add package Microsoft.Quantum.Numerics"),
+        ('workspace', "reload workspace"),
+    ]
+
+def test_spec_from_file_rejects_unknown_keys(tmp_path):
+    path = tmp_path / "prewarm.json"
+    path.write_text(json.dumps({"packages": [], "pakages": ["Microsoft.Quantum.Numerics"]}))
+    with pytest.raises(ValueError, match="prewarm.json has unknown keys pakages"):
+        PrewarmSpec.from_file(str(path))
+    path.write_text(json.dumps(["Microsoft.Quantum.Numerics"]))
+    with pytest.raises(ValueError, match="must be a JSON object"):
+        PrewarmSpec.from_file(str(path))
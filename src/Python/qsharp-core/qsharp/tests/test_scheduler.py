@@ -0,0 +1,69 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+##
+# test_scheduler.py: Tests ordering and metrics of the request scheduler.
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+
+## IMPORTS ##
+
+import threading
+import time
+
+from qsharp.clients.scheduler import RequestScheduler
+
+## TESTS ##
+
+def _run_queued(scheduler, priorities):
+    """
+    Holds the scheduler while starting one thread per priority, then
+    releases it and returns the order in which the threads ran.
+    """
+    order = []
+    def worker(idx, priority):
+        with scheduler.acquire(priority=priority):
+            order.append(idx)
+
+    threads = []
+    with scheduler.acquire():
+        for idx, priority in enumerate(priorities):
+            thread = threading.Thread(target=worker, args=(idx, priority))
+            thread.start()
+            threads.append(thread)
+            # Wait for each thread to enqueue so that arrival order is
+            # deterministic.
+            while scheduler.queue_depth <= idx:
+                time.sleep(0.001)
+    for thread in threads:
+        thread.join()
+    return order
+
+def test_fifo_order():
+    assert _run_queued(RequestScheduler(), [0, 0, 0, 0]) == [0, 1, 2, 3]
+
+def test_priority_order():
+    assert _run_queued(RequestScheduler(), [0, 5, 0, 10]) == [3, 1, 0, 2]
+
+def test_held_by_current_thread():
+    scheduler = RequestScheduler()
+    assert not scheduler.busy
+    with scheduler.acquire():
+        assert scheduler.busy
+        assert scheduler.held_by_current_thread
+        held_elsewhere = []
+        thread = threading.Thread(target=lambda: held_elsewhere.append(scheduler.held_by_current_thread))
+        thread.start()
+        thread.join()
+        assert held_elsewhere == [False]
+    assert not scheduler.busy
+
+def test_stats():
+    scheduler = RequestScheduler()
+    _run_queued(scheduler, [0, 0, 0])
+    stats = scheduler.stats()
+    assert stats.n_requests == 4
+    assert stats.max_queue_depth == 3
+    assert stats.queue_depth == 0
+    assert stats.max_wait >= stats.mean_wait > 0
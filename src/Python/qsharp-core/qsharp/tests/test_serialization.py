@@ -13,7 +13,7 @@ import unittest
 import json
 import numpy as np
 import pytest
-from qsharp.serialization import map_tuples, unmap_tuples
+from qsharp.serialization import map_tuples, unmap_tuples, loads_tuples, iter_array, to_numpy
 from .utils import set_environment_variables
 
 ## SETUP ##
@@ -76,6 +76,46 @@ class TestSerialization(unittest.TestCase):
             ]
         )
 
+    def test_map_ndarray_bulk(self):
+        for dtype in (np.bool_, np.int8, np.uint64, np.float32, np.float64):
+            array = np.arange(24).reshape(2, 3, 4).astype(dtype)
+            mapped = map_tuples(array)
+            self.assertEqual(mapped, [[[value.item() for value in row] for row in plane] for plane in array])
+            self.assertIs(type(mapped[0][0][0]), type(array[0, 0, 0].item()))
+        self.assertEqual(map_tuples(np.array(['a', 'b'])), ['a', 'b'])
+        self.assertEqual(map_tuples(np.zeros((2, 0))), [[], []])
+
+    def test_map_complex(self):
+        pair = lambda real, imag: {'@type': 'tuple', 'Item1': real, 'Item2': imag}
+        self.assertEqual(
+            map_tuples(np.array([[1 + 2j, 3j], [-1, 0]], dtype=np.complex64)),
+            [[pair(1.0, 2.0), pair(0.0, 3.0)], [pair(-1.0, 0.0), pair(0.0, 0.0)]]
+        )
+        self.assertEqual(map_tuples([np.complex128(1 - 1j), 2j]), [pair(1.0, -1.0), pair(0.0, 2.0)])
+        self.assertEqual(map_tuples(np.zeros((1, 0), dtype=complex)), [[]])
+
+    def test_map_structured_and_object_arrays(self):
+        structured = np.array([(1, 2.5), (2, 3.5)], dtype=[('index', np.int32), ('angle', np.float64)])
+        self.assertEqual(
+            map_tuples({'pairs': structured, 'count': 2}),
+            {
+                'pairs': [
+                    {'@type': 'tuple', 'Item1': 1, 'Item2': 2.5},
+                    {'@type': 'tuple', 'Item1': 2, 'Item2': 3.5}
+                ],
+                'count': 2
+            }
+        )
+        # Keys keep their order, even when arrays are mapped out of turn.
+        self.assertEqual(list(map_tuples({'pairs': structured, 'count': 2})), ['pairs', 'count'])
+
+        objects = np.empty(2, dtype=object)
+        objects[:] = [(np.int64(1), [np.float32(0.5)]), 'two']
+        self.assertEqual(
+            map_tuples(objects),
+            [{'@type': 'tuple', 'Item1': 1, 'Item2': [0.5]}, 'two']
+        )
+
     def test_roundtrip_shallow_tuple(self):
         actual = ('a', 3.14, False)
         self.assertEqual(
@@ -108,6 +148,98 @@ class TestSerialization(unittest.TestCase):
         self.assertEqual(
             unmap_tuples(map_tuples(actual)), actual
         )
+    def test_map_long_tuple(self):
+        self.assertEqual(
+            map_tuples(tuple(range(9))),
+            {
+                '@type': 'tuple',
+                'Item1': 0, 'Item2': 1, 'Item3': 2, 'Item4': 3, 'Item5': 4, 'Item6': 5, 'Item7': 6,
+                'Rest': {'@type': 'tuple', 'Item1': 7, 'Item2': 8}
+            }
+        )
+
+    def test_map_subclasses(self):
+        from collections import namedtuple, OrderedDict
+        Pair = namedtuple('Pair', ['first', 'second'])
+        self.assertEqual(
+            map_tuples(OrderedDict(pair=Pair(np.int64(1), [np.float32(0.5)]))),
+            {'pair': {'@type': 'tuple', 'Item1': 1, 'Item2': [0.5]}}
+        )
+
+    def test_unmap_tuples(self):
+        self.assertEqual(unmap_tuples({'@type': 'tuple'}), ())
+        self.assertEqual(unmap_tuples({'Item1': 1, 'Item2': [{'Item1': 2}], 'Item4': 4}), (1, [(2,)]))
+        self.assertEqual(unmap_tuples({'@type': 'Result', 'Value': 1}), {'@type': 'Result', 'Value': 1})
+
+    def test_deeply_nested(self):
+        depth = 100000
+        value = 'leaf'
+        for _ in range(depth):
+            value = [(value,)]
+        mapped = map_tuples(value)
+        unmapped = unmap_tuples(mapped)
+        # Comparing such deeply nested values would itself hit the recursion
+        # limit, so walk them instead.
+        for _ in range(depth):
+            self.assertEqual(mapped[0]['@type'], 'tuple')
+            self.assertIsInstance(unmapped[0], tuple)
+            mapped = mapped[0]['Item1']
+            unmapped = unmapped[0][0]
+        self.assertEqual(mapped, 'leaf')
+        self.assertEqual(unmapped, 'leaf')
+
+    def test_large_payload(self):
+        payload = [(idx, [idx, str(idx)], {'a': (idx,)}) for idx in range(10 ** 5)]
+        self.assertEqual(unmap_tuples(json.loads(json.dumps(map_tuples(payload)))), payload)
+
+    def test_loads_tuples(self):
+        for payload in (
+            [(idx, [idx, str(idx)], {'a': (idx,)}) for idx in range(100)],
+            {'@type': '@tuple', 'Item1': 1, 'Item2': {'Item1': 2, 'Item2': "3"}},
+            {'@type': 'Microsoft.Quantum.Math.Complex', 'Item1': 0.5, 'Item2': -0.5},
+            {'rows': [["{", "1.0"]]},
+            [0.5, 1, None, "{}"],
+            None
+        ):
+            data = json.dumps(map_tuples(payload))
+            self.assertEqual(loads_tuples(data), unmap_tuples(json.loads(data)))
+            self.assertEqual(loads_tuples(data.encode('utf-8')), unmap_tuples(json.loads(data)))
+
+    def test_iter_array(self):
+        payload = [(idx, [idx, str(idx)], {'a': (idx,)}) for idx in range(100)]
+        data = json.dumps(map_tuples(payload), indent=2)
+        items = iter_array(data)
+        self.assertEqual(next(items), payload[0])
+        self.assertEqual(list(items), payload[1:])
+        self.assertEqual(list(iter_array(data, unmap_tuples)), payload)
+        self.assertEqual(list(iter_array(' [ ] ')), [])
+        for data in ('', '{}', '[1,]', '[1 2]', '[1] 2', '[1, 2'):
+            with self.assertRaises(json.JSONDecodeError):
+                list(iter_array(data))
+
+    def test_to_numpy(self):
+        converted = to_numpy(({'a': [[1.5, 2.5], [3.5, 4.5]]}, [1, 2], [True], [[1.0], [2.0, 3.0]], [], ["a"], [(1, 2)], [2 ** 70]))
+        self.assertEqual(converted[0]['a'].dtype, np.float64)
+        self.assertEqual(converted[0]['a'].tolist(), [[1.5, 2.5], [3.5, 4.5]])
+        self.assertEqual(converted[1].dtype, np.int64)
+        self.assertEqual(converted[2].dtype, np.bool_)
+        # Ragged arrays are left as lists of arrays.
+        self.assertIsInstance(converted[3], list)
+        self.assertEqual([item.tolist() for item in converted[3]], [[1.0], [2.0, 3.0]])
+        # So are lists of anything but numbers and booleans, or of integers
+        # that don't fit into an int64.
+        self.assertEqual(converted[4:], ([], ["a"], [(1, 2)], [2 ** 70]))
+
+    def test_to_numpy_infers_type_from_every_item(self):
+        converted = to_numpy(([1, 2.5], [[1, 2], [3, 4.5]], [2.5, 1], [1, "a"], [True, 1], [[1, 2], ["a", "b"]], [[1, 2], 3]))
+        self.assertEqual(converted[0].dtype, np.float64)
+        self.assertEqual(converted[0].tolist(), [1.0, 2.5])
+        self.assertEqual(converted[1].dtype, np.float64)
+        self.assertEqual(converted[1].tolist(), [[1.0, 2.0], [3.0, 4.5]])
+        self.assertEqual(converted[2].dtype, np.float64)
+        self.assertEqual(converted[3:5], ([1, "a"], [True, 1]))
+        self.assertEqual(converted[5][1], ["a", "b"])
+        self.assertEqual(converted[6][1], 3)
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,73 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+##
+# test_server.py: Tests finding and writing connection files for shared
+#     IQ# kernels.
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+
+## IMPORTS ##
+
+import json
+import os
+import stat
+
+import pytest
+
+from qsharp.clients import _find_connection_files
+from qsharp.clients.iqsharp import IQSharpClient
+from qsharp.server import write_connection_file
+
+## TESTS ##
+
+CONNECTION_INFO = {
+    'shell_port': 50001, 'iopub_port': 50002, 'stdin_port': 50003,
+    'control_port': 50004, 'hb_port': 50005, 'ip': '127.0.0.1',
+    'key': b'secret', 'transport': 'tcp', 'signature_scheme': 'hmac-sha256'
+}
+
+def test_write_connection_file(tmp_path):
+    path = str(tmp_path / "kernel-0.json")
+    write_connection_file(path, CONNECTION_INFO)
+    with open(path) as f:
+        written = json.load(f)
+    assert written['key'] == 'secret'
+    assert written['shell_port'] == 50001
+    assert os.listdir(tmp_path) == ["kernel-0.json"]
+
+@pytest.mark.skipif(os.name == 'nt', reason="POSIX permissions are not supported on Windows.")
+def test_connection_file_is_private(tmp_path):
+    path = str(tmp_path / "kernel-0.json")
+    # Neither the permissions of the file being replaced nor the umask
+    # apply to the new file.
+    with open(path, 'w') as f:
+        f.write('{}')
+    os.chmod(path, 0o644)
+    umask = os.umask(0)
+    try:
+        write_connection_file(path, CONNECTION_INFO)
+    finally:
+        os.umask(umask)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+def test_find_connection_files(tmp_path):
+    assert _find_connection_files(None) == []
+    for idx in (1, 0):
+        write_connection_file(str(tmp_path / f"kernel-{idx}.json"), CONNECTION_INFO)
+    expected = [str(tmp_path / "kernel-0.json"), str(tmp_path / "kernel-1.json")]
+    assert _find_connection_files(str(tmp_path)) == expected
+    assert _find_connection_files(expected[1]) == [expected[1]]
+
+def test_attached_client_does_not_own_kernel(tmp_path):
+    path = str(tmp_path / "kernel-0.json")
+    write_connection_file(path, CONNECTION_INFO)
+    client = IQSharpClient(connection_file=path)
+    assert client.attached
+    assert client.kernel_manager is None
+    client.start()
+    try:
+        assert client.get_connection_info()['shell_port'] == 50001
+    finally:
+        client.stop()
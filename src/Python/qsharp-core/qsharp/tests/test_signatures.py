@@ -0,0 +1,164 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+##
+# test_signatures.py: Checks that codecs compiled from the signatures of Q#
+#     callables encode and decode as map_tuples and unmap_tuples do.
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+
+## IMPORTS ##
+
+import json
+
+import numpy as np
+import pytest
+
+from qsharp.serialization import dumps, map_tuples, unmap_tuples
+from qsharp.signatures import GENERIC_CODEC, QSharpType, compile_codec, parse_signature, parse_type
+from qsharp.types import Pauli, Result
+from .utils import set_environment_variables
+
+## SETUP ##
+
+@pytest.fixture(scope="session", autouse=True)
+def session_setup():
+    set_environment_variables()
+
+## TESTS ##
+
+@pytest.mark.parametrize("text,expected", [
+    ("Int", "Int"),
+    ("Double[]", "Double[]"),
+    ("(Int, Double[])[]", "(Int, Double[])[]"),
+    ("((Int, Bool), String)", "((Int, Bool), String)"),
+    ("(Int)", "Int"),
+    ("()", "Unit"),
+    ("Result[][]", "Result[][]"),
+    ("Microsoft.Quantum.Math.Complex[]", "Microsoft.Quantum.Math.Complex[]"),
+    ("'T", "'T"),
+    ("(Qubit[] => Unit is Adj + Ctl)[]", "Callable[]"),
+    ("((Int, Int) -> Int)", "Callable"),
+])
+def test_parse_type(text, expected):
+    assert str(parse_type(text)) == expected
+
+def test_parse_signature():
+    signature = parse_signature("Foo<'T> (op : ('T => Unit is Adj), xs : (Int, Double)[], n : BigInt) : (Result, Pauli[]) is Adj + Ctl")
+    assert signature.name == "Foo"
+    assert list(signature.inputs) == ["op", "xs", "n"]
+    assert signature.inputs["n"] == QSharpType('BigInt')
+    assert str(signature.output) == "(Result, Pauli[])"
+    assert str(parse_signature("Bar () : Unit")) == "Bar () : Unit"
+
+@pytest.mark.parametrize("signature", [None, "", "not a signature", "Foo ((a : Int, b : Int)) : Unit", "Foo (a : Int"])
+def test_unparsable_signatures_are_generic(signature):
+    assert compile_codec(signature) is GENERIC_CODEC
+
+def test_encode_arguments():
+    codec = compile_codec(
+        "Foo (n : Int, angle : Double, pairs : (Int, Double)[], nested : ((Int, Bool), String[])[], "
+        "long : (Int, Int, Int, Int, Int, Int, Int, Int, (Double, String)), results : Result[], c : Microsoft.Quantum.Math.Complex) : Unit"
+    )
+    arguments = [
+        {
+            'n': 3, 'angle': 0.5, 'pairs': [(1, 2.5), (3, 4.5)], 'nested': [((1, True), ["a", "b"])],
+            'long': (1, 2, 3, 4, 5, 6, 7, 8, (9.0, "x")), 'results': [Result.One, 0], 'c': (0.5, -0.5)
+        },
+        # Values of unexpected types fall back to map_tuples.
+        {'n': np.int64(3), 'angle': np.float32(0.5), 'pairs': np.array([1.0, 2.0]), 'nested': [((1, True), ("a", "b"))], 'long': (1, 2)},
+        {'pairs': [(1, 2.5), (3, 4.5, 6.5)], 'nested': [[1, 2]], 'results': (0, 1)},
+        # Arguments that are not in the signature are mapped as they are.
+        {'unknown': [(1, 2)], '__shots__': 100},
+        {}
+    ]
+    for kwargs in arguments:
+        assert json.dumps(codec.encode_arguments(kwargs)) == json.dumps(map_tuples(kwargs))
+
+@pytest.mark.parametrize("n_items", range(1, 8))
+def test_leaf_tuple_arrays(n_items):
+    item_types = ["Int", "Double", "Result", "Bool", "String", "Pauli", "Int"][:n_items]
+    codec = compile_codec(f"Foo (values : ({', '.join(item_types)})[]) : ({', '.join(item_types)})[]")
+    values = [(idx, idx / 2, Result.One, True, "a", Pauli.Y, -idx)[:n_items] for idx in range(5)]
+    encoded = codec.encode_arguments({'values': values})
+    assert json.dumps(encoded) == json.dumps(map_tuples({'values': values}))
+    output = json.loads(json.dumps(encoded['values']))
+    decoded = codec.decode_output(output)
+    assert decoded == unmap_tuples(output) == values
+    assert all(type(item) is tuple for item in decoded)
+
+def test_decode_output():
+    codec = compile_codec("Foo () : (Result, Pauli[], (Int, Double)[], Result[], String)")
+    output = {
+        '@type': '@tuple', 'Item1': 1, 'Item2': [0, 1, 3, 2],
+        'Item3': [{'@type': '@tuple', 'Item1': 1, 'Item2': 0.5}], 'Item4': [0, 1], 'Item5': "done"
+    }
+    decoded = codec.decode_output(output)
+    assert decoded == unmap_tuples(output)
+    assert decoded == (Result.One, [Pauli.I, Pauli.X, Pauli.Y, Pauli.Z], [(1, 0.5)], [Result.Zero, Result.One], "done")
+    assert type(decoded[0]) is Result
+    assert all(type(pauli) is Pauli for pauli in decoded[1])
+
+def test_decode_output_falls_back():
+    codec = compile_codec("Foo () : (Result[], Int)")
+    for output in (
+        {'@type': '@tuple', 'Item1': [0, 2], 'Item2': 3},
+        {'@type': '@tuple', 'Item1': [0, 1], 'Item2': 3, 'Item3': 4},
+        [0, 1],
+        None
+    ):
+        assert codec.decode_output(output) == unmap_tuples(output)
+
+def test_decode_unit_and_long_tuples():
+    assert compile_codec("Foo () : Unit").decode_output({'@type': 'tuple'}) == ()
+    codec = compile_codec("Foo () : (Int, Int, Int, Int, Int, Int, Int, Int, Result)")
+    # The kernel flattens the items of long tuples, rather than nesting them.
+    output = {'@type': '@tuple', **{f"Item{idx + 1}": idx for idx in range(8)}, 'Item9': 1}
+    assert codec.decode_output(output) == (0, 1, 2, 3, 4, 5, 6, 7, Result.One)
+
+def test_decode_user_defined_types():
+    codec = compile_codec("Foo () : (Microsoft.Quantum.Math.Complex, Result)[]")
+    output = [{'@type': '@tuple', 'Item1': {'@type': 'Microsoft.Quantum.Math.Complex', 'Item1': 0.5, 'Item2': 0.0}, 'Item2': 0}]
+    assert codec.decode_output(output) == [((0.5, 0.0), Result.Zero)]
+
+@pytest.mark.parametrize("signature,output", [
+    ("Foo () : (Result, Int)[]", [{'@type': '@tuple', 'Item1': idx % 2, 'Item2': idx} for idx in range(10)]),
+    ("Foo () : Microsoft.Quantum.Math.Complex[]", [{'@type': 'Microsoft.Quantum.Math.Complex', 'Item1': 0.5, 'Item2': 0.0}]),
+    ("Foo () : Result[][]", [[0, 1], [1, 1]]),
+    (None, [{'@type': '@tuple', 'Item1': 1, 'Item2': [2]}, 3])
+])
+def test_decode_json(signature, output):
+    codec = compile_codec(signature)
+    data = dumps(output)
+    assert codec.decode_json(data) == codec.decode_output(output)
+    assert list(codec.iter_json(data)) == codec.decode_output(output)
+
+def test_decode_counts_json():
+    codec = compile_codec("Foo () : Result")
+    counts = codec.decode_counts_json(dumps([{'@type': 'tuple', 'Item1': 0, 'Item2': 3}, {'@type': 'tuple', 'Item1': 1, 'Item2': 1}]))
+    assert counts == [(Result.Zero, 3), (Result.One, 1)]
+    assert all(type(output) is Result for output, _ in counts)
+    [(results, count)] = compile_codec("Foo () : Result[]").decode_counts_json("[[[0, 1], 2]]", as_numpy=True)
+    assert results.dtype == np.uint8 and results.tolist() == [0, 1]
+    assert count == 2
+    assert GENERIC_CODEC.decode_counts_json("[[[0, 1], 2]]") == [([0, 1], 2)]
+
+def test_decode_as_numpy():
+    codec = compile_codec("Foo () : (Double[][], Result[], Bool[], Int[], Pauli[], Double[][])")
+    output = {
+        '@type': '@tuple', 'Item1': [[0.5, 1.5], [2.5, 3.5]], 'Item2': [0, 1], 'Item3': [True, False],
+        'Item4': [2 ** 70], 'Item5': [1, 3], 'Item6': [[0.5], []]
+    }
+    doubles, results, bools, ints, paulis, ragged = codec.decode_json(dumps(output), as_numpy=True)
+    assert doubles.dtype == np.float64 and doubles.shape == (2, 2)
+    assert results.dtype == np.uint8 and results.tolist() == [0, 1]
+    assert bools.dtype == np.bool_ and bools.tolist() == [True, False]
+    # Arrays that can't be NumPy arrays are decoded as usual.
+    assert ints == [2 ** 70]
+    assert paulis == [Pauli.X, Pauli.Y]
+    assert [item.tolist() for item in ragged] == [[0.5], []]
+    assert codec.decode_output(output, as_numpy=False)[:3] == ([[0.5, 1.5], [2.5, 3.5]], [Result.Zero, Result.One], [True, False])
+    assert compile_codec("Foo () : Double[][]").decode_output([], as_numpy=True).shape == (0, 0)
+    assert [item.tolist() for item in compile_codec("Foo () : Int[][]").iter_json("[[1, 2], [3]]", as_numpy=True)] == [[1, 2], [3]]
+    assert GENERIC_CODEC.decode_json("[[1.5], [2.5]]", as_numpy=True).tolist() == [[1.5], [2.5]]
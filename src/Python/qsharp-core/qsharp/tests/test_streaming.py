@@ -0,0 +1,107 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+##
+# test_streaming.py: Tests buffering of events streamed from simulations.
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+
+## IMPORTS ##
+
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+import qsharp
+from qsharp.clients.cancellation import current_token
+from qsharp.clients.streaming import SimulationStream, aiterate, iterate
+
+## FUNCTIONS ##
+
+def _emit_all(n_events):
+    def run(emit):
+        for idx in range(n_events):
+            emit('stdout', idx)
+        return 'done'
+    return run
+
+def _wait_for_backlog(stream, n_events):
+    while len(stream._events) < n_events and not stream._finished:
+        time.sleep(0.001)
+
+## TESTS ##
+
+def test_block_keeps_every_event():
+    events = list(iterate(SimulationStream(_emit_all(100), max_buffered=2)))
+    assert [event.data for event in events[:-1]] == list(range(100))
+    assert events[-1].kind == 'result'
+    assert events[-1].data == 'done'
+    assert events[-1].dropped == 0
+
+def test_drop_policies():
+    release = threading.Event()
+    def run(emit):
+        for idx in range(10):
+            emit('stdout', idx)
+        release.wait(5)
+        return 'done'
+
+    stream = SimulationStream(run, max_buffered=3, policy='drop_oldest')
+    _wait_for_backlog(stream, 3)
+    time.sleep(0.05)
+    release.set()
+    events = list(iterate(stream))
+    assert [event.data for event in events[:-1]] == [7, 8, 9]
+    assert events[-1].dropped == 7
+
+    release.clear()
+    stream = SimulationStream(run, max_buffered=3, policy='drop_newest')
+    _wait_for_backlog(stream, 3)
+    time.sleep(0.05)
+    release.set()
+    events = list(iterate(stream))
+    assert [event.data for event in events[:-1]] == [0, 1, 2]
+    assert events[-1].data == 'done'
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        SimulationStream(_emit_all(1), policy='spill')
+
+def test_errors_are_raised():
+    def run(emit):
+        emit('stdout', 'before')
+        raise RuntimeError("simulation failed")
+
+    events = iterate(SimulationStream(run))
+    assert next(events).data == 'before'
+    with pytest.raises(RuntimeError):
+        next(events)
+
+def test_close_cancels_simulation():
+    cancelled = threading.Event()
+    def run(emit):
+        while not current_token().cancelled:
+            emit('stdout', 'tick')
+        cancelled.set()
+
+    events = iterate(SimulationStream(run, max_buffered=1))
+    assert next(events).data == 'tick'
+    events.close()
+    assert cancelled.wait(5)
+
+def test_async_iteration():
+    async def collect():
+        return [event.data async for event in aiterate(iterate(SimulationStream(_emit_all(5))))]
+    assert asyncio.run(collect()) == [0, 1, 2, 3, 4, 'done']
+
+def test_import_does_not_load_asyncio():
+    # asyncio is slow to import, so it's only loaded by asynchronous callers.
+    check = "import sys, qsharp; assert 'asyncio' not in sys.modules"
+    root = os.path.dirname(os.path.dirname(qsharp.__file__))
+    subprocess.run([sys.executable, '-c', check], check=True, env={**os.environ, 'PYTHONPATH': root})
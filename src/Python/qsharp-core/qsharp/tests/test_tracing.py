@@ -0,0 +1,102 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+##
+# test_tracing.py: Tests timing spans and latency statistics.
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+
+## IMPORTS ##
+
+import pytest
+
+import qsharp
+from qsharp.clients.tracing import BUCKET_BOUNDS, BUCKET_GROWTH, CallStats, Span, Tracer, add_kernel_tasks
+
+## TESTS ##
+
+def test_span_children():
+    span = Span('%simulate', 0.0)
+    span.add_child('send', 1.0, 3.0, bytes_out=10)
+    with span.child('decode') as decode:
+        pass
+    span.end = 5.0
+    assert span.duration == 5.0
+    assert decode.duration >= 0
+    as_dict = span.to_dict()
+    assert [child['name'] for child in as_dict['children']] == ['send', 'decode']
+    assert as_dict['children'][0]['duration'] == 2.0
+    assert as_dict['children'][0]['attributes'] == {'bytes_out': 10}
+
+def test_percentiles():
+    stats = CallStats()
+    assert stats.p50 is None
+    for idx in range(100):
+        stats.record(Span('%simulate', 0.0, 0.001 if idx < 90 else 1.0, {'bytes_in': 2}))
+    assert stats.count == 100
+    assert stats.bytes_in == 200
+    assert 0.001 <= stats.p50 < 0.001 * BUCKET_GROWTH
+    assert 1.0 <= stats.p95 < BUCKET_GROWTH
+    assert stats.p99 == stats.p95
+    # Latencies too long for any bucket are counted in the last one.
+    stats.record(Span('%simulate', 0.0, 10 * BUCKET_BOUNDS[-1]))
+    assert stats.buckets[-1] == 1
+
+def test_nested_calls():
+    tracer = Tracer()
+    with tracer.call('map') as outer:
+        with tracer.call('%simulate') as inner:
+            inner.add_child('send', 0.0, 1.0)
+    assert inner is outer
+    assert list(tracer.stats()) == ['map']
+    assert [child.name for child in outer.children] == ['send']
+
+def test_errors_and_hooks():
+    tracer = Tracer()
+    spans = []
+    def failing_hook(span):
+        raise RuntimeError("hook failed")
+    tracer.add_hook(failing_hook)
+    tracer.add_hook(spans.append)
+
+    with pytest.raises(ValueError):
+        with tracer.call('%simulate'):
+            raise ValueError()
+    # Hooks that fail don't keep other hooks from being called.
+    assert spans[0].attributes['error'] == 'ValueError'
+    assert tracer.stats()['%simulate'].n_errors == 1
+    assert tracer.current is None
+
+    tracer.remove_hook(failing_hook)
+    assert tracer.stats(reset=True)['%simulate'].count == 1
+    assert tracer.stats() == {}
+
+def test_stats_are_copies():
+    stats = qsharp.stats()
+    for call_stats in stats.values():
+        call_stats.count = -1
+    assert all(call_stats.count >= 0 for call_stats in qsharp.stats().values())
+
+def test_kernel_tasks():
+    span = Span('compile', 0.0)
+    add_kernel_tasks(span, {
+        'total_ms': 1000.0,
+        'tasks': [{
+            'id': 'execute-mundane', 'description': 'Mundane cell execution',
+            'start_ms': 100.0, 'duration_ms': 800.0,
+            'statuses': [{'id': 'init-engine', 'at_ms': 5.0}],
+            'children': [{
+                'id': 'compile-snippets', 'description': 'Compiling snippets',
+                'start_ms': 200.0, 'duration_ms': None, 'statuses': [], 'children': []
+            }]
+        }]
+    }, received=11.0)
+    [task] = span.children
+    assert task.name == 'kernel:execute-mundane'
+    assert task.start == pytest.approx(10.1)
+    assert task.duration == pytest.approx(0.8)
+    assert task.attributes['statuses'] == {'init-engine': 0.005}
+    [subtask] = task.children
+    assert subtask.start == pytest.approx(10.2)
+    assert subtask.end is None
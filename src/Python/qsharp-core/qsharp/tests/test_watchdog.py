@@ -0,0 +1,97 @@
+#!/bin/env python
+# -*- coding: utf-8 -*-
+##
+# test_watchdog.py: Tests restarting IQ# kernels and replaying their state.
+##
+# Copyright (c) Microsoft Corporation.
+# Licensed under the MIT License.
+##
+
+## IMPORTS ##
+
+from types import SimpleNamespace
+
+from qsharp.clients.iqsharp import IQSharpClient
+from qsharp.clients.watchdog import KernelWatchdog
+
+## SETUP ##
+
+class FakeHeartbeat(object):
+    def __init__(self):
+        self.beating = True
+
+    def is_alive(self):
+        return True
+
+    def is_beating(self):
+        return self.beating
+
+def _fake_client(alive=True):
+    kernel_manager = SimpleNamespace(alive=alive)
+    kernel_manager.is_alive = lambda: kernel_manager.alive
+    return SimpleNamespace(
+        kernel_manager=kernel_manager,
+        kernel_client=SimpleNamespace(hb_channel=FakeHeartbeat())
+    )
+
+def _recording_client():
+    """
+    Returns an IQ# client that records the commands it would send rather
+    than sending them to a kernel.
+    """
+    client = IQSharpClient()
+    client.sent = []
+    client._execute = lambda input, **kwargs: client.sent.append(input)
+    return client
+
+## TESTS ##
+
+def test_journal_keeps_latest_state():
+    client = _recording_client()
+    client.compile("function A() : Unit {}")
+    client.add_package("Microsoft.Quantum.Numerics")
+    client.set_config("dump.basisStateLabelingConvention", "Bitstring")
+    client.add_package("Microsoft.Quantum.Numerics")
+    client.set_config("dump.basisStateLabelingConvention", "LittleEndian")
+    client.set_noise_model('{"initial_state": {}}')
+    client.set_noise_model_by_name("ideal")
+    client.compile("function B() : Unit {}")
+    assert client._journal == [
+        ('compile', ("function A() : Unit {}",)),
+        ('add_package', ("Microsoft.Quantum.Numerics",)),
+        ('set_config', ("dump.basisStateLabelingConvention", "LittleEndian")),
+        ('set_noise_model_by_name', ("ideal",)),
+        ('compile', ("function B() : Unit {}",)),
+    ]
+
+def test_replay_sends_journal_in_order():
+    client = _recording_client()
+    client.compile("function A() : Unit {}")
+    client.add_project("../Project.csproj")
+    client.set_config("opensim.nQubits", 4)
+    journal = list(client._journal)
+
+    client.sent.clear()
+    client._replay_journal()
+    assert client.sent == [
+        "function A() : Unit {}",
+        "%project ../Project.csproj",
+        "%config opensim.nQubits=4",
+    ]
+    assert client._journal == journal
+
+def test_watchdog_detects_exited_kernel():
+    client = _fake_client(alive=False)
+    assert KernelWatchdog(client).check() == "the kernel exited"
+    client.kernel_manager.alive = True
+    assert KernelWatchdog(client).check() is None
+
+def test_watchdog_tolerates_few_missed_heartbeats():
+    client = _fake_client()
+    watchdog = KernelWatchdog(client, max_missed_heartbeats=2)
+    client.kernel_client.hb_channel.beating = False
+    assert watchdog.check() is None
+    assert watchdog.check() == "the kernel missed 2 heartbeats"
+    client.kernel_client.hb_channel.beating = True
+    assert watchdog.check() is None
+    assert watchdog._missed_heartbeats == 0
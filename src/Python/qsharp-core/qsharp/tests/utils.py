@@ -23,5 +23,7 @@ def set_environment_variables():
     os.environ["AZURE_QUANTUM_ENV"] = "mock"
     os.environ["IQSHARP_AUTO_LOAD_PACKAGES"] = "$null"
     importlib.reload(qsharp)
+    # Q# namespaces can only be imported once the client has started.
+    qsharp.client.get()
     if "qsharp.chemistry" in sys.modules:
         importlib.reload(qsharp.chemistry)
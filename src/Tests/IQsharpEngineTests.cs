@@ -183,8 +183,11 @@ namespace Tests.IQSharp
                     .Input("%sim", 3)
                         .CompletesTo(
                             "%simulate",
+                            "%simulate_batch",
                             "%simulate_noise",
-                            "%simulate_sparse"
+                            "%simulate_shots",
+                            "%simulate_sparse",
+                            "%simulate_sparse_shots"
                         )
                     .Input("%ls", 3)
                         .CompletesTo(
@@ -242,6 +245,71 @@ namespace Tests.IQSharp
             Assert.AreEqual("[4,3,2]", results);
         }
 
+        [TestMethod]
+        public async Task SimulateBatch()
+        {
+            var engine = await Init();
+            await AssertCompile(engine, SNIPPETS.Reverse, "Reverse");
+
+            var configSource = new ConfigurationSource(skipLoading: true);
+            var batchMagic = new SimulateBatchMagic(engine.SymbolsResolver!, configSource, new PerformanceMonitor(), new UnitTestLogger<SimulateBatchMagic>());
+            var channel = new MockChannel();
+            var response = await batchMagic.Execute(
+                "Reverse [{ \"array\": [2, 3, 4], \"name\": \"foo\" }, { \"array\": [5, 6], \"name\": \"bar\" }]",
+                channel
+            );
+            PrintResult(response, channel);
+            Assert.AreEqual(ExecuteStatus.Ok, response.Status);
+            CollectionAssert.AreEqual(
+                new[] { "Hello foo", "Hello bar" }.Select(ChannelWithNewLines.Format).ToArray(),
+                channel.msgs.ToArray()
+            );
+            var results = (response.Output as IEnumerable<object>)?.Select(result => result.ToString()).ToArray();
+            CollectionAssert.AreEqual(new[] { "[4,3,2]", "[6,5]" }, results);
+        }
+
+        [TestMethod]
+        public async Task SimulateShots()
+        {
+            var engine = await Init();
+            await AssertCompile(engine, SNIPPETS.Reverse, "Reverse");
+
+            var configSource = new ConfigurationSource(skipLoading: true);
+            var shotsMagic = new SimulateShotsMagic(engine.SymbolsResolver!, configSource, new PerformanceMonitor(), new UnitTestLogger<SimulateShotsMagic>());
+            var channel = new MockChannel();
+            var response = await shotsMagic.Execute(
+                "Reverse { \"array\": [2, 3, 4], \"name\": \"foo\", \"__shots__\": 3, \"__seed__\": 42 }",
+                channel
+            );
+            PrintResult(response, channel);
+            Assert.AreEqual(ExecuteStatus.Ok, response.Status);
+            Assert.AreEqual(3, channel.msgs.Count);
+            var counts = (response.Output as IEnumerable<(object, long)>)?.ToArray();
+            Assert.IsNotNull(counts);
+            Assert.AreEqual(1, counts!.Length);
+            Assert.AreEqual("[4,3,2]", counts[0].Item1.ToString());
+            Assert.AreEqual(3L, counts[0].Item2);
+        }
+
+        [TestMethod]
+        public async Task SimulateShotsCancel()
+        {
+            var engine = await Init();
+            await AssertCompile(engine, SNIPPETS.SpinForever, "SpinForever");
+
+            var configSource = new ConfigurationSource(skipLoading: true);
+            var shotsMagic = new SimulateShotsMagic(engine.SymbolsResolver!, configSource, new PerformanceMonitor(), new UnitTestLogger<SimulateShotsMagic>());
+            var channel = new MockChannel();
+            var cts = new CancellationTokenSource();
+            var shotsTask = shotsMagic.RunAsync("SpinForever { \"__shots__\": 1 }", channel, cts.Token);
+
+            // Cancelling stops the shot that is running, which never ends
+            // on its own.
+            await Task.Delay(TimeSpan.FromMilliseconds(100));
+            cts.Cancel();
+            await Assert.ThrowsExceptionAsync<TaskCanceledException>(() => shotsTask);
+        }
+
         [TestMethod]
         public async Task OpenNamespaces()
         {
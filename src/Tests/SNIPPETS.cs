@@ -154,6 +154,16 @@ namespace Tests.IQSharp
     }
 ";
 
+        public static string SpinForever =
+ @"
+    operation SpinForever() : Unit {
+        use q = Qubit();
+        repeat {
+            H(q);
+        } until false;
+    }
+";
+
         public static string FailIfOne =
  @"
     operation FailIfOne() : Unit {